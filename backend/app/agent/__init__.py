@@ -1,17 +1,28 @@
 """
 LangGraph-based travel planning agent.
+
+Exports are resolved lazily so importing a light submodule (e.g. jobs or
+distance) does not compile the graph or load the LLM client libraries.
 """
-from .graph import travel_planner_graph, create_travel_planner_graph, memory
-from .state import TravelPlannerState
-from .tools import search_places, get_place_details, tavily_search, get_distance_matrix
+import importlib
+from typing import Any
+
+_EXPORTS = {
+    "travel_planner_graph": ".graph",
+    "create_travel_planner_graph": ".graph",
+    "memory": ".graph",
+    "TravelPlannerState": ".state",
+    "search_places": ".tools",
+    "get_place_details": ".tools",
+    "tavily_search": ".tools",
+    "get_distance_matrix": ".tools",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "travel_planner_graph",
-    "create_travel_planner_graph",
-    "memory",
-    "TravelPlannerState",
-    "search_places",
-    "get_place_details",
-    "tavily_search",
-    "get_distance_matrix",
-]
+def __getattr__(name: str) -> Any:
+    """Import the submodule providing an exported name on first access."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -0,0 +1,49 @@
+"""
+LangChain callbacks for the agent's LLM calls.
+"""
+import time
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from ..services.metrics import LLM_METRICS, LLM_TOKENS
+
+
+class LLMMetricsCallback(AsyncCallbackHandler):
+    """LangChain callback recording LLM latency, errors, in-flight calls and token usage."""
+
+    def __init__(self, model: str) -> None:
+        """
+        Initialize the callback.
+
+        Args:
+            model: Model name used as the metric label
+        """
+        self.model = model
+        self._started: dict[UUID, float] = {}
+
+    async def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+        LLM_METRICS.in_flight.labels(self.model).inc()
+
+    def _finish(self, run_id: UUID) -> None:
+        """Record latency for a finished call."""
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            LLM_METRICS.in_flight.labels(self.model).dec()
+            LLM_METRICS.duration.labels(self.model).observe(time.perf_counter() - started)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if usage:
+                    LLM_TOKENS.labels(self.model, "input").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(self.model, "output").inc(usage.get("output_tokens", 0))
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+        LLM_METRICS.errors.labels(self.model).inc()
@@ -0,0 +1,538 @@
+"""
+Persistent, bounded checkpoint storage for the travel planner graph.
+
+The default LangGraph MemorySaver keeps every checkpoint of every thread in
+process memory forever, so sessions are lost on restart, cannot be shared
+between workers and memory grows without bound. The SQLite saver here
+stores zlib-compressed checkpoints in a WAL-mode database that several
+worker processes can open at once, keeps only the newest checkpoints per
+thread and expires threads that have been idle (neither read nor written)
+longer than a TTL.
+
+Backends are selected with CHECKPOINTER_BACKEND through create_checkpointer().
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Callable
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from ..config import BACKEND_DIR, settings
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', "
+    "checkpoint_id TEXT NOT NULL, parent_checkpoint_id TEXT, "
+    "type TEXT, checkpoint BLOB NOT NULL, metadata_type TEXT, metadata BLOB NOT NULL, "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', "
+    "checkpoint_id TEXT NOT NULL, task_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+    "channel TEXT NOT NULL, type TEXT, value BLOB, task_path TEXT NOT NULL DEFAULT '', "
+    "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+    "CREATE TABLE IF NOT EXISTS threads ("
+    "thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access)",
+)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite-backed checkpoint saver with compression, a per-thread cap and TTL expiry.
+
+    Each checkpoint row holds the full serialized state, so restoring a
+    thread is a single indexed read. Sync methods run on the calling thread;
+    the async methods used by the graph run them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_checkpoints_per_thread: int = 10,
+        ttl_seconds: float = 86400.0,
+        compression_level: int = 6,
+        sweep_interval: float = 300.0,
+        read_touch_interval: float = 60.0,
+    ) -> None:
+        """
+        Initialize the saver and create the schema if needed.
+
+        Args:
+            path: SQLite database file shared by all workers
+            max_checkpoints_per_thread: Newest checkpoints kept per thread
+                and namespace (0 keeps all)
+            ttl_seconds: Idle time after which a thread is deleted (0 disables)
+            compression_level: zlib level for serialized payloads (0 stores raw)
+            sweep_interval: Minimum seconds between expiry sweeps
+            read_touch_interval: Minimum seconds between last-access updates
+                caused by reads of the same thread (writes always update it)
+        """
+        super().__init__()
+        self.path = path
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.ttl_seconds = ttl_seconds
+        self.compression_level = compression_level
+        self.sweep_interval = sweep_interval
+        self.read_touch_interval = read_touch_interval
+        self._last_sweep = 0.0
+        # thread_id -> when this process last recorded an access to it
+        self._touched: dict[str, float] = {}
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def _dump(self, value: Any) -> tuple[str, bytes]:
+        """Serialize and compress a value."""
+        type_, data = self.serde.dumps_typed(value)
+        if self.compression_level > 0:
+            return f"z:{type_}", zlib.compress(data, self.compression_level)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        """Decompress and deserialize a value stored by _dump()."""
+        if type_.startswith("z:"):
+            type_, data = type_[2:], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # ------------------------------------------------------------------
+    # Housekeeping
+    # ------------------------------------------------------------------
+
+    def _touch(self, thread_id: str) -> None:
+        """Record activity on a thread (caller holds the lock)."""
+        now = time.time()
+        self._touched[thread_id] = now
+        self._db.execute(
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?) "
+            "ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+            (thread_id, now),
+        )
+
+    def _touch_on_read(self, thread_id: str) -> None:
+        """Record a read of a thread, throttled per thread (caller holds the lock)."""
+        if time.time() - self._touched.get(thread_id, 0.0) < self.read_touch_interval:
+            return
+        self._touch(thread_id)
+        self._maybe_sweep()
+        self._db.commit()
+
+    def _delete_thread_rows(self, thread_id: str) -> None:
+        """Delete every row for a thread (caller holds the lock)."""
+        for table in ("checkpoints", "writes", "threads"):
+            self._db.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        self._touched.pop(thread_id, None)
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop checkpoints beyond the per-thread cap (caller holds the lock)."""
+        if self.max_checkpoints_per_thread <= 0:
+            return
+        row = self._db.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread - 1),
+        ).fetchone()
+        if row is None:
+            return
+        for table in ("checkpoints", "writes"):
+            self._db.execute(
+                f"DELETE FROM {table} "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, row[0]),
+            )
+
+    def _maybe_sweep(self) -> None:
+        """Run an expiry sweep if the sweep interval has passed (caller holds the lock)."""
+        if self.ttl_seconds <= 0:
+            return
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        self._expire(now - self.ttl_seconds)
+        # Forget read throttling state that no longer suppresses anything
+        cutoff = now - self.read_touch_interval
+        self._touched = {t: at for t, at in self._touched.items() if at >= cutoff}
+
+    def _expire(self, cutoff: float) -> int:
+        """Delete threads idle since before `cutoff` (caller holds the lock)."""
+        stale = [
+            row[0]
+            for row in self._db.execute(
+                "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)
+            )
+        ]
+        for thread_id in stale:
+            self._delete_thread_rows(thread_id)
+        return len(stale)
+
+    def purge_expired(self) -> int:
+        """
+        Delete every thread idle for longer than the TTL.
+
+        Returns:
+            Number of threads removed
+        """
+        if self.ttl_seconds <= 0:
+            return 0
+        with self._lock:
+            removed = self._expire(time.time() - self.ttl_seconds)
+            self._db.commit()
+        return removed
+
+    def delete_thread(self, thread_id: str) -> None:
+        """
+        Delete all checkpoints and writes of a thread.
+
+        Args:
+            thread_id: Thread to delete
+        """
+        with self._lock:
+            self._delete_thread_rows(thread_id)
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver interface
+    # ------------------------------------------------------------------
+
+    def _row_to_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: tuple,
+    ) -> CheckpointTuple:
+        """Build a CheckpointTuple from a checkpoints row (caller holds the lock)."""
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._db.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._load(type_, checkpoint),
+            metadata=self._load(metadata_type, metadata),
+            pending_writes=[
+                (task_id, channel, self._load(w_type, value))
+                for task_id, channel, w_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """
+        Get a checkpoint tuple by ID, or the latest one for the thread.
+
+        Reading a thread counts as activity for TTL expiry (throttled by
+        read_touch_interval).
+
+        Args:
+            config: Config with thread_id and optional checkpoint_ns/checkpoint_id
+
+        Returns:
+            The matching CheckpointTuple, or None if the thread has none
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+        )
+        with self._lock:
+            if checkpoint_id:
+                row = self._db.execute(
+                    query + "AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    query + "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return None
+            self._touch_on_read(thread_id)
+            return self._row_to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints, newest first.
+
+        Args:
+            config: Config with thread_id (and optional checkpoint_ns), or None for all threads
+            filter: Metadata key/value pairs every returned checkpoint must match
+            before: Only return checkpoints older than this config's checkpoint_id
+            limit: Maximum number of checkpoints to return
+
+        Yields:
+            Matching CheckpointTuple objects
+        """
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                item = self._row_to_tuple(thread_id, checkpoint_ns, tuple(row))
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(item)
+                if limit is not None and len(results) >= limit:
+                    break
+
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Store a checkpoint, then enforce the per-thread cap and TTL.
+
+        Args:
+            config: Config of the parent checkpoint
+            checkpoint: Checkpoint to store
+            metadata: Metadata for the checkpoint
+            new_versions: Channel versions written by this step (unused; the
+                full state is stored with every checkpoint)
+
+        Returns:
+            Config pointing at the stored checkpoint
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self._dump(checkpoint)
+        metadata_type, metadata_data = self._dump(metadata)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                "parent_checkpoint_id, type, checkpoint, metadata_type, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    metadata_type,
+                    metadata_data,
+                ),
+            )
+            self._touch(thread_id)
+            self._prune_thread(thread_id, checkpoint_ns)
+            self._maybe_sweep()
+            self._db.commit()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """
+        Store intermediate writes linked to a checkpoint.
+
+        Args:
+            config: Config of the checkpoint the writes belong to
+            writes: (channel, value) pairs
+            task_id: ID of the task that produced the writes
+            task_path: Path of the task that produced the writes
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        # Special channels (errors, interrupts) are overwritten; regular writes are stored once
+        replace_rows, insert_rows = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dump(value)
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            row = (
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                write_idx, channel, type_, data, task_path,
+            )
+            (replace_rows if write_idx < 0 else insert_rows).append(row)
+
+        columns = (
+            "INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+            "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE " + columns, replace_rows)
+            self._db.executemany("INSERT OR IGNORE " + columns, insert_rows)
+            self._touch(thread_id)
+            self._db.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Async version of get_tuple()."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of list()."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of put()."""
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of put_writes()."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of delete_thread()."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def _create_memory_checkpointer() -> BaseCheckpointSaver:
+    """Create the in-process saver (single worker, lost on restart)."""
+    return MemorySaver()
+
+
+def _create_sqlite_checkpointer() -> BaseCheckpointSaver:
+    """Create the SQLite saver from settings."""
+    path = settings.CHECKPOINTER_SQLITE_PATH or str(BACKEND_DIR / "checkpoints.db")
+    return SQLiteCheckpointSaver(
+        path,
+        max_checkpoints_per_thread=settings.CHECKPOINT_MAX_PER_THREAD,
+        ttl_seconds=settings.CHECKPOINT_TTL_SECONDS,
+        compression_level=settings.CHECKPOINT_COMPRESSION_LEVEL,
+        read_touch_interval=settings.CHECKPOINT_READ_TOUCH_INTERVAL,
+    )
+
+
+# Backend name -> factory; register additional backends (e.g. Redis, Postgres) here
+CHECKPOINTER_BACKENDS: dict[str, Callable[[], BaseCheckpointSaver]] = {
+    "memory": _create_memory_checkpointer,
+    "sqlite": _create_sqlite_checkpointer,
+}
+
+
+def create_checkpointer(backend: str | None = None) -> BaseCheckpointSaver:
+    """
+    Create the checkpoint saver selected by CHECKPOINTER_BACKEND.
+
+    Args:
+        backend: Backend name overriding the setting
+
+    Returns:
+        A LangGraph checkpoint saver
+    """
+    name = (backend or settings.CHECKPOINTER_BACKEND).lower()
+    try:
+        factory = CHECKPOINTER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown checkpointer backend: {name} (expected one of {', '.join(CHECKPOINTER_BACKENDS)})"
+        ) from None
+    return factory()
@@ -0,0 +1,232 @@
+"""
+Capacity-balanced geographic clustering of locations into trip days.
+
+Runs k-medoids on a precomputed pairwise distance matrix with a per-cluster
+size cap, so every day gets a compact group of nearby stops and no day is
+overloaded. Seeding uses a fixed-seed k-medoids++ so the same input always
+produces the same days.
+"""
+import math
+
+import numpy as np
+
+
+def _seed_medoids(distances: np.ndarray, k: int, seed: int) -> list[int]:
+    """Pick k initial medoids with k-medoids++ using a fixed-seed generator."""
+    rng = np.random.default_rng(seed)
+    n = distances.shape[0]
+
+    # Start from the most central point so seeding does not begin at an outlier
+    medoids = [int(distances.sum(axis=1).argmin())]
+    nearest = distances[medoids[0]].astype(np.float64)
+
+    while len(medoids) < k:
+        weights = nearest ** 2
+        total = weights.sum()
+        if total <= 0:
+            # All remaining points coincide with a medoid; take the first unused ones
+            unused = [i for i in range(n) if i not in medoids]
+            medoids.extend(unused[:k - len(medoids)])
+            break
+        choice = int(rng.choice(n, p=weights / total))
+        medoids.append(choice)
+        nearest = np.minimum(nearest, distances[choice])
+
+    return medoids
+
+
+def _assign_with_capacity(
+    distances: np.ndarray,
+    medoids: list[int],
+    capacity: int,
+) -> np.ndarray:
+    """
+    Assign points to medoids without exceeding the capacity of any cluster.
+
+    Points with the largest regret (gap between their best and second-best
+    medoid) choose first, so points that clearly belong somewhere get there.
+    """
+    n = distances.shape[0]
+    k = len(medoids)
+    to_medoids = distances[:, medoids]
+
+    labels = np.full(n, -1, dtype=np.intp)
+    sizes = np.zeros(k, dtype=np.intp)
+    for cluster, medoid in enumerate(medoids):
+        labels[medoid] = cluster
+        sizes[cluster] = 1
+
+    preference = np.argsort(to_medoids, axis=1, kind="stable")
+    if k > 1:
+        ranked = np.take_along_axis(to_medoids, preference[:, :2], axis=1)
+        regret = ranked[:, 1] - ranked[:, 0]
+    else:
+        regret = np.zeros(n)
+
+    for point in np.argsort(-regret, kind="stable"):
+        if labels[point] >= 0:
+            continue
+        for cluster in preference[point]:
+            if sizes[cluster] < capacity:
+                labels[point] = cluster
+                sizes[cluster] += 1
+                break
+
+    return labels
+
+
+def _refine_assignment(
+    distances: np.ndarray,
+    labels: np.ndarray,
+    medoids: list[int],
+    min_size: int,
+    capacity: int,
+    max_moves: int = 200,
+) -> np.ndarray:
+    """
+    Improve an assignment with single-point moves and pairwise swaps.
+
+    Each step applies the best move or swap (vectorized over all candidates)
+    that lowers the total distance to medoids while keeping every cluster
+    within [min_size, capacity]. Undersized clusters are filled first.
+    """
+    labels = labels.copy()
+    k = len(medoids)
+    n = distances.shape[0]
+    to_medoids = distances[:, medoids]
+    is_medoid = np.zeros(n, dtype=bool)
+    is_medoid[medoids] = True
+    rows = np.arange(n)
+
+    for _ in range(max_moves):
+        sizes = np.bincount(labels, minlength=k)
+        own = to_medoids[rows, labels]
+
+        # Fill undersized clusters with the cheapest point from a cluster that can spare one
+        short = np.flatnonzero(sizes < min_size)
+        if short.size:
+            target = int(short[0])
+            donors = (sizes[labels] > min_size) & ~is_medoid
+            if not donors.any():
+                break
+            delta = np.where(donors, to_medoids[:, target] - own, np.inf)
+            labels[int(delta.argmin())] = target
+            continue
+
+        # Best single move into a cluster with spare capacity
+        move_delta = to_medoids - own[:, None]
+        movable = (sizes[labels] > min_size) & ~is_medoid
+        move_delta[~movable, :] = np.inf
+        move_delta[:, sizes >= capacity] = np.inf
+        move_delta[rows, labels] = np.inf
+        best_move = np.unravel_index(move_delta.argmin(), move_delta.shape)
+        best_move_delta = move_delta[best_move]
+
+        # Best swap of two points between different clusters
+        cross = to_medoids[:, labels]
+        swap_delta = cross + cross.T - own[:, None] - own[None, :]
+        swap_delta[is_medoid, :] = np.inf
+        swap_delta[:, is_medoid] = np.inf
+        swap_delta[labels[:, None] == labels[None, :]] = np.inf
+        best_swap = np.unravel_index(swap_delta.argmin(), swap_delta.shape)
+        best_swap_delta = swap_delta[best_swap]
+
+        if min(best_move_delta, best_swap_delta) >= -1e-9:
+            break
+        if best_move_delta <= best_swap_delta:
+            labels[best_move[0]] = best_move[1]
+        else:
+            a, b = best_swap
+            labels[a], labels[b] = labels[b], labels[a]
+
+    return labels
+
+
+def _update_medoids(distances: np.ndarray, labels: np.ndarray, k: int) -> list[int]:
+    """Move each medoid to the member with the smallest total distance to its cluster."""
+    medoids = []
+    for cluster in range(k):
+        members = np.flatnonzero(labels == cluster)
+        within = distances[np.ix_(members, members)].sum(axis=1)
+        medoids.append(int(members[within.argmin()]))
+    return medoids
+
+
+def balanced_kmedoids(
+    distances: np.ndarray,
+    k: int,
+    capacity: int,
+    min_size: int = 1,
+    seed: int = 0,
+    max_iter: int = 20,
+) -> np.ndarray:
+    """
+    Cluster points into k groups of between `min_size` and `capacity` members.
+
+    Args:
+        distances: Symmetric (n, n) distance matrix
+        k: Number of clusters (must satisfy k * min_size <= n <= k * capacity)
+        capacity: Maximum cluster size
+        min_size: Minimum cluster size
+        seed: Seed for the deterministic k-medoids++ initialization
+        max_iter: Maximum assign/refine/update rounds
+
+    Returns:
+        Array of cluster labels in [0, k) for each point
+    """
+    n = distances.shape[0]
+    if k <= 0 or n == 0:
+        return np.zeros(n, dtype=np.intp)
+    if k * capacity < n or k * min_size > n:
+        raise ValueError(
+            f"Cannot split {n} points into {k} clusters of size {min_size}-{capacity}"
+        )
+
+    medoids = _seed_medoids(distances, k, seed)
+    labels = _assign_with_capacity(distances, medoids, capacity)
+
+    # Cheap capacitated assign/update rounds until the medoids settle
+    for _ in range(max_iter):
+        new_medoids = _update_medoids(distances, labels, k)
+        if new_medoids == medoids:
+            break
+        medoids = new_medoids
+        labels = _assign_with_capacity(distances, medoids, capacity)
+
+    # Then enforce the minimum size and polish with moves/swaps
+    for _ in range(max_iter):
+        labels = _refine_assignment(distances, labels, medoids, min_size, capacity)
+        new_medoids = _update_medoids(distances, labels, k)
+        if new_medoids == medoids:
+            break
+        medoids = new_medoids
+
+    return labels
+
+
+def cluster_size_bounds(num_points: int, num_clusters: int, style_max: int) -> tuple[int, int]:
+    """
+    Get the minimum and maximum cluster size for a trip.
+
+    The bounds are the even share of points per day with one stop of slack on
+    each side for geography. The upper slack only applies while it stays
+    within the travel style's daily maximum, and the lower slack only once
+    days have at least three stops, so no day is left with a single stop.
+
+    Args:
+        num_points: Number of locations
+        num_clusters: Number of days
+        style_max: Maximum stops per day for the travel style
+
+    Returns:
+        Tuple of (minimum size, maximum size)
+    """
+    num_clusters = max(1, num_clusters)
+    upper_share = max(1, math.ceil(num_points / num_clusters))
+    lower_share = num_points // num_clusters
+    capacity = max(upper_share, min(style_max, upper_share + 1))
+    if num_points < num_clusters:
+        min_size = 0
+    else:
+        min_size = max(1, lower_share - 1 if lower_share > 2 else lower_share)
+    return min_size, capacity
@@ -2,8 +2,8 @@
 LangGraph definition for the Travel Planner agent.
 """
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 
+from .checkpointer import create_checkpointer
 from .state import TravelPlannerState
 from .nodes import (
     location_discovery_node,
@@ -30,7 +30,7 @@ def create_travel_planner_graph() -> StateGraph:
     7. validation -> itinerary_generator (if failed) or END (if passed)
 
     Returns:
-        Compiled StateGraph with MemorySaver checkpointer
+        Compiled StateGraph with the configured checkpointer
     """
     # Create the graph with our state schema
     graph = StateGraph(TravelPlannerState)
@@ -103,8 +103,8 @@ def create_travel_planner_graph() -> StateGraph:
     return compiled_graph
 
 
-# Create the MemorySaver instance for checkpointing
-memory = MemorySaver()
+# Create the checkpointer selected by CHECKPOINTER_BACKEND
+memory = create_checkpointer()
 
 # Export singleton graph instance
 travel_planner_graph = create_travel_planner_graph()
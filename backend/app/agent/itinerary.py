@@ -1,13 +1,21 @@
 """
 Simple itinerary generator without complex graph logic.
 """
+import asyncio
 import json
 import math
+
+import numpy as np
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from ..config import settings
-from ..services.google_maps import GoogleMapsService
+from .clustering import balanced_kmedoids, cluster_size_bounds
+from .distance import DistanceMatrix, build_distance_matrix
+from .route_solver import path_cost, solve_day_route
+from ..services.google_maps import GoogleMapsService, get_google_maps_service
+from ..services.metrics import ITINERARY_STAGE_METRICS
+from .callbacks import LLMMetricsCallback
 
 
 ITINERARY_PROMPT = """You are a travel itinerary optimizer. Create a day-by-day itinerary from the given locations.
@@ -18,6 +26,7 @@ Locations have been pre-grouped by geographic proximity:
 Trip Details:
 - Duration: {num_days} days
 - Style: {travel_style}
+- User notes: {notes}
 
 Rules:
 - Respect the geographic clusters when assigning locations to days
@@ -27,6 +36,7 @@ Rules:
 - For "packed" style: 4-5 locations per day
 - Each location must appear exactly once
 - You may split large clusters across days if needed
+- Honor the user notes and any per-location notes when grouping and ordering
 
 Return a JSON object with this exact structure:
 {{
@@ -46,35 +56,29 @@ Return a JSON object with this exact structure:
 
 IMPORTANT: Return ONLY the JSON object, no other text."""
 
+# Maximum stops per day for each travel style (matches ITINERARY_PROMPT rules)
+STYLE_MAX_STOPS_PER_DAY = {"relaxed": 3, "balanced": 4, "packed": 5}
 
-def _haversine_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """
-    Calculate the great circle distance between two points in kilometers.
-    """
-    R = 6371  # Earth's radius in km
-
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlng / 2) ** 2
-    c = 2 * math.asin(math.sqrt(a))
-
-    return R * c
+# Travel minutes assumed for a pair with neither a measured nor estimated duration
+_UNKNOWN_LEG_COST = 1e6
 
 
 def _cluster_locations_by_proximity(
     locations: list[dict],
-    num_clusters: int
+    num_clusters: int,
+    travel_style: str = "balanced",
+    matrix: DistanceMatrix | None = None
 ) -> list[list[dict]]:
     """
     Group locations into clusters by geographic proximity.
-    Uses a simple k-means-like approach based on distance from center.
+    Uses capacity-balanced k-medoids on the shared distance matrix, with the
+    cluster size capped by the travel style's stops per day.
 
     Args:
-        locations: List of location dictionaries with lat, lng
+        locations: List of location dictionaries with id, lat, lng
         num_clusters: Target number of clusters (typically num_days)
+        travel_style: Travel style used to cap the cluster size
+        matrix: Shared distance matrix (built if not given)
 
     Returns:
         List of clusters, each containing a list of locations
@@ -85,33 +89,34 @@ def _cluster_locations_by_proximity(
     if num_clusters <= 0:
         return [locations]
 
-    # Calculate center point
-    avg_lat = sum(loc['lat'] for loc in locations) / len(locations)
-    avg_lng = sum(loc['lng'] for loc in locations) / len(locations)
-
-    # Calculate distance and angle from center for each location
-    location_data = []
-    for loc in locations:
-        dist = _haversine_distance(avg_lat, avg_lng, loc['lat'], loc['lng'])
-        angle = math.atan2(loc['lng'] - avg_lng, loc['lat'] - avg_lat)
-        location_data.append({
-            'location': loc,
-            'distance': dist,
-            'angle': angle,
-        })
+    if matrix is None or matrix.ids != [loc["id"] for loc in locations]:
+        matrix = _build_location_matrix(locations)
 
-    # Sort by angle to group geographically close locations
-    location_data.sort(key=lambda x: x['angle'])
+    min_size, capacity = cluster_size_bounds(
+        len(locations),
+        num_clusters,
+        STYLE_MAX_STOPS_PER_DAY.get(travel_style, STYLE_MAX_STOPS_PER_DAY["balanced"]),
+    )
+    labels = balanced_kmedoids(matrix.distance_km, num_clusters, capacity, min_size)
 
-    # Divide into clusters
     clusters: list[list[dict]] = [[] for _ in range(num_clusters)]
-    for i, data in enumerate(location_data):
-        cluster_idx = i * num_clusters // len(location_data)
-        clusters[cluster_idx].append(data['location'])
+    for loc, label in zip(locations, labels):
+        clusters[label].append(loc)
 
     # Remove empty clusters
     clusters = [c for c in clusters if c]
 
+    # Order days by angle around the trip centroid so consecutive days sweep across the city
+    avg_lat = sum(loc['lat'] for loc in locations) / len(locations)
+    avg_lng = sum(loc['lng'] for loc in locations) / len(locations)
+
+    def cluster_angle(cluster: list[dict]) -> float:
+        lat = sum(loc['lat'] for loc in cluster) / len(cluster)
+        lng = sum(loc['lng'] for loc in cluster) / len(cluster)
+        return math.atan2(lng - avg_lng, lat - avg_lat)
+
+    clusters.sort(key=cluster_angle)
+
     return clusters
 
 
@@ -132,23 +137,57 @@ def _format_cluster_info(clusters: list[list[dict]]) -> str:
     """Format cluster information for the LLM prompt."""
     lines = []
     for i, cluster in enumerate(clusters):
-        location_names = [f"  - {loc['name']} (id: {loc['id']})" for loc in cluster]
+        location_names = [
+            f"  - {loc['name']} (id: {loc['id']})"
+            + (f" - note: {loc['user_note']}" if loc.get("user_note") else "")
+            for loc in cluster
+        ]
         lines.append(f"Cluster {i + 1} ({len(cluster)} locations):")
         lines.extend(location_names)
         lines.append("")
     return "\n".join(lines)
 
 
+def _build_location_matrix(locations: list[dict], mode: str = "driving") -> DistanceMatrix:
+    """Build the shared distance/duration estimate matrix for a set of locations."""
+    return build_distance_matrix(
+        [loc for loc in locations if "id" in loc],
+        mode=mode,
+        speed_kmh=settings.ESTIMATE_SPEED_KMH,
+    )
+
+
+def _needs_llm(locations: list[dict], notes: str | None) -> bool:
+    """Check whether free-text user notes need LLM interpretation."""
+    if notes and notes.strip():
+        return True
+    return any((loc.get("user_note") or "").strip() for loc in locations)
+
+
 async def generate_itinerary_simple(
     locations: list[dict],
     num_days: int,
     travel_style: str,
+    mode: str | None = None,
+    notes: str | None = None,
 ) -> tuple[dict, list[str]]:
     """
-    Generate an itinerary from locations using a single LLM call.
+    Generate an itinerary from locations.
+
+    Modes:
+    - "llm": a single LLM call assigns the pre-clustered locations to days
+    - "solver": days come straight from the balanced clusters, no LLM call
+    - "auto": "llm" only when trip or location notes need interpretation
 
     This is a simplified version that doesn't use the complex graph.
 
+    Args:
+        locations: Final location dictionaries with id, name, lat, lng
+        num_days: Number of trip days
+        travel_style: Travel style (relaxed, balanced, packed)
+        mode: Generation mode (defaults to ITINERARY_GENERATION_MODE)
+        notes: Free-text trip notes from the user
+
     Returns:
         Tuple of (itinerary dict, list of route warnings)
     """
@@ -161,20 +200,38 @@ async def generate_itinerary_simple(
             "validation_notes": ["No locations provided"],
         }, route_warnings
 
+    mode = mode or settings.ITINERARY_GENERATION_MODE
+    if mode == "auto":
+        mode = "llm" if _needs_llm(locations, notes) else "solver"
+
+    with ITINERARY_STAGE_METRICS.track("cluster"):
+        # One shared pairwise distance/duration matrix for every later stage
+        matrix = _build_location_matrix(locations)
+
+        # Pre-cluster locations by geographic proximity
+        clusters = _cluster_locations_by_proximity(locations, num_days, travel_style, matrix)
+
+    if mode == "solver":
+        with ITINERARY_STAGE_METRICS.track("solver"):
+            itinerary = _create_solver_itinerary(locations, num_days, clusters, matrix)
+        itinerary, route_warnings = await _enrich_itinerary_with_routes(itinerary, locations, matrix)
+        itinerary["generation_mode"] = "solver"
+        return itinerary, route_warnings
+
     llm = ChatOpenAI(
         model="gpt-4o",
         temperature=0.3,
         api_key=settings.OPENAI_API_KEY,
+        callbacks=[LLMMetricsCallback("gpt-4o")],
     )
 
-    # Pre-cluster locations by geographic proximity
-    clusters = _cluster_locations_by_proximity(locations, num_days)
     cluster_info = _format_cluster_info(clusters)
 
     prompt = ITINERARY_PROMPT.format(
         cluster_info=cluster_info,
         num_days=num_days,
         travel_style=travel_style,
+        notes=notes or "None",
     )
 
     messages = [
@@ -183,7 +240,8 @@ async def generate_itinerary_simple(
     ]
 
     try:
-        response = await llm.ainvoke(messages)
+        with ITINERARY_STAGE_METRICS.track("llm"):
+            response = await llm.ainvoke(messages)
         content = response.content
 
         # Parse JSON from response
@@ -197,16 +255,18 @@ async def generate_itinerary_simple(
             itinerary = _validate_itinerary(itinerary, locations, num_days)
 
             # Enrich with real route data (polylines, actual travel times)
-            itinerary, route_warnings = await _enrich_itinerary_with_routes(itinerary, locations)
+            itinerary, route_warnings = await _enrich_itinerary_with_routes(itinerary, locations, matrix)
+            itinerary["generation_mode"] = "llm"
 
             return itinerary, route_warnings
     except Exception as e:
         print(f"Error generating itinerary: {e}")
 
     # Fallback: create a simple itinerary using clusters
-    fallback = _create_fallback_itinerary(locations, num_days, clusters)
+    fallback = _create_fallback_itinerary(locations, num_days, clusters, travel_style, matrix)
     # Still try to enrich fallback with routes
-    fallback, route_warnings = await _enrich_itinerary_with_routes(fallback, locations)
+    fallback, route_warnings = await _enrich_itinerary_with_routes(fallback, locations, matrix)
+    fallback["generation_mode"] = "fallback"
     return fallback, route_warnings
 
 
@@ -233,74 +293,78 @@ def _validate_itinerary(itinerary: dict, locations: list[dict], num_days: int) -
     return itinerary
 
 
-def _create_fallback_itinerary(
-    locations: list[dict],
+def _assign_clusters_to_days(
+    clusters: list[list[dict]],
     num_days: int,
-    clusters: list[list[dict]] | None = None
-) -> dict:
-    """Create a simple fallback itinerary distributing locations across days."""
+    matrix: DistanceMatrix
+) -> list[dict]:
+    """Turn clusters into day plans, one cluster per day, with estimated travel times."""
     days = []
-
-    if clusters and len(clusters) > 0:
-        # Use pre-computed clusters
-        day_num = 0
-        for cluster in clusters:
-            day_num += 1
-            if day_num > num_days:
-                # Add remaining locations to last day
-                days[-1]["locations"].extend([loc["id"] for loc in cluster])
-            else:
-                travel_times = []
-                for i in range(len(cluster) - 1):
-                    travel_times.append({
-                        "from_location_id": cluster[i]["id"],
-                        "to_location_id": cluster[i + 1]["id"],
-                        "duration_minutes": 20,
-                        "distance_km": 3.0,
-                    })
-
-                days.append({
-                    "day_number": day_num,
-                    "locations": [loc["id"] for loc in cluster],
-                    "travel_times": travel_times,
-                    "route_optimized": False,
-                })
-
-        # Fill remaining days if fewer clusters than days
-        while len(days) < num_days:
-            days.append({
-                "day_number": len(days) + 1,
-                "locations": [],
-                "travel_times": [],
-                "route_optimized": False,
-            })
-    else:
-        # Original simple distribution
-        locations_per_day = max(1, len(locations) // num_days)
-
-        for day_num in range(1, num_days + 1):
-            start_idx = (day_num - 1) * locations_per_day
-            end_idx = start_idx + locations_per_day if day_num < num_days else len(locations)
-            day_locations = locations[start_idx:end_idx]
-
-            travel_times = []
-            for i in range(len(day_locations) - 1):
-                travel_times.append({
-                    "from_location_id": day_locations[i]["id"],
-                    "to_location_id": day_locations[i + 1]["id"],
-                    "duration_minutes": 20,
-                    "distance_km": 3.0,
-                })
-
+    day_num = 0
+    for cluster in clusters:
+        day_num += 1
+        if day_num > num_days:
+            # Add remaining locations to last day
+            days[-1]["locations"].extend([loc["id"] for loc in cluster])
+            days[-1]["travel_times"] = _estimate_travel_times(days[-1]["locations"], matrix)
+        else:
+            location_ids = [loc["id"] for loc in cluster]
             days.append({
                 "day_number": day_num,
-                "locations": [loc["id"] for loc in day_locations],
-                "travel_times": travel_times,
+                "locations": location_ids,
+                "travel_times": _estimate_travel_times(location_ids, matrix),
                 "route_optimized": False,
             })
 
+    # Fill remaining days if fewer clusters than days
+    while len(days) < num_days:
+        days.append({
+            "day_number": len(days) + 1,
+            "locations": [],
+            "travel_times": [],
+            "route_optimized": False,
+        })
+
+    return days
+
+
+def _create_solver_itinerary(
+    locations: list[dict],
+    num_days: int,
+    clusters: list[list[dict]],
+    matrix: DistanceMatrix
+) -> dict:
+    """
+    Create an itinerary deterministically, without an LLM call.
+
+    The balanced clusters already respect the per-style day sizes, so each
+    cluster becomes a day, and the route solver orders each day's stops from
+    the estimate matrix (route enrichment refines this with real travel times).
+    """
+    days = _assign_clusters_to_days(clusters, num_days, matrix)
+    for day in days:
+        day["locations"] = _optimize_day_order_tsp(day["locations"], matrix, [])
+        day["travel_times"] = _estimate_travel_times(day["locations"], matrix)
+
+    itinerary = {"days": days}
+    return _validate_itinerary(itinerary, locations, num_days)
+
+
+def _create_fallback_itinerary(
+    locations: list[dict],
+    num_days: int,
+    clusters: list[list[dict]] | None = None,
+    travel_style: str = "balanced",
+    matrix: DistanceMatrix | None = None
+) -> dict:
+    """Create a simple fallback itinerary assigning one balanced cluster per day."""
+    if matrix is None:
+        matrix = _build_location_matrix(locations)
+    if not clusters:
+        clusters = _cluster_locations_by_proximity(locations, num_days, travel_style, matrix)
+
     return {
-        "days": days,
+        "days": _assign_clusters_to_days(clusters, num_days, matrix),
         "total_locations": len(locations),
         "validation_notes": ["Generated using simple distribution"],
     }
@@ -308,17 +372,22 @@ def _create_fallback_itinerary(
 
 def _optimize_day_order_tsp(
     location_ids: list[str],
-    locations_lookup: dict[str, dict],
-    travel_times: list[dict]
+    matrix: DistanceMatrix,
+    travel_times: list[dict],
+    cost_matrix: dict[tuple[str, str], float] | None = None
 ) -> list[str]:
     """
     Reorder locations within a day to minimize total travel time.
-    Uses nearest neighbor heuristic for O(n^2) performance.
+
+    Uses the solver selected by ROUTE_SOLVER (see route_solver.py): exact
+    Held-Karp for small days, 2-opt/Or-opt local search for larger ones.
 
     Args:
         location_ids: List of location IDs in current order
-        locations_lookup: Dict mapping location ID to location data
+        matrix: Shared distance matrix used for estimates of missing pairs
         travel_times: List of travel time segments with duration info
+        cost_matrix: Optional directed pairwise travel minutes keyed by
+            (from_id, to_id); takes precedence over travel_times
 
     Returns:
         Optimized order of location IDs
@@ -326,80 +395,320 @@ def _optimize_day_order_tsp(
     if len(location_ids) <= 2:
         return location_ids
 
-    # Build a distance matrix from travel times (or use haversine if not available)
-    n = len(location_ids)
-    distances: dict[tuple[str, str], float] = {}
+    # Build a distance matrix from travel times (or use estimates if not available)
+    distances: dict[tuple[str, str], float] = dict(cost_matrix or {})
 
     # First populate from travel_times if available
     for segment in travel_times:
         from_id = segment.get("from_location_id")
         to_id = segment.get("to_location_id")
         duration = segment.get("duration_minutes", 0)
-        if from_id and to_id:
+        if from_id and to_id and (from_id, to_id) not in distances:
             distances[(from_id, to_id)] = duration
-            distances[(to_id, from_id)] = duration  # Assume bidirectional
+            distances.setdefault((to_id, from_id), duration)  # Assume bidirectional
 
-    # Fill in missing distances using haversine
+    # Fill in missing distances from the shared estimate matrix
     for i, id1 in enumerate(location_ids):
         for j, id2 in enumerate(location_ids):
-            if i != j and (id1, id2) not in distances:
-                loc1 = locations_lookup.get(id1, {})
-                loc2 = locations_lookup.get(id2, {})
-                if loc1 and loc2:
-                    # Estimate travel time from distance (assume 30 km/h average in city)
-                    dist_km = _haversine_distance(
-                        loc1.get('lat', 0), loc1.get('lng', 0),
-                        loc2.get('lat', 0), loc2.get('lng', 0)
-                    )
-                    estimated_minutes = dist_km * 2  # Rough estimate
-                    distances[(id1, id2)] = estimated_minutes
-                    distances[(id2, id1)] = estimated_minutes
-
-    # Nearest neighbor algorithm starting from first location
-    visited = {location_ids[0]}
-    optimized_order = [location_ids[0]]
-
-    while len(optimized_order) < n:
-        current = optimized_order[-1]
-        best_next = None
-        best_distance = float('inf')
-
-        for loc_id in location_ids:
-            if loc_id not in visited:
-                dist = distances.get((current, loc_id), float('inf'))
-                if dist < best_distance:
-                    best_distance = dist
-                    best_next = loc_id
-
-        if best_next:
-            optimized_order.append(best_next)
-            visited.add(best_next)
+            if i != j and (id1, id2) not in distances and id1 in matrix and id2 in matrix:
+                distances[(id1, id2)] = matrix.duration(id1, id2)
+
+    # Dense cost matrix for the solver; pairs without any estimate are heavily penalized
+    cost = np.array([
+        [0.0 if id1 == id2 else distances.get((id1, id2), _UNKNOWN_LEG_COST) for id2 in location_ids]
+        for id1 in location_ids
+    ])
+
+    order = solve_day_route(
+        cost,
+        solver=settings.ROUTE_SOLVER,
+        start=0 if settings.ROUTE_SOLVER_FIX_START else None,
+        exact_max_stops=settings.ROUTE_SOLVER_EXACT_MAX_STOPS,
+        time_budget_ms=settings.ROUTE_SOLVER_TIME_BUDGET_MS,
+    )
+
+    # Keep the current order unless the solver strictly improves on it
+    if path_cost(cost, order) >= path_cost(cost, list(range(len(location_ids)))) - 1e-9:
+        return location_ids
+
+    return [location_ids[i] for i in order]
+
+
+def _estimate_travel_times(
+    location_ids: list[str],
+    matrix: DistanceMatrix
+) -> list[dict]:
+    """
+    Build placeholder travel segments from straight-line distance estimates.
+
+    Used when the Directions API fails or times out for a day.
+    """
+    estimated_travel_times = []
+    for i in range(len(location_ids) - 1):
+        from_id = location_ids[i]
+        to_id = location_ids[i + 1]
+
+        if from_id in matrix and to_id in matrix:
+            dist_km = matrix.distance(from_id, to_id)
+            estimated_minutes = round(matrix.duration(from_id, to_id))
         else:
-            # Shouldn't happen, but add remaining in original order
-            for loc_id in location_ids:
-                if loc_id not in visited:
-                    optimized_order.append(loc_id)
-                    visited.add(loc_id)
+            dist_km = 3.0
+            estimated_minutes = 20
+
+        estimated_travel_times.append({
+            "from_location_id": from_id,
+            "to_location_id": to_id,
+            "duration_minutes": estimated_minutes,
+            "distance_km": round(dist_km, 1),
+            "polyline": None,  # No polyline for estimates
+        })
+
+    return estimated_travel_times
+
+
+def _legs_to_travel_times(legs: list[dict], location_ids: list[str]) -> list[dict]:
+    """Convert Directions API legs into travel segments between consecutive locations."""
+    travel_times = []
+    for i, leg in enumerate(legs):
+        if i >= len(location_ids) - 1:
             break
 
-    return optimized_order
+        duration_seconds = leg.get("duration_seconds") or 0
+        distance_meters = leg.get("distance_meters") or 0
+
+        travel_times.append({
+            "from_location_id": location_ids[i],
+            "to_location_id": location_ids[i + 1],
+            "duration_minutes": round(duration_seconds / 60),
+            "distance_km": round(distance_meters / 1000, 1),
+            "polyline": leg.get("polyline"),
+        })
+
+    return travel_times
+
+
+def _new_route_metrics() -> dict[str, int]:
+    """Create the Maps call counters reported alongside an enriched itinerary."""
+    return {
+        "directions_calls": 0,
+        "distance_matrix_calls": 0,
+        "directions_calls_saved": 0,
+        "travel_time_cache_hits": 0,
+    }
+
+
+async def _fetch_day_legs(
+    maps_service: GoogleMapsService,
+    coords: list[str],
+    metrics: dict[str, int],
+) -> list[dict]:
+    """Fetch legs for an ordered list of "lat,lng" stops, reusing stored legs."""
+    legs, from_store = await maps_service.route_legs(coords, mode="driving")
+    if from_store:
+        metrics["directions_calls_saved"] += 1
+        metrics["travel_time_cache_hits"] += 1
+    else:
+        metrics["directions_calls"] += 1
+    return legs
+
+
+async def _build_day_cost_matrix(
+    location_ids: list[str],
+    location_lookup: dict[str, dict],
+    maps_service: GoogleMapsService,
+    metrics: dict[str, int],
+) -> dict[tuple[str, str], float]:
+    """
+    Get pairwise travel minutes between a day's stops before routing.
+
+    Uses a (tiled) Distance Matrix lookup when ROUTE_COST_MATRIX_SOURCE is
+    "distance_matrix". Missing cells (or any API failure) are left out so the
+    optimizer falls back to haversine estimates for them.
+
+    Returns:
+        Directed travel minutes keyed by (from_id, to_id)
+    """
+    cost_matrix: dict[tuple[str, str], float] = {}
+    if settings.ROUTE_COST_MATRIX_SOURCE != "distance_matrix":
+        return cost_matrix
+
+    coords = [
+        f"{location_lookup[loc_id]['lat']},{location_lookup[loc_id]['lng']}"
+        for loc_id in location_ids
+    ]
+
+    try:
+        matrix = await maps_service.distance_matrix_tiled(
+            coords, coords, mode="driving", skip=lambda i, j: i == j
+        )
+        metrics["distance_matrix_calls"] += matrix["requests"]
+    except Exception as e:
+        print(f"Distance Matrix failed, using estimates: {e}")
+        return cost_matrix
+
+    for i, row in enumerate(matrix.get("rows", [])):
+        for j, cell in enumerate(row):
+            duration_seconds = cell.get("duration_seconds")
+            if i != j and duration_seconds is not None:
+                cost_matrix[(location_ids[i], location_ids[j])] = duration_seconds / 60
+
+    return cost_matrix
+
+
+async def _route_day_optimize_first(
+    day: dict,
+    location_ids: list[str],
+    location_lookup: dict[str, dict],
+    matrix: DistanceMatrix,
+    maps_service: GoogleMapsService,
+    metrics: dict[str, int],
+) -> None:
+    """
+    Order a day's stops from an up-front cost matrix, then route once.
+
+    Makes exactly one Directions call for the final order, instead of routing
+    the LLM order first and re-fetching when the optimizer changes it.
+    """
+    cost_matrix = await _build_day_cost_matrix(
+        location_ids, location_lookup, maps_service, metrics
+    )
+    optimized_order = _optimize_day_order_tsp(
+        location_ids, matrix, [], cost_matrix=cost_matrix
+    )
+    order_changed = optimized_order != location_ids
+
+    coords = [
+        f"{location_lookup[loc_id]['lat']},{location_lookup[loc_id]['lng']}"
+        for loc_id in optimized_order
+    ]
+    legs = await _fetch_day_legs(maps_service, coords, metrics)
+
+    day["locations"] = optimized_order
+    day["route_optimized"] = order_changed
+    day["travel_times"] = _legs_to_travel_times(legs, optimized_order)
+    if order_changed:
+        # The directions-first flow would have routed this day twice
+        metrics["directions_calls_saved"] += 1
+
+
+async def _enrich_day_with_routes(
+    day: dict,
+    location_lookup: dict[str, dict],
+    matrix: DistanceMatrix,
+    maps_service: GoogleMapsService,
+    metrics: dict[str, int],
+) -> list[str]:
+    """
+    Enrich a single day with real route data, optimizing stop order when possible.
+
+    Mutates the day in place, updates the shared Maps call counters and
+    returns any warnings for it.
+    """
+    warnings: list[str] = []
+
+    day_location_ids = day.get("locations", [])
+    if len(day_location_ids) < 2:
+        day["route_optimized"] = False
+        return warnings
 
+    # Get coordinates for all locations in order
+    day_coords = []
+    valid_location_ids = []
+    for loc_id in day_location_ids:
+        loc = location_lookup.get(loc_id)
+        if loc:
+            day_coords.append(f"{loc['lat']},{loc['lng']}")
+            valid_location_ids.append(loc_id)
 
+    if len(day_coords) < 2:
+        day["route_optimized"] = False
+        return warnings
+
+    try:
+        if settings.ROUTE_OPTIMIZATION_MODE == "optimize_first" and len(valid_location_ids) >= 3:
+            await _route_day_optimize_first(
+                day, valid_location_ids, location_lookup, matrix, maps_service, metrics
+            )
+            return warnings
+
+        # First pass: get initial routes
+        legs = await _fetch_day_legs(maps_service, day_coords, metrics)
+        initial_travel_times = _legs_to_travel_times(legs, valid_location_ids)
+
+        # Apply TSP optimization if we have enough locations
+        if len(valid_location_ids) >= 3:
+            optimized_order = _optimize_day_order_tsp(
+                valid_location_ids,
+                matrix,
+                initial_travel_times
+            )
+
+            # Check if order changed
+            if optimized_order != valid_location_ids:
+                # Re-fetch routes with optimized order
+                optimized_coords = [
+                    f"{location_lookup[loc_id]['lat']},{location_lookup[loc_id]['lng']}"
+                    for loc_id in optimized_order
+                ]
+
+                try:
+                    optimized_legs = await _fetch_day_legs(maps_service, optimized_coords, metrics)
+
+                    # Update day with optimized order
+                    day["locations"] = optimized_order
+                    day["route_optimized"] = True
+                    day["travel_times"] = _legs_to_travel_times(optimized_legs, optimized_order)
+                except Exception as e:
+                    # Failed to get optimized routes, use initial
+                    day["travel_times"] = initial_travel_times
+                    day["route_optimized"] = False
+                    warnings.append(f"Could not optimize routes for Day {day.get('day_number')}: {str(e)}")
+            else:
+                # Order didn't change
+                day["travel_times"] = initial_travel_times
+                day["route_optimized"] = False
+        else:
+            # Not enough locations to optimize
+            day["travel_times"] = initial_travel_times
+            day["route_optimized"] = False
+
+    except Exception as e:
+        warnings.append(f"Could not fetch routes for Day {day.get('day_number')}: {str(e)}")
+        day["route_optimized"] = False
+        # Keep placeholder travel_times with estimates
+        day["travel_times"] = _estimate_travel_times(valid_location_ids, matrix)
+
+    return warnings
+
+
+@ITINERARY_STAGE_METRICS.wrap("route_enrichment")
 async def _enrich_itinerary_with_routes(
     itinerary: dict,
-    locations: list[dict]
+    locations: list[dict],
+    matrix: DistanceMatrix | None = None
 ) -> tuple[dict, list[str]]:
     """
     Enrich itinerary with real route data from Google Directions API.
 
-    For each day:
+    Days are enriched concurrently (bounded by ROUTE_ENRICHMENT_CONCURRENCY),
+    so latency scales with the slowest day rather than the sum of all days.
+
+    With ROUTE_OPTIMIZATION_MODE "optimize_first" (default), each day with 3+
+    stops is ordered from an up-front cost matrix and then routed with one
+    Directions call. With "directions_first", each day:
     1. Fetches initial directions between locations
     2. Applies TSP optimization to minimize travel time
     3. Re-fetches routes if order changed
 
+    Maps call counts are stored under itinerary["route_metrics"].
+
+    A day that exceeds ROUTE_ENRICHMENT_DAY_TIMEOUT falls back to estimated
+    travel times. Warnings are returned in day order.
+
     Args:
         itinerary: The generated itinerary with day structure
         locations: List of location dictionaries with id, lat, lng
+        matrix: Shared distance matrix for estimates (built if not given)
 
     Returns:
         Tuple of (enriched itinerary, list of warnings)
@@ -410,164 +719,241 @@ async def _enrich_itinerary_with_routes(
         warnings.append("Google Maps API key not configured - using estimated travel times")
         return itinerary, warnings
 
-    maps_service = GoogleMapsService(settings.GOOGLE_MAPS_API_KEY)
+    maps_service = get_google_maps_service()
 
     # Build location lookup by ID
     location_lookup = {loc["id"]: loc for loc in locations}
+    if matrix is None:
+        matrix = _build_location_matrix(locations)
+
+    semaphore = asyncio.Semaphore(max(1, settings.ROUTE_ENRICHMENT_CONCURRENCY))
+    metrics = _new_route_metrics()
+
+    async def enrich_day(day: dict) -> list[str]:
+        """Enrich one day under the concurrency limit and timeout."""
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    _enrich_day_with_routes(day, location_lookup, matrix, maps_service, metrics),
+                    timeout=settings.ROUTE_ENRICHMENT_DAY_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                day["route_optimized"] = False
+                day["travel_times"] = _estimate_travel_times(
+                    [loc_id for loc_id in day.get("locations", []) if loc_id in location_lookup],
+                    matrix,
+                )
+                return [f"Timed out fetching routes for Day {day.get('day_number')} - using estimated travel times"]
 
-    for day in itinerary.get("days", []):
-        day_location_ids = day.get("locations", [])
-        if len(day_location_ids) < 2:
-            day["route_optimized"] = False
-            continue
+    # gather() preserves input order, so warnings stay sorted by day
+    day_warnings = await asyncio.gather(
+        *[enrich_day(day) for day in itinerary.get("days", [])]
+    )
+    for day_warning_list in day_warnings:
+        warnings.extend(day_warning_list)
 
-        # Get coordinates for all locations in order
-        day_coords = []
-        valid_location_ids = []
-        for loc_id in day_location_ids:
-            loc = location_lookup.get(loc_id)
-            if loc:
-                day_coords.append(f"{loc['lat']},{loc['lng']}")
-                valid_location_ids.append(loc_id)
+    itinerary["route_metrics"] = metrics
 
-        if len(day_coords) < 2:
-            day["route_optimized"] = False
+    return itinerary, warnings
+
+
+def _cheapest_insertion(
+    days: list[dict],
+    loc_id: str,
+    matrix: DistanceMatrix,
+    max_stops: int,
+) -> tuple[int, int]:
+    """
+    Find the day and position where adding a stop costs the least extra travel.
+
+    Days already at the travel style's maximum are only used when every day is full.
+
+    Returns:
+        Tuple of (day index, insert position)
+    """
+    best: tuple[bool, float, int, int] | None = None
+    for day_index, day in enumerate(days):
+        stops = [s for s in day.get("locations", []) if s in matrix]
+        full = len(stops) >= max_stops
+        if not stops:
+            candidates = [(0, 0.0)]
+        else:
+            candidates = [
+                (0, matrix.duration(loc_id, stops[0])),
+                (len(stops), matrix.duration(stops[-1], loc_id)),
+            ]
+            for i in range(1, len(stops)):
+                a, b = stops[i - 1], stops[i]
+                extra = matrix.duration(a, loc_id) + matrix.duration(loc_id, b) - matrix.duration(a, b)
+                candidates.append((i, extra))
+        for position, extra in candidates:
+            option = (full, extra, day_index, position)
+            if best is None or option < best:
+                best = option
+
+    _, _, day_index, position = best
+    # Map the position among known stops back to the day's full location list
+    known = [s for s in days[day_index].get("locations", []) if s in matrix]
+    if position < len(known):
+        position = days[day_index]["locations"].index(known[position])
+    else:
+        position = len(days[day_index].get("locations", []))
+    return day_index, position
+
+
+async def _patch_day_legs(
+    day: dict,
+    old_segments: dict[tuple[str, str], dict],
+    location_lookup: dict[str, dict],
+    matrix: DistanceMatrix,
+    maps_service: GoogleMapsService | None,
+    metrics: dict[str, int],
+) -> list[str]:
+    """
+    Rebuild a day's travel segments, routing only legs that did not exist before.
+
+    Consecutive new legs are routed together with one call; unchanged legs
+    keep their existing duration, distance and polyline.
+    """
+    stops = [loc_id for loc_id in day.get("locations", []) if loc_id in location_lookup]
+    pairs = list(zip(stops, stops[1:]))
+    segments: list[dict | None] = [old_segments.get(pair) for pair in pairs]
+
+    # Group missing legs into runs of consecutive stops
+    runs: list[tuple[int, int]] = []
+    for i, segment in enumerate(segments):
+        if segment is not None:
             continue
+        if runs and runs[-1][1] == i:
+            runs[-1] = (runs[-1][0], i + 1)
+        else:
+            runs.append((i, i + 1))
 
-        try:
-            # First pass: get initial routes
-            origin = day_coords[0]
-            destination = day_coords[-1]
-            waypoints = day_coords[1:-1] if len(day_coords) > 2 else None
-
-            directions = await maps_service.get_directions(
-                origin=origin,
-                destination=destination,
-                waypoints=waypoints,
-                mode="driving"
-            )
+    warnings: list[str] = []
+    for start, end in runs:
+        run_stops = stops[start:end + 1]
+        fetched = None
+        if maps_service is not None:
+            coords = [
+                f"{location_lookup[loc_id]['lat']},{location_lookup[loc_id]['lng']}"
+                for loc_id in run_stops
+            ]
+            try:
+                legs = await _fetch_day_legs(maps_service, coords, metrics)
+                if len(legs) == len(run_stops) - 1:
+                    fetched = _legs_to_travel_times(legs, run_stops)
+            except Exception as e:
+                warnings.append(f"Could not fetch routes for Day {day.get('day_number')}: {str(e)}")
+        if fetched is None:
+            fetched = _estimate_travel_times(run_stops, matrix)
+        segments[start:end] = fetched
+
+    day["travel_times"] = segments
+    return warnings
+
+
+async def update_itinerary_incremental(
+    itinerary: dict,
+    previous_locations: list[dict],
+    locations: list[dict],
+    travel_style: str,
+    max_changes: int | None = None,
+) -> tuple[dict, list[str]] | None:
+    """
+    Patch a previously generated itinerary for a small set of location edits.
 
-            legs = directions.get("legs", [])
-
-            # Build initial travel_times
-            initial_travel_times = []
-            for i, leg in enumerate(legs):
-                if i >= len(valid_location_ids) - 1:
-                    break
-
-                from_id = valid_location_ids[i]
-                to_id = valid_location_ids[i + 1]
-
-                duration_seconds = leg.get("duration_seconds") or 0
-                distance_meters = leg.get("distance_meters") or 0
-
-                initial_travel_times.append({
-                    "from_location_id": from_id,
-                    "to_location_id": to_id,
-                    "duration_minutes": round(duration_seconds / 60),
-                    "distance_km": round(distance_meters / 1000, 1),
-                    "polyline": leg.get("polyline"),
-                })
-
-            # Apply TSP optimization if we have enough locations
-            if len(valid_location_ids) >= 3:
-                optimized_order = _optimize_day_order_tsp(
-                    valid_location_ids,
-                    location_lookup,
-                    initial_travel_times
-                )
+    Removed stops are spliced out of their day (one new leg joins their
+    neighbours), and added stops go into the day and position with the
+    cheapest insertion cost; stops whose coordinates changed are both.
+    Only legs that did not exist before are routed, so unchanged days make
+    no Maps calls at all. Edited user notes can change the whole plan, so
+    they always fall back to full regeneration.
 
-                # Check if order changed
-                if optimized_order != valid_location_ids:
-                    # Re-fetch routes with optimized order
-                    optimized_coords = [
-                        f"{location_lookup[loc_id]['lat']},{location_lookup[loc_id]['lng']}"
-                        for loc_id in optimized_order
-                    ]
-
-                    origin = optimized_coords[0]
-                    destination = optimized_coords[-1]
-                    waypoints = optimized_coords[1:-1] if len(optimized_coords) > 2 else None
-
-                    try:
-                        optimized_directions = await maps_service.get_directions(
-                            origin=origin,
-                            destination=destination,
-                            waypoints=waypoints,
-                            mode="driving"
-                        )
-
-                        optimized_legs = optimized_directions.get("legs", [])
-
-                        # Update day with optimized order
-                        day["locations"] = optimized_order
-                        day["route_optimized"] = True
-
-                        # Build new travel_times
-                        new_travel_times = []
-                        for i, leg in enumerate(optimized_legs):
-                            if i >= len(optimized_order) - 1:
-                                break
-
-                            from_id = optimized_order[i]
-                            to_id = optimized_order[i + 1]
-
-                            duration_seconds = leg.get("duration_seconds") or 0
-                            distance_meters = leg.get("distance_meters") or 0
-
-                            new_travel_times.append({
-                                "from_location_id": from_id,
-                                "to_location_id": to_id,
-                                "duration_minutes": round(duration_seconds / 60),
-                                "distance_km": round(distance_meters / 1000, 1),
-                                "polyline": leg.get("polyline"),
-                            })
-
-                        day["travel_times"] = new_travel_times
-                    except Exception as e:
-                        # Failed to get optimized routes, use initial
-                        day["travel_times"] = initial_travel_times
-                        day["route_optimized"] = False
-                        warnings.append(f"Could not optimize routes for Day {day.get('day_number')}: {str(e)}")
-                else:
-                    # Order didn't change
-                    day["travel_times"] = initial_travel_times
-                    day["route_optimized"] = False
-            else:
-                # Not enough locations to optimize
-                day["travel_times"] = initial_travel_times
-                day["route_optimized"] = False
+    Args:
+        itinerary: The last generated itinerary (with routed travel_times)
+        previous_locations: Locations the itinerary was generated from
+        locations: The new final locations
+        travel_style: Travel style (relaxed, balanced, packed)
+        max_changes: Largest number of removed + added stops to patch
+            (defaults to ITINERARY_INCREMENTAL_MAX_CHANGES)
 
-        except Exception as e:
-            warnings.append(f"Could not fetch routes for Day {day.get('day_number')}: {str(e)}")
+    Returns:
+        Tuple of (patched itinerary, route warnings), or None when the edit
+        is too large (or changes notes) and the itinerary should be
+        regenerated from scratch
+    """
+    if max_changes is None:
+        max_changes = settings.ITINERARY_INCREMENTAL_MAX_CHANGES
+
+    previous_lookup = {loc["id"]: loc for loc in previous_locations}
+    location_lookup = {loc["id"]: loc for loc in locations}
+    kept_ids = [loc_id for loc_id in location_lookup if loc_id in previous_lookup]
+
+    # Notes steer day assignment and ordering, so an edited note means regenerating
+    if any(
+        (location_lookup[loc_id].get("user_note") or "").strip()
+        != (previous_lookup[loc_id].get("user_note") or "").strip()
+        for loc_id in kept_ids
+    ):
+        return None
+
+    # A stop whose coordinates changed is re-placed like a removal plus an addition
+    moved_ids = {
+        loc_id for loc_id in kept_ids
+        if (location_lookup[loc_id].get("lat"), location_lookup[loc_id].get("lng"))
+        != (previous_lookup[loc_id].get("lat"), previous_lookup[loc_id].get("lng"))
+    }
+    removed_ids = (set(previous_lookup) - set(location_lookup)) | moved_ids
+    added_ids = [
+        loc["id"] for loc in locations
+        if loc["id"] not in previous_lookup or loc["id"] in moved_ids
+    ]
+    if len(removed_ids) + len(added_ids) > max_changes or not itinerary.get("days"):
+        return None
+
+    patched = json.loads(json.dumps(itinerary))
+    days = patched["days"]
+    matrix = _build_location_matrix(locations)
+    old_segments = [
+        {
+            (s["from_location_id"], s["to_location_id"]): s
+            for s in day.get("travel_times", [])
+            if s["from_location_id"] not in moved_ids and s["to_location_id"] not in moved_ids
+        }
+        for day in days
+    ]
+
+    touched: set[int] = set()
+    for day_index, day in enumerate(days):
+        kept = [loc_id for loc_id in day.get("locations", []) if loc_id not in removed_ids]
+        if len(kept) != len(day.get("locations", [])):
+            day["locations"] = kept
+            touched.add(day_index)
+
+    max_stops = STYLE_MAX_STOPS_PER_DAY.get(travel_style, STYLE_MAX_STOPS_PER_DAY["balanced"])
+    for loc_id in added_ids:
+        day_index, position = _cheapest_insertion(days, loc_id, matrix, max_stops)
+        days[day_index]["locations"].insert(position, loc_id)
+        touched.add(day_index)
+
+    metrics = _new_route_metrics()
+    metrics["days_patched"] = len(touched)
+    maps_service = get_google_maps_service() if settings.GOOGLE_MAPS_API_KEY else None
+
+    day_warnings = await asyncio.gather(*[
+        _patch_day_legs(days[i], old_segments[i], location_lookup, matrix, maps_service, metrics)
+        for i in sorted(touched)
+    ])
+    warnings = [w for day_warning_list in day_warnings for w in day_warning_list]
+    if maps_service is None and touched:
+        warnings.append("Google Maps API key not configured - using estimated travel times")
+
+    for day_index, day in enumerate(days):
+        # Patched days are not re-solved, so their order is no longer optimized
+        if day_index in touched or len(day.get("locations", [])) < 2:
             day["route_optimized"] = False
-            # Keep placeholder travel_times with estimates
-            estimated_travel_times = []
-            for i in range(len(valid_location_ids) - 1):
-                from_id = valid_location_ids[i]
-                to_id = valid_location_ids[i + 1]
-
-                loc1 = location_lookup.get(from_id, {})
-                loc2 = location_lookup.get(to_id, {})
-
-                if loc1 and loc2:
-                    dist_km = _haversine_distance(
-                        loc1.get('lat', 0), loc1.get('lng', 0),
-                        loc2.get('lat', 0), loc2.get('lng', 0)
-                    )
-                    estimated_minutes = round(dist_km * 2)  # Rough estimate
-                else:
-                    dist_km = 3.0
-                    estimated_minutes = 20
-
-                estimated_travel_times.append({
-                    "from_location_id": from_id,
-                    "to_location_id": to_id,
-                    "duration_minutes": estimated_minutes,
-                    "distance_km": round(dist_km, 1),
-                    "polyline": None,  # No polyline for estimates
-                })
-
-            day["travel_times"] = estimated_travel_times
 
-    return itinerary, warnings
+    patched = _validate_itinerary(patched, locations, len(days))
+    patched["route_metrics"] = metrics
+    patched["generation_mode"] = "incremental"
+    return patched, warnings
@@ -0,0 +1,337 @@
+"""
+Background discovery jobs for trip planning sessions.
+
+Location discovery runs the agent's search/tool loop for 15-20 seconds. In
+job mode /api/trip/start returns the thread_id right away and the discovery
+run happens here, in a bounded pool of concurrent workers. Each job records
+node-level progress and partial candidate locations from astream_events so
+clients can poll the trip state or follow a Server-Sent Events stream.
+
+Jobs live in the process that started them; the graph state itself is in
+the shared checkpointer, so polling GET /api/trip/{thread_id} works from
+any worker once discovery has written its first checkpoint.
+"""
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from ..config import settings
+
+# Graph nodes reported as progress events
+PROGRESS_NODES = ("location_discovery", "tool_executor", "itinerary_generator", "validation")
+
+# Tools whose results contain candidate places
+CANDIDATE_TOOLS = ("search_places", "get_place_details")
+
+TERMINAL_EVENTS = ("complete", "failed")
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many discovery jobs are already queued or running."""
+
+
+class DiscoveryJob:
+    """Status, progress log and partial candidates of one discovery run."""
+
+    def __init__(self, thread_id: str) -> None:
+        """
+        Initialize a pending job.
+
+        Args:
+            thread_id: Trip session the job runs discovery for
+        """
+        self.thread_id = thread_id
+        self.status = "pending"
+        self.error: str | None = None
+        self.current_node: str | None = None
+        self.events: list[dict[str, Any]] = []
+        self.candidates: dict[str, dict[str, Any]] = {}
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished (successfully or not)."""
+        return self.status in ("complete", "failed")
+
+    def publish(self, event: dict[str, Any]) -> None:
+        """Record an event and deliver it to every live subscriber."""
+        event = {"seq": len(self.events), "timestamp": round(time.time(), 3), **event}
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    async def subscribe(
+        self,
+        heartbeat: float | None = None,
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        Stream the job's events, replaying earlier ones first.
+
+        Args:
+            heartbeat: Seconds of silence after which None is yielded, so
+                streaming callers can send keep-alives
+
+        Yields:
+            Event dictionaries (or None on a heartbeat) until the job completes or fails
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # Snapshot and register without awaiting in between so no event is missed
+        backlog = list(self.events)
+        self._subscribers.add(queue)
+        try:
+            for event in backlog:
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            self._subscribers.discard(queue)
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Get a JSON-serializable status summary for polling clients.
+
+        Returns:
+            Dictionary with status, current node, error, counts and timestamps
+        """
+        return {
+            "status": self.status,
+            "current_node": self.current_node,
+            "error": self.error,
+            "candidates_found": len(self.candidates),
+            "events": len(self.events),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def _extract_candidates(output: Any, place_id: str | None = None) -> list[dict[str, Any]]:
+    """
+    Pull place-like dictionaries (with a place_id or coordinates) out of a tool/node output.
+
+    Args:
+        output: Tool result or location_discovery node output
+        place_id: ID of the place the output describes, for payloads that do
+            not carry one (get_place_details results)
+
+    Returns:
+        Candidate dictionaries with id, place_id, name, lat and lng
+    """
+    if isinstance(output, dict) and "draft_locations" in output:
+        output = output["draft_locations"]
+    items = output if isinstance(output, list) else [output]
+
+    candidates = []
+    for item in items:
+        if not isinstance(item, dict) or "error" in item or not item.get("name"):
+            continue
+        item_place_id = item.get("place_id") or place_id
+        if not (item_place_id or item.get("id")) or "lat" not in item:
+            continue
+        candidates.append({
+            "id": item.get("id") or item_place_id,
+            "place_id": item_place_id,
+            "name": item["name"],
+            "lat": item.get("lat"),
+            "lng": item.get("lng"),
+        })
+    return candidates
+
+
+class DiscoveryJobManager:
+    """
+    Runs discovery jobs in a bounded pool and keeps recent jobs for polling.
+
+    At most `max_workers` graph runs execute concurrently; further jobs wait
+    their turn, and submissions beyond `max_pending` queued or running jobs
+    are rejected.
+    """
+
+    def __init__(
+        self,
+        graph: Any,
+        max_workers: int = 4,
+        max_pending: int = 100,
+        retention_seconds: float = 3600.0,
+    ) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            graph: Compiled LangGraph to run (must support astream_events)
+            max_workers: Maximum concurrent discovery runs
+            max_pending: Maximum jobs queued or running at once
+            retention_seconds: How long finished jobs stay available for polling
+        """
+        self.graph = graph
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._workers = asyncio.Semaphore(max_workers)
+        self._jobs: dict[str, DiscoveryJob] = {}
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention_seconds
+        stale = [
+            thread_id for thread_id, job in self._jobs.items()
+            if job.done and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for thread_id in stale:
+            del self._jobs[thread_id]
+
+    def active_count(self) -> int:
+        """Get the number of queued or running jobs."""
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def get(self, thread_id: str) -> DiscoveryJob | None:
+        """
+        Look up a job by thread ID.
+
+        Args:
+            thread_id: Trip session ID
+
+        Returns:
+            The job, or None if this process has no record of it
+        """
+        return self._jobs.get(thread_id)
+
+    def submit(self, thread_id: str, initial_state: dict[str, Any]) -> DiscoveryJob:
+        """
+        Queue a discovery run for a new thread.
+
+        Args:
+            thread_id: Trip session ID
+            initial_state: Initial graph state
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobQueueFullError: If max_pending jobs are already queued or running
+        """
+        self._prune()
+        if self.active_count() >= self.max_pending:
+            raise JobQueueFullError(
+                f"Too many trips are being planned right now ({self.max_pending}); try again shortly"
+            )
+
+        job = DiscoveryJob(thread_id)
+        self._jobs[thread_id] = job
+        job.publish({"type": "queued"})
+        job.task = asyncio.create_task(self._run(job, initial_state))
+        return job
+
+    async def _run(self, job: DiscoveryJob, initial_state: dict[str, Any]) -> None:
+        """Run discovery for a job, translating graph events into job events."""
+        config = {"configurable": {"thread_id": job.thread_id}}
+
+        async with self._workers:
+            job.status = "running"
+            job.publish({"type": "started"})
+            try:
+                async for event in self.graph.astream_events(initial_state, config, version="v2"):
+                    self._handle_graph_event(job, event)
+
+                snapshot = await self.graph.aget_state(config)
+                draft_locations = snapshot.values.get("draft_locations", []) if snapshot else []
+                job.status = "complete"
+                job.current_node = None
+                job.finished_at = time.time()
+                job.publish({"type": "complete", "locations": draft_locations})
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Discovery was cancelled"
+                job.finished_at = time.time()
+                job.publish({"type": "failed", "error": job.error})
+                raise
+            except Exception as e:
+                print(f"Discovery job {job.thread_id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = time.time()
+                job.publish({"type": "failed", "error": job.error})
+
+    def _handle_graph_event(self, job: DiscoveryJob, event: dict[str, Any]) -> None:
+        """Translate one astream_events (v2) event into progress/candidate events."""
+        kind = event.get("event")
+        name = event.get("name")
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if name in PROGRESS_NODES and node == name:
+            if kind == "on_chain_start":
+                job.current_node = name
+                job.publish({"type": "node_start", "node": name})
+            elif kind == "on_chain_end":
+                job.publish({"type": "node_end", "node": name})
+                if name == "location_discovery":
+                    self._publish_candidates(job, event.get("data", {}).get("output"))
+        elif kind == "on_tool_start":
+            job.publish({"type": "tool_start", "tool": name, "node": node})
+        elif kind == "on_tool_end":
+            job.publish({"type": "tool_end", "tool": name, "node": node})
+            if name in CANDIDATE_TOOLS:
+                data = event.get("data", {})
+                tool_input = data.get("input")
+                place_id = tool_input.get("place_id") if isinstance(tool_input, dict) else None
+                self._publish_candidates(job, data.get("output"), place_id)
+
+    def _publish_candidates(self, job: DiscoveryJob, output: Any, place_id: str | None = None) -> None:
+        """Publish candidates not seen before in this job."""
+        new = []
+        for candidate in _extract_candidates(output, place_id):
+            key = candidate["place_id"] or candidate["id"]
+            if key not in job.candidates:
+                job.candidates[key] = candidate
+                new.append(candidate)
+        if new:
+            job.publish({"type": "candidates", "candidates": new})
+
+    async def shutdown(self) -> None:
+        """Cancel unfinished jobs and wait for them to stop."""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_job_manager: DiscoveryJobManager | None = None
+
+
+def get_job_manager() -> DiscoveryJobManager:
+    """
+    Get the process-wide discovery job manager, creating it on first use.
+
+    Returns:
+        Shared DiscoveryJobManager running the travel planner graph
+    """
+    global _job_manager
+    if _job_manager is None:
+        from .graph import travel_planner_graph
+
+        _job_manager = DiscoveryJobManager(
+            travel_planner_graph,
+            max_workers=settings.TRIP_JOB_MAX_WORKERS,
+            max_pending=settings.TRIP_JOB_MAX_PENDING,
+            retention_seconds=settings.TRIP_JOB_RETENTION_SECONDS,
+        )
+    return _job_manager
+
+
+async def close_job_manager() -> None:
+    """Cancel running jobs and drop the shared manager."""
+    global _job_manager
+    if _job_manager is not None:
+        await _job_manager.shutdown()
+        _job_manager = None
@@ -10,6 +10,9 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 
 from ..config import settings
+from ..services.metrics import DISCOVERY_PROMPT_TOKENS, NODE_METRICS, TOOL_METRICS
+from ..services.serialization import dumps_text
+from .callbacks import LLMMetricsCallback
 from .state import TravelPlannerState
 from .prompts import (
     LOCATION_DISCOVERY_PROMPT,
@@ -26,6 +29,7 @@ def _get_llm(model: str = "gpt-4o") -> ChatOpenAI:
         model=model,
         temperature=0.7,
         api_key=settings.OPENAI_API_KEY,
+        callbacks=[LLMMetricsCallback(model)],
     )
 
 
@@ -76,17 +80,147 @@ def _parse_itinerary_from_response(content: str) -> dict | None:
     return None
 
 
-def _has_place_details_in_messages(messages: list) -> bool:
-    """Check if we already have place details results in the message history."""
+# Rough characters-per-token ratio for budget checks (actual counts come from the API)
+_CHARS_PER_TOKEN = 4
+# Fixed per-message overhead (role, separators) in the token estimate
+_MESSAGE_TOKEN_OVERHEAD = 4
+# Placeholder left in folded ToolMessages (each tool call still needs its result message)
+_FOLDED_TOOL_RESULT = "[folded into candidate table]"
+# Candidate fields carried into the folded table, in column order
+_CANDIDATE_FIELDS = ("name", "lat", "lng", "rating", "types", "formatted_address", "summary")
+
+
+def _compact_json(value: Any) -> str:
+    """Serialize a tool result compactly, dropping empty fields."""
+    def prune(item: Any) -> Any:
+        if isinstance(item, dict):
+            return {k: prune(v) for k, v in item.items() if v not in (None, "", [], {})}
+        if isinstance(item, list):
+            return [prune(v) for v in item]
+        return item
+
+    return dumps_text(prune(value))
+
+
+def _estimate_tokens(messages: list) -> int:
+    """Estimate the prompt tokens of a message list from its character count."""
+    chars = 0
     for msg in messages:
-        if isinstance(msg, ToolMessage):
-            content = msg.content
-            # Check if this looks like a place details result
-            if '"lat":' in content and '"lng":' in content and '"name":' in content:
-                return True
-    return False
+        content = msg.content if isinstance(msg.content, str) else dumps_text(msg.content)
+        chars += len(content)
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            chars += sum(len(tc["name"]) + len(dumps_text(tc["args"])) for tc in msg.tool_calls)
+    return chars // _CHARS_PER_TOKEN + _MESSAGE_TOKEN_OVERHEAD * len(messages)
+
+
+def _collect_candidates(
+    result: Any,
+    tool_name: str,
+    tool_args: dict,
+    table: dict[str, dict],
+) -> None:
+    """Merge place rows from a search or details result into the candidate table."""
+    if tool_name == "get_place_details" and isinstance(result, dict):
+        rows = [{**result, "place_id": tool_args.get("place_id")}]
+    elif tool_name == "search_places" and isinstance(result, list):
+        rows = result
+    else:
+        return
+
+    for row in rows:
+        if not isinstance(row, dict) or not row.get("place_id") or "error" in row:
+            continue
+        entry = table.setdefault(row["place_id"], {})
+        for field in _CANDIDATE_FIELDS:
+            if row.get(field) not in (None, "", []):
+                entry[field] = row[field]
+
+
+def _format_candidate_table(table: dict[str, dict]) -> str:
+    """Render the candidate table as one compact line per place."""
+    lines = ["Places found so far (place_id|" + "|".join(_CANDIDATE_FIELDS) + "):"]
+    for place_id, entry in table.items():
+        values = []
+        for field in _CANDIDATE_FIELDS:
+            value = entry.get(field, "")
+            if isinstance(value, list):
+                value = ",".join(str(v) for v in value[:3])
+            values.append(str(value).replace("|", "/").replace("\n", " "))
+        lines.append(f"{place_id}|" + "|".join(values))
+    return "\n".join(lines)
+
+
+def _compact_messages(messages: list, token_budget: int) -> tuple[list, dict[str, int]]:
+    """
+    Shrink the discovery conversation before sending it to the LLM.
+
+    Tool results from earlier rounds are folded into one deduplicated
+    candidate table keyed by place_id (their ToolMessages stay as short
+    placeholders so every tool call keeps a result). If the prompt is still
+    over the token budget, the latest round is folded too and remaining
+    web-search text is truncated.
+
+    Args:
+        messages: Full message list for the LLM call
+        token_budget: Target upper bound for the estimated prompt tokens
 
+    Returns:
+        Tuple of (compacted messages, stats with estimated token counts)
+    """
+    tokens_before = _estimate_tokens(messages)
+    tool_calls = {
+        tc["id"]: tc
+        for msg in messages if isinstance(msg, AIMessage)
+        for tc in msg.tool_calls
+    }
 
+    # ToolMessages after the last tool-calling AIMessage form the latest round
+    last_call_index = max(
+        (i for i, msg in enumerate(messages) if isinstance(msg, AIMessage) and msg.tool_calls),
+        default=-1,
+    )
+
+    def fold(keep_from: int) -> tuple[list, dict[str, dict], int]:
+        table: dict[str, dict] = {}
+        folded = 0
+        result = []
+        for i, msg in enumerate(messages):
+            if not isinstance(msg, ToolMessage) or i > keep_from:
+                result.append(msg)
+                continue
+            call = tool_calls.get(msg.tool_call_id, {})
+            try:
+                parsed = json.loads(msg.content)
+            except (TypeError, ValueError):
+                parsed = None
+            _collect_candidates(parsed, call.get("name", ""), call.get("args", {}), table)
+            if parsed is None:
+                # Web search text: keep a short excerpt
+                content = msg.content if len(msg.content) <= 300 else msg.content[:300] + "..."
+            else:
+                content = _FOLDED_TOOL_RESULT
+            result.append(ToolMessage(content=content, tool_call_id=msg.tool_call_id))
+            folded += 1
+        if table:
+            # Place the table right after the leading system prompt
+            insert_at = 1 if result and isinstance(result[0], SystemMessage) else 0
+            result.insert(insert_at, SystemMessage(content=_format_candidate_table(table)))
+        return result, table, folded
+
+    compacted, table, folded = fold(last_call_index)
+    if _estimate_tokens(compacted) > token_budget:
+        compacted, table, folded = fold(len(messages))
+
+    stats = {
+        "estimated_tokens_before": tokens_before,
+        "estimated_tokens": _estimate_tokens(compacted),
+        "folded_tool_messages": folded,
+        "candidates": len(table),
+    }
+    return compacted, stats
+
+
+@NODE_METRICS.wrap("location_discovery")
 async def location_discovery_node(state: TravelPlannerState) -> dict[str, Any]:
     """
     Discovers locations using LLM with tools.
@@ -105,10 +239,8 @@ async def location_discovery_node(state: TravelPlannerState) -> dict[str, Any]:
     style_multiplier = {"relaxed": 2.5, "balanced": 3.5, "packed": 4.5}
     num_locations = min(20, max(8, int(num_days * style_multiplier.get(travel_style, 3.5))))
 
-    # Check if we already have place details - if so, use mini for summarization
-    has_details = _has_place_details_in_messages(messages)
-
-    if has_details:
+    # Once place details have been fetched, use mini for summarization
+    if state.get("discovery_phase") == "summary":
         # Final summarization phase - use gpt-4o-mini with summary prompt
         llm = _get_llm(model="gpt-4o-mini")
 
@@ -122,6 +254,7 @@ async def location_discovery_node(state: TravelPlannerState) -> dict[str, Any]:
         messages = [msg for msg in messages if not isinstance(msg, SystemMessage)]
         messages.insert(0, SystemMessage(content=summary_prompt))
 
+        messages, compaction = _compact_messages(messages, settings.DISCOVERY_PROMPT_TOKEN_BUDGET)
         response = await llm.ainvoke(messages)
     else:
         # Discovery phase - use gpt-4o with tools
@@ -148,14 +281,26 @@ async def location_discovery_node(state: TravelPlannerState) -> dict[str, Any]:
                 content=f"Please find {num_locations} great locations for my trip to {trip_params.get('destination', 'the destination')}."
             ))
 
+        messages, compaction = _compact_messages(messages, settings.DISCOVERY_PROMPT_TOKEN_BUDGET)
         response = await llm_with_tools.ainvoke(messages)
 
+    # Record prompt size for this iteration (estimate before the call, actual from the API)
+    usage = getattr(response, "usage_metadata", None) or {}
+    token_report = {
+        "iteration": len(state.get("discovery_token_usage", [])) + 1,
+        "prompt_tokens": usage.get("input_tokens"),
+        **compaction,
+    }
+    DISCOVERY_PROMPT_TOKENS.labels("before_compaction").observe(compaction["estimated_tokens_before"])
+    DISCOVERY_PROMPT_TOKENS.labels("sent").observe(compaction["estimated_tokens"])
+
     # Check if the response contains tool calls
     if response.tool_calls:
         # Return with tool calls for the tool executor to handle
         return {
             "messages": [response],
             "draft_locations": state.get("draft_locations", []),
+            "discovery_token_usage": [token_report],
         }
 
     # No tool calls - the LLM has finished gathering information
@@ -169,6 +314,7 @@ async def location_discovery_node(state: TravelPlannerState) -> dict[str, Any]:
     return {
         "messages": [response],
         "draft_locations": draft_locations,
+        "discovery_token_usage": [token_report],
     }
 
 
@@ -188,6 +334,7 @@ def _trim_place_details(result: dict) -> dict:
     }
 
 
+@NODE_METRICS.wrap("tool_executor")
 async def tool_executor_node(state: TravelPlannerState) -> dict[str, Any]:
     """
     Executes tool calls from the LLM in parallel.
@@ -208,6 +355,9 @@ async def tool_executor_node(state: TravelPlannerState) -> dict[str, Any]:
     all_tools = LOCATION_DISCOVERY_TOOLS + ITINERARY_TOOLS
     tool_lookup = {tool.name: tool for tool in all_tools}
 
+    # Discovery progress from this round of tool calls
+    detailed_place_ids: list[str] = []
+
     async def execute_single_tool(tool_call: dict) -> ToolMessage:
         """Execute a single tool call and return the ToolMessage."""
         tool_name = tool_call["name"]
@@ -217,15 +367,18 @@ async def tool_executor_node(state: TravelPlannerState) -> dict[str, Any]:
         if tool_name in tool_lookup:
             tool = tool_lookup[tool_name]
             try:
-                result = await tool.ainvoke(tool_args)
+                with TOOL_METRICS.track(tool_name):
+                    result = await tool.ainvoke(tool_args)
 
                 # Trim place details to reduce token count
                 if tool_name == "get_place_details" and isinstance(result, dict):
+                    if "error" not in result and tool_args.get("place_id"):
+                        detailed_place_ids.append(tool_args["place_id"])
                     result = _trim_place_details(result)
 
-                # Convert result to string if needed
+                # Convert result to compact JSON if needed
                 if not isinstance(result, str):
-                    result = json.dumps(result, indent=2)
+                    result = _compact_json(result)
             except Exception as e:
                 result = f"Error executing tool {tool_name}: {str(e)}"
         else:
@@ -238,9 +391,17 @@ async def tool_executor_node(state: TravelPlannerState) -> dict[str, Any]:
         *[execute_single_tool(tc) for tc in last_message.tool_calls]
     )
 
-    return {"messages": list(tool_messages)}
+    update: dict[str, Any] = {
+        "messages": list(tool_messages),
+        "detailed_place_ids": detailed_place_ids,
+    }
+    # Switch discovery to summarization once any place details are available
+    if detailed_place_ids:
+        update["discovery_phase"] = "summary"
+    return update
 
 
+@NODE_METRICS.wrap("itinerary_generator")
 async def itinerary_generator_node(state: TravelPlannerState) -> dict[str, Any]:
     """
     Generates day-wise itinerary from approved locations.
@@ -260,7 +421,7 @@ async def itinerary_generator_node(state: TravelPlannerState) -> dict[str, Any]:
         }
 
     # Format locations for the prompt
-    locations_text = json.dumps(final_locations, indent=2)
+    locations_text = dumps_text(final_locations)
 
     system_prompt = ITINERARY_GENERATOR_PROMPT.format(
         locations=locations_text,
@@ -314,6 +475,7 @@ async def itinerary_generator_node(state: TravelPlannerState) -> dict[str, Any]:
     }
 
 
+@NODE_METRICS.wrap("validation")
 async def validation_node(state: TravelPlannerState) -> dict[str, Any]:
     """
     Validates the generated itinerary.
@@ -1,11 +1,23 @@
 """
 State schema for the Travel Planner LangGraph agent.
 """
+import operator
 from typing import TypedDict, Annotated
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 
 
+def merge_unique(left: list[str] | None, right: list[str] | None) -> list[str]:
+    """Reducer that appends new items to a list, skipping ones already present."""
+    merged = list(left or [])
+    seen = set(merged)
+    for item in right or []:
+        if item not in seen:
+            seen.add(item)
+            merged.append(item)
+    return merged
+
+
 class TravelPlannerState(TypedDict):
     """
     State schema for the travel planner graph.
@@ -19,6 +31,11 @@ class TravelPlannerState(TypedDict):
         final_itinerary: Post-validation itinerary ready for display
         validation_passed: Whether validation checks passed
         validation_errors: List of validation issues if any
+        discovery_phase: Active discovery phase ("search" or "summary")
+        detailed_place_ids: Place IDs whose details have been fetched
+        discovery_token_usage: Prompt token counts per location discovery iteration
+        generated_locations: Locations the last API-generated itinerary was built from
+        generated_itinerary: Last API-generated itinerary, patched by the next small edit
     """
     # Messages use the add_messages reducer for proper message handling
     messages: Annotated[list[AnyMessage], add_messages]
@@ -41,3 +58,15 @@ class TravelPlannerState(TypedDict):
     # Validation results
     validation_passed: bool
     validation_errors: list[str]
+
+    # Discovery progress (updated by tool_executor)
+    discovery_phase: str
+    detailed_place_ids: Annotated[list[str], merge_unique]
+
+    # Prompt size per discovery iteration (appended by location_discovery)
+    discovery_token_usage: Annotated[list[dict], operator.add]
+
+    # Last itinerary from POST /generate, kept apart from final_* so saving it
+    # does not move the thread out of the editing phase
+    generated_locations: list[dict]
+    generated_itinerary: dict | None
@@ -5,19 +5,29 @@ import httpx
 from langchain_core.tools import tool
 
 from ..config import settings
-from ..services.google_maps import GoogleMapsService
+from ..services.google_maps import GoogleMapsService, get_google_maps_service
+from ..services.governor import UpstreamGovernor, governor_from_settings
+from ..services.singleflight import SingleFlight
 
+# Identical concurrent Tavily searches share one upstream request
+_tavily_flight = SingleFlight()
+# Rate limit and retry policy for Tavily, created on first use
+_tavily_governor: UpstreamGovernor | None = None
 
-# Initialize Google Maps service
-_google_maps: GoogleMapsService | None = None
+
+def _get_tavily_governor() -> UpstreamGovernor | None:
+    """Get the shared Tavily governor (None when the governor is disabled)."""
+    global _tavily_governor
+    if _tavily_governor is None:
+        _tavily_governor = governor_from_settings(
+            "tavily", settings.TAVILY_REQUESTS_PER_SECOND, settings.TAVILY_MAX_CONCURRENCY
+        )
+    return _tavily_governor
 
 
 def _get_google_maps_service() -> GoogleMapsService:
-    """Get or create the Google Maps service instance."""
-    global _google_maps
-    if _google_maps is None:
-        _google_maps = GoogleMapsService(settings.GOOGLE_MAPS_API_KEY)
-    return _google_maps
+    """Get the shared Google Maps service instance."""
+    return get_google_maps_service()
 
 
 @tool
@@ -40,7 +50,10 @@ async def search_places(query: str, location: str) -> list[dict]:
     try:
         results = await google_maps.places_text_search(query, location)
         # Return top 10 results to avoid overwhelming the LLM
-        return results[:10]
+        results = results[:10]
+        # Details for the best of them are likely requested next turn
+        google_maps.prefetch_place_details(results)
+        return results
     except Exception as e:
         return [{"error": str(e)}]
 
@@ -87,7 +100,19 @@ async def tavily_search(query: str) -> str:
     if not settings.TAVILY_API_KEY:
         return "Tavily API key not configured. Unable to perform web search."
 
-    url = "https://api.tavily.com/search"
+    try:
+        if not settings.UPSTREAM_COALESCING_ENABLED:
+            return await _fetch_tavily_summary(query)
+        return await _tavily_flight.do(
+            query, lambda: _fetch_tavily_summary(query), namespace="tavily_search"
+        )
+    except Exception as e:
+        return f"Error performing web search: {str(e)}"
+
+
+async def _fetch_tavily_summary(query: str) -> str:
+    """Call the Tavily search API and summarize the top results."""
+    url = f"{settings.TAVILY_BASE_URL.rstrip('/')}/search"
     payload = {
         "api_key": settings.TAVILY_API_KEY,
         "query": query,
@@ -97,29 +122,42 @@ async def tavily_search(query: str) -> str:
         "max_results": 5,
     }
 
-    try:
-        async with httpx.AsyncClient() as client:
+    async with httpx.AsyncClient() as client:
+        async def attempt() -> dict:
             response = await client.post(url, json=payload, timeout=30.0)
             response.raise_for_status()
-            data = response.json()
+            return response.json()
 
-            # Build a summary from the results
-            answer = data.get("answer", "")
-            results = data.get("results", [])
+        governor = _get_tavily_governor()
+        data = await (governor.call(attempt) if governor is not None else attempt())
 
-            summary_parts = []
-            if answer:
-                summary_parts.append(f"Summary: {answer}")
+    # Build a summary from the results
+    answer = data.get("answer", "")
+    results = data.get("results", [])
 
-            for result in results[:3]:
-                title = result.get("title", "")
-                content = result.get("content", "")[:500]  # Truncate long content
-                summary_parts.append(f"\n- {title}: {content}")
+    summary_parts = []
+    if answer:
+        summary_parts.append(f"Summary: {answer}")
 
-            return "\n".join(summary_parts) if summary_parts else "No relevant results found."
+    for result in results[:3]:
+        title = result.get("title", "")
+        content = result.get("content", "")[:500]  # Truncate long content
+        summary_parts.append(f"\n- {title}: {content}")
 
-    except Exception as e:
-        return f"Error performing web search: {str(e)}"
+    return "\n".join(summary_parts) if summary_parts else "No relevant results found."
+
+
+def get_coalescing_stats() -> dict:
+    """
+    Get single-flight counters for upstream calls made by the agent tools.
+
+    Returns:
+        Dictionary with Google Maps (per endpoint path) and Tavily counters
+    """
+    return {
+        "google_maps": _get_google_maps_service().coalescing_stats(),
+        "tavily": _tavily_flight.stats(),
+    }
 
 
 @tool
@@ -143,7 +181,7 @@ async def get_distance_matrix(origins: list[str], destinations: list[str]) -> di
     google_maps = _get_google_maps_service()
 
     try:
-        return await google_maps.distance_matrix(origins, destinations)
+        return await google_maps.distance_matrix_tiled(origins, destinations)
     except Exception as e:
         return {"error": str(e)}
 
@@ -0,0 +1,39 @@
+"""Response classes that encode through app/services/serialization.py."""
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.services.serialization import dumps, encode_body, negotiate_media_type
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (the app's default response class)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiated_response(request: Request, model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Serialize a response model as JSON or MessagePack, per the request's Accept header.
+
+    Returning a Response skips FastAPI's re-validation of the already
+    validated model against response_model.
+
+    Args:
+        request: Incoming request
+        model: Response model to send
+        status_code: HTTP status code
+
+    Returns:
+        Encoded response
+    """
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    return Response(
+        content=encode_body(model.model_dump(mode="json"), media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
@@ -1,10 +1,12 @@
 """API routes for the Travel Planner."""
 
+import asyncio
 import uuid
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, TypeVar
 
 import httpx
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 
 from app.config import settings
 from app.api.schemas import (
@@ -18,12 +20,37 @@ from app.api.schemas import (
     DayPlan,
     Location,
     TravelSegment,
+    PolylineDetail,
+    POLYLINE_DETAIL_DESCRIPTION,
 )
-from app.agent.graph import travel_planner_graph, memory
-from app.agent.itinerary import generate_itinerary_simple
+from app.api.responses import negotiated_response
+from app.agent.jobs import JobQueueFullError, get_job_manager
+from app.services.google_maps import get_google_maps_service
+from app.services.serialization import dumps_text
 
 router = APIRouter(prefix="/api", tags=["trip"])
 
+T = TypeVar("T")
+
+# How often a waiting request checks whether its client has disconnected
+DISCONNECT_POLL_SECONDS = 0.05
+
+
+def get_planner_graph() -> Any:
+    """
+    Get the compiled travel planner graph.
+
+    The agent stack (LangGraph, LLM clients, checkpointer) is imported on
+    first use, normally by the startup warm-up, so importing the API module
+    stays cheap.
+
+    Returns:
+        Compiled LangGraph for trip planning
+    """
+    from app.agent.graph import travel_planner_graph
+
+    return travel_planner_graph
+
 
 def _convert_state_locations_to_schema(locations: list[dict]) -> list[Location]:
     """Convert raw location dicts from agent state to Location schema objects."""
@@ -42,9 +69,59 @@ def _convert_state_locations_to_schema(locations: list[dict]) -> list[Location]:
     return result
 
 
+async def _itinerary_at_polyline_detail(
+    itinerary: dict | None,
+    locations: list[dict],
+    detail: str,
+) -> dict | None:
+    """
+    Copy an itinerary with its travel segment polylines simplified to a detail tier.
+
+    Args:
+        itinerary: Raw itinerary dict from agent state
+        locations: Raw location dicts, used to find each leg's endpoints
+        detail: Requested polyline detail tier
+
+    Returns:
+        The itinerary itself for "full" detail, otherwise a copy
+    """
+    if not itinerary or detail == "full":
+        return itinerary
+
+    location_lookup = {loc.get("id"): loc for loc in locations}
+
+    def endpoint(loc_id: str | None) -> tuple[float, float] | None:
+        loc = location_lookup.get(loc_id)
+        if loc is None or loc.get("lat") is None or loc.get("lng") is None:
+            return None
+        return loc["lat"], loc["lng"]
+
+    days = []
+    segments = []
+    for day_data in itinerary.get("days", []):
+        day_segments = [dict(segment) for segment in day_data.get("travel_times", [])]
+        segments.extend(segment for segment in day_segments if segment.get("polyline"))
+        days.append({**day_data, "travel_times": day_segments})
+
+    polylines = await get_google_maps_service().leg_polylines_at_detail(
+        [
+            (
+                endpoint(segment.get("from_location_id")),
+                endpoint(segment.get("to_location_id")),
+                segment["polyline"],
+            )
+            for segment in segments
+        ],
+        detail,
+    )
+    for segment, encoded in zip(segments, polylines):
+        segment["polyline"] = encoded
+    return {**itinerary, "days": days}
+
+
 def _convert_state_itinerary_to_schema(
     itinerary: dict | None,
-    locations: list[dict]
+    locations: list[dict],
 ) -> Itinerary | None:
     """Convert raw itinerary dict from agent state to Itinerary schema object."""
     if not itinerary:
@@ -95,13 +172,31 @@ def _convert_state_itinerary_to_schema(
     )
 
 
+def _find_previous_location_id(location: dict, previous_locations: list[dict]) -> str | None:
+    """Reuse the ID a user-added location got in an earlier generation, if any."""
+    for previous in previous_locations:
+        if not previous.get("user_added"):
+            continue
+        if location.get("place_id") and previous.get("place_id") == location["place_id"]:
+            return previous.get("id")
+        if (
+            previous.get("name") == location.get("name")
+            and previous.get("lat") == location.get("lat")
+            and previous.get("lng") == location.get("lng")
+        ):
+            return previous.get("id")
+    return None
+
+
 @router.post("/trip/start", response_model=StartTripResponse)
-async def start_trip(request: StartTripRequest) -> StartTripResponse:
+async def start_trip(request: StartTripRequest, http_request: Request) -> Response:
     """
     Start a new trip planning session.
 
     Creates a new thread, runs the location discovery agent, and returns
-    suggested locations for the destination.
+    suggested locations for the destination. In background mode the thread_id
+    is returned immediately with status "pending"; poll GET /trip/{thread_id}
+    or follow GET /trip/{thread_id}/events for progress.
     """
     thread_id = str(uuid.uuid4())
 
@@ -121,15 +216,29 @@ async def start_trip(request: StartTripRequest) -> StartTripResponse:
         "final_itinerary": None,
         "validation_passed": False,
         "validation_errors": [],
+        "discovery_phase": "search",
+        "detailed_place_ids": [],
+        "generated_locations": [],
+        "generated_itinerary": None,
     }
 
+    background = request.background
+    if background is None:
+        background = settings.TRIP_START_BACKGROUND
+    if background:
+        try:
+            get_job_manager().submit(thread_id, initial_state)
+        except JobQueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return negotiated_response(http_request, StartTripResponse(thread_id=thread_id, status="pending"))
+
     # Config with thread_id for checkpointing
     config = {"configurable": {"thread_id": thread_id}}
 
     try:
         # Run the graph until it hits the interrupt (before itinerary_generator)
         # This will run location_discovery and its tool loops
-        result = await travel_planner_graph.ainvoke(initial_state, config)
+        result = await get_planner_graph().ainvoke(initial_state, config)
 
         # Extract draft locations from the result
         draft_locations = result.get("draft_locations", [])
@@ -137,10 +246,10 @@ async def start_trip(request: StartTripRequest) -> StartTripResponse:
         # Convert to schema objects
         locations = _convert_state_locations_to_schema(draft_locations)
 
-        return StartTripResponse(
+        return negotiated_response(http_request, StartTripResponse(
             thread_id=thread_id,
             locations=locations,
-        )
+        ))
 
     except Exception as e:
         raise HTTPException(
@@ -153,22 +262,30 @@ async def start_trip(request: StartTripRequest) -> StartTripResponse:
 async def generate_itinerary(
     thread_id: str,
     request: GenerateItineraryRequest,
-) -> GenerateItineraryResponse:
+    http_request: Request,
+    polyline_detail: PolylineDetail | None = Query(None, description=POLYLINE_DETAIL_DESCRIPTION),
+) -> Response:
     """
     Generate an itinerary from the current locations.
 
     Applies user edits (removed/added locations) and generates a day-wise itinerary.
+    When an itinerary was already generated for this thread and the edit is
+    small, only the affected days are patched and re-routed.
     """
+    from app.agent.itinerary import generate_itinerary_simple, update_itinerary_incremental
+
     config = {"configurable": {"thread_id": thread_id}}
 
     try:
         # Get current state from checkpointer
-        state_snapshot = travel_planner_graph.get_state(config)
+        state_snapshot = await get_planner_graph().aget_state(config)
         if not state_snapshot or not state_snapshot.values:
             raise HTTPException(status_code=404, detail="Trip session not found")
 
         current_state = state_snapshot.values
         trip_params = current_state.get("trip_params", {})
+        previous_itinerary = current_state.get("generated_itinerary")
+        previous_locations = current_state.get("generated_locations") or []
 
         # Get draft locations and apply edits to create final locations
         draft_locations = current_state.get("draft_locations", [])
@@ -187,19 +304,53 @@ async def generate_itinerary(
                 loc_dict = added_loc.model_dump()
                 loc_dict["user_added"] = True
                 if "id" not in loc_dict or not loc_dict["id"]:
-                    loc_dict["id"] = str(uuid.uuid4())
+                    loc_dict["id"] = _find_previous_location_id(
+                        loc_dict, previous_locations
+                    ) or str(uuid.uuid4())
                 final_locations.append(loc_dict)
 
-        # Use the simple itinerary generator
-        raw_itinerary, route_warnings = await generate_itinerary_simple(
-            locations=final_locations,
-            num_days=trip_params.get("num_days", 3),
-            travel_style=trip_params.get("travel_style", "balanced"),
+        raw_itinerary = None
+        route_warnings: list[str] = []
+        incremental = request.incremental
+        if incremental is None:
+            incremental = settings.ITINERARY_INCREMENTAL
+        if incremental and request.mode is None and previous_itinerary:
+            # Patch only the days touched by the edit since the last generation
+            patched = await update_itinerary_incremental(
+                previous_itinerary,
+                previous_locations,
+                final_locations,
+                travel_style=trip_params.get("travel_style", "balanced"),
+            )
+            if patched is not None:
+                raw_itinerary, route_warnings = patched
+
+        if raw_itinerary is None:
+            # Use the simple itinerary generator
+            raw_itinerary, route_warnings = await generate_itinerary_simple(
+                locations=final_locations,
+                num_days=trip_params.get("num_days", 3),
+                travel_style=trip_params.get("travel_style", "balanced"),
+                mode=request.mode,
+                notes=trip_params.get("additional_notes"),
+            )
+
+        # Keep the itinerary and its routes in thread state for the next edit.
+        # Writing as location_discovery keeps the thread paused at the HITL point,
+        # and the generated_* fields leave its phase unchanged.
+        await get_planner_graph().aupdate_state(
+            config,
+            {"generated_locations": final_locations, "generated_itinerary": raw_itinerary},
+            as_node="location_discovery",
         )
 
         # Convert to schema
         itinerary = _convert_state_itinerary_to_schema(
-            raw_itinerary,
+            await _itinerary_at_polyline_detail(
+                raw_itinerary,
+                final_locations,
+                polyline_detail or settings.POLYLINE_DEFAULT_DETAIL,
+            ),
             final_locations,
         )
 
@@ -210,10 +361,12 @@ async def generate_itinerary(
                 validation_notes=["Failed to generate itinerary"],
             )
 
-        return GenerateItineraryResponse(
+        return negotiated_response(http_request, GenerateItineraryResponse(
             itinerary=itinerary,
             route_warnings=route_warnings,
-        )
+            route_metrics=raw_itinerary.get("route_metrics", {}),
+            generation_mode=raw_itinerary.get("generation_mode"),
+        ))
 
     except HTTPException:
         raise
@@ -225,24 +378,39 @@ async def generate_itinerary(
 
 
 @router.get("/trip/{thread_id}", response_model=TripStateResponse)
-async def get_trip_state(thread_id: str) -> TripStateResponse:
+async def get_trip_state(
+    thread_id: str,
+    request: Request,
+    polyline_detail: PolylineDetail | None = Query(None, description=POLYLINE_DETAIL_DESCRIPTION),
+) -> Response:
     """
     Get the current state of a trip planning session.
 
     Returns the trip parameters, current locations, and itinerary (if generated).
     """
     config = {"configurable": {"thread_id": thread_id}}
+    job = get_job_manager().get(thread_id)
 
     try:
         # Get current state from checkpointer
-        state_snapshot = travel_planner_graph.get_state(config)
+        state_snapshot = await get_planner_graph().aget_state(config)
         if not state_snapshot or not state_snapshot.values:
-            raise HTTPException(status_code=404, detail="Trip session not found")
+            if job is None:
+                raise HTTPException(status_code=404, detail="Trip session not found")
+            # Background discovery has not written its first checkpoint yet (or failed before it)
+            phase = "error" if job.status == "failed" else "discovery"
+            return negotiated_response(
+                request, TripStateResponse(thread_id=thread_id, phase=phase, job=job.summary())
+            )
 
         current_state = state_snapshot.values
 
         # Determine current phase based on state
-        if current_state.get("final_itinerary"):
+        if job is not None and job.status == "failed":
+            phase = "error"
+        elif job is not None and not job.done:
+            phase = "discovery"
+        elif current_state.get("final_itinerary"):
             phase = "complete"
         elif current_state.get("final_locations"):
             phase = "generating"
@@ -255,17 +423,22 @@ async def get_trip_state(thread_id: str) -> TripStateResponse:
 
         # Get itinerary if available
         itinerary = _convert_state_itinerary_to_schema(
-            current_state.get("final_itinerary"),
+            await _itinerary_at_polyline_detail(
+                current_state.get("final_itinerary"),
+                locations_data,
+                polyline_detail or settings.POLYLINE_DEFAULT_DETAIL,
+            ),
             locations_data,
         )
 
-        return TripStateResponse(
+        return negotiated_response(request, TripStateResponse(
             thread_id=thread_id,
             phase=phase,
             trip_params=current_state.get("trip_params"),
             locations=locations,
             itinerary=itinerary,
-        )
+            job=job.summary() if job is not None else None,
+        ))
 
     except HTTPException:
         raise
@@ -276,14 +449,73 @@ async def get_trip_state(thread_id: str) -> TripStateResponse:
         )
 
 
+@router.get("/trip/{thread_id}/events")
+async def trip_events(thread_id: str) -> StreamingResponse:
+    """
+    Stream background discovery progress as Server-Sent Events.
+
+    Replays earlier events, then streams node progress ("node_start",
+    "node_end", "tool_start", "tool_end"), partial "candidates" and a final
+    "complete" (with the draft locations) or "failed" event.
+    """
+    job = get_job_manager().get(thread_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No discovery job for this trip session")
+
+    async def event_stream() -> AsyncIterator[str]:
+        async for event in job.subscribe(heartbeat=15.0):
+            if event is None:
+                # SSE comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {dumps_text(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a result, cancelling the work if the client disconnects first.
+
+    Args:
+        request: Incoming request to watch for disconnects
+        awaitable: Work to run on the client's behalf
+
+    Returns:
+        The awaited result
+
+    Raises:
+        HTTPException: 499 if the client went away before the result was ready
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @router.get("/places/autocomplete", response_model=PlaceAutocompleteResponse)
 async def places_autocomplete(
+    request: Request,
     input: str = Query(..., min_length=1, description="Search input for autocomplete"),
-) -> PlaceAutocompleteResponse:
+) -> Response:
     """
     Proxy for Google Places Autocomplete API.
 
     This endpoint keeps the Google API key server-side for security.
+    Predictions are served from a prefix-aware cache where possible,
+    identical concurrent inputs share one upstream call, and the upstream
+    call is dropped when the client aborts a superseded keystroke.
     """
     if not settings.GOOGLE_MAPS_API_KEY:
         raise HTTPException(
@@ -291,35 +523,27 @@ async def places_autocomplete(
             detail="Google Maps API key not configured",
         )
 
-    google_autocomplete_url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-
-    params = {
-        "input": input,
-        "key": settings.GOOGLE_MAPS_API_KEY,
-        "types": "(regions)",  # Allow cities, regions, countries, etc.
-    }
+    try:
+        predictions = await _cancel_on_disconnect(
+            request,
+            # Allow cities, regions, countries, etc.
+            get_google_maps_service().autocomplete_predictions(input, types="(regions)"),
+        )
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(google_autocomplete_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") not in ("OK", "ZERO_RESULTS"):
-                raise HTTPException(
-                    status_code=502,
-                    detail=f"Google Places API error: {data.get('status')}",
-                )
-
-            return PlaceAutocompleteResponse(
-                predictions=data.get("predictions", []),
-            )
+        return negotiated_response(request, PlaceAutocompleteResponse(
+            predictions=predictions,
+        ))
 
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=502,
-                detail=f"Failed to reach Google Places API: {str(e)}",
-            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=str(e),
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to reach Google Places API: {str(e)}",
+        )
 
 
 @router.get("/places/details")
@@ -337,39 +561,33 @@ async def place_details(
             detail="Google Maps API key not configured",
         )
 
-    google_details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-
     params = {
         "place_id": place_id,
-        "key": settings.GOOGLE_MAPS_API_KEY,
         "fields": "name,geometry,formatted_address",
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(google_details_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") != "OK":
-                raise HTTPException(
-                    status_code=502,
-                    detail=f"Google Places API error: {data.get('status')}",
-                )
-
-            result = data.get("result", {})
-            location = result.get("geometry", {}).get("location", {})
-
-            return {
-                "name": result.get("name", ""),
-                "lat": location.get("lat", 0),
-                "lng": location.get("lng", 0),
-                "place_id": place_id,
-                "formatted_address": result.get("formatted_address", ""),
-            }
-
-        except httpx.RequestError as e:
+    try:
+        data = await get_google_maps_service().get_json("place/details/json", params)
+
+        if data.get("status") != "OK":
             raise HTTPException(
                 status_code=502,
-                detail=f"Failed to reach Google Places API: {str(e)}",
+                detail=f"Google Places API error: {data.get('status')}",
             )
+
+        result = data.get("result", {})
+        location = result.get("geometry", {}).get("location", {})
+
+        return {
+            "name": result.get("name", ""),
+            "lat": location.get("lat", 0),
+            "lng": location.get("lng", 0),
+            "place_id": place_id,
+            "formatted_address": result.get("formatted_address", ""),
+        }
+
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to reach Google Places API: {str(e)}",
+        )
@@ -1,8 +1,15 @@
 """Pydantic models for API request/response validation."""
 
 from pydantic import BaseModel, Field
-from typing import Any
+from typing import Any, Literal
 
+# Route geometry tiers: the raw Directions polyline, or Douglas-Peucker simplified
+# to ~2 m (street), ~10 m (city) or ~40 m (overview)
+PolylineDetail = Literal["full", "street", "city", "overview"]
+POLYLINE_DETAIL_DESCRIPTION = (
+    "Route geometry detail: 'full', 'street', 'city' or 'overview' "
+    "(coarser tiers are simplified for zoomed-out maps); server default if omitted"
+)
 
 # ============================================================
 # Core Domain Models
@@ -49,7 +56,10 @@ class TravelSegment(BaseModel):
     to_location_id: str = Field(..., description="ID of the destination location")
     duration_minutes: int = Field(..., ge=0, description="Travel duration in minutes")
     distance_km: float = Field(..., ge=0, description="Travel distance in kilometers")
-    polyline: str | None = Field(default=None, description="Encoded polyline for the route")
+    polyline: str | None = Field(
+        default=None,
+        description="Encoded polyline for the route, at the requested detail tier",
+    )
 
 
 class DayPlan(BaseModel):
@@ -100,6 +110,11 @@ class StartTripRequest(BaseModel):
     """Request to start a new trip planning session."""
 
     trip_params: TripParameters = Field(..., description="Trip parameters")
+    background: bool | None = Field(
+        default=None,
+        description="Run discovery as a background job and return the thread_id immediately; "
+        "server default if omitted",
+    )
 
 
 class GenerateItineraryRequest(BaseModel):
@@ -108,6 +123,16 @@ class GenerateItineraryRequest(BaseModel):
     edits: LocationEditDiff | None = Field(
         default=None, description="Optional user edits to apply before generation"
     )
+    mode: Literal["llm", "solver", "auto"] | None = Field(
+        default=None,
+        description="Day assignment mode: 'llm', 'solver' (no LLM call) or 'auto' "
+        "(LLM only when user notes need interpretation); server default if omitted",
+    )
+    incremental: bool | None = Field(
+        default=None,
+        description="Patch the previous itinerary for small edits instead of regenerating; "
+        "server default if omitted (ignored when mode is set)",
+    )
 
 
 # ============================================================
@@ -122,6 +147,10 @@ class StartTripResponse(BaseModel):
     locations: list[Location] = Field(
         default_factory=list, description="Suggested locations for the trip"
     )
+    status: str = Field(
+        default="complete",
+        description="Discovery status: 'pending' for background jobs, otherwise 'complete'",
+    )
 
 
 class GenerateItineraryResponse(BaseModel):
@@ -132,6 +161,14 @@ class GenerateItineraryResponse(BaseModel):
         default_factory=list,
         description="Warnings about route calculation failures or estimates"
     )
+    route_metrics: dict[str, int] = Field(
+        default_factory=dict,
+        description="Google Maps call counts for route enrichment (including calls saved)"
+    )
+    generation_mode: str | None = Field(
+        default=None,
+        description="How days were assigned: 'llm', 'solver', 'fallback' or 'incremental'"
+    )
 
 
 class TripStateResponse(BaseModel):
@@ -139,7 +176,9 @@ class TripStateResponse(BaseModel):
 
     thread_id: str = Field(..., description="Unique identifier for this planning session")
     phase: str = Field(
-        ..., description="Current phase (e.g., 'locations', 'itinerary', 'completed')"
+        ...,
+        description="Current phase: 'discovery', 'editing', 'generating', 'complete', "
+        "or 'error' when background discovery failed (see job.error)",
     )
     trip_params: TripParameters | None = Field(
         default=None, description="Trip parameters if set"
@@ -150,6 +189,9 @@ class TripStateResponse(BaseModel):
     itinerary: Itinerary | None = Field(
         default=None, description="Generated itinerary if available"
     )
+    job: dict[str, Any] | None = Field(
+        default=None, description="Background discovery job status, if one ran in this worker"
+    )
 
 
 class PlaceAutocompleteResponse(BaseModel):
@@ -16,9 +16,130 @@ class Settings(BaseSettings):
     GOOGLE_MAPS_API_KEY: str = ""
     TAVILY_API_KEY: str = ""
 
+    # Upstream API base URLs (overridable to point at local stand-ins)
+    GOOGLE_MAPS_BASE_URL: str = "https://maps.googleapis.com/maps/api"
+    TAVILY_BASE_URL: str = "https://api.tavily.com"
+
     # Phoenix/Arize Observability
     PHOENIX_COLLECTOR_ENDPOINT: str = "http://localhost:6006"
 
+    # Google Maps HTTP client pool
+    MAPS_HTTP_MAX_CONNECTIONS: int = 100
+    MAPS_HTTP_MAX_KEEPALIVE: int = 20
+    MAPS_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    MAPS_HTTP2: bool = True
+
+    # Google Maps response cache (empty SQLite path keeps it in-process only)
+    MAPS_CACHE_ENABLED: bool = True
+    MAPS_CACHE_MAX_ENTRIES: int = 2048
+    MAPS_CACHE_SQLITE_PATH: str = ""
+    MAPS_CACHE_TTL_TEXT_SEARCH: float = 86400.0
+    MAPS_CACHE_TTL_PLACE_DETAILS: float = 604800.0
+
+    # Distance Matrix tiling: per-request limits, concurrent tiles and element rate limit
+    DISTANCE_MATRIX_MAX_ELEMENTS: int = 100
+    DISTANCE_MATRIX_MAX_DIMENSION: int = 25
+    DISTANCE_MATRIX_CONCURRENCY: int = 4
+    DISTANCE_MATRIX_ELEMENTS_PER_SECOND: float = 1000.0
+
+    # Pairwise travel-time store consulted before Distance Matrix/Directions
+    # (empty path uses backend/travel_times.db)
+    TRAVEL_TIME_CACHE_ENABLED: bool = True
+    TRAVEL_TIME_CACHE_PATH: str = ""
+    TRAVEL_TIME_CACHE_MAX_ENTRIES: int = 200000
+    TRAVEL_TIME_CACHE_MEMORY_ENTRIES: int = 4096
+    # Coordinates are rounded to this many decimals (4 is ~11 m)
+    TRAVEL_TIME_CACHE_PRECISION: int = 4
+    TRAVEL_TIME_CACHE_TTL: float = 604800.0
+
+    # Prefix-aware in-process cache for /api/places/autocomplete
+    AUTOCOMPLETE_CACHE_ENABLED: bool = True
+    AUTOCOMPLETE_CACHE_MAX_ENTRIES: int = 4096
+    AUTOCOMPLETE_CACHE_TTL: float = 3600.0
+
+    # Speculative place details prefetch for the top-rated search_places results
+    # (opt-in; fills the Maps response cache, so MAPS_CACHE_ENABLED is required)
+    PLACE_DETAILS_PREFETCH_ENABLED: bool = False
+    PLACE_DETAILS_PREFETCH_TOP_K: int = 5
+    PLACE_DETAILS_PREFETCH_CONCURRENCY: int = 4
+    PLACE_DETAILS_PREFETCH_MAX_PENDING: int = 50
+    # Prefetched details not requested within this many seconds count as wasted
+    PLACE_DETAILS_PREFETCH_WINDOW: float = 600.0
+
+    # Upstream governor for Google Maps and Tavily: request rate (0 disables),
+    # adaptive concurrency (halved on 429/OVER_QUERY_LIMIT, regrown on success)
+    # and jittered exponential-backoff retries within a retry budget
+    UPSTREAM_GOVERNOR_ENABLED: bool = True
+    MAPS_REQUESTS_PER_SECOND: float = 50.0
+    MAPS_MAX_CONCURRENCY: int = 32
+    TAVILY_REQUESTS_PER_SECOND: float = 5.0
+    TAVILY_MAX_CONCURRENCY: int = 4
+    UPSTREAM_MAX_RETRIES: int = 3
+    UPSTREAM_BACKOFF_BASE: float = 0.2
+    UPSTREAM_BACKOFF_MAX: float = 5.0
+    # Retries per window may not exceed this fraction of requests (beyond a small floor)
+    UPSTREAM_RETRY_BUDGET_RATIO: float = 0.2
+    UPSTREAM_RETRY_BUDGET_MIN: int = 10
+    UPSTREAM_RETRY_BUDGET_WINDOW: float = 10.0
+
+    # Share one upstream request between identical concurrent Maps/Tavily calls
+    UPSTREAM_COALESCING_ENABLED: bool = True
+
+    # Itinerary generation: "llm", "solver" (no LLM call) or "auto" (LLM only for user notes)
+    ITINERARY_GENERATION_MODE: str = "auto"
+
+    # Patch the previous itinerary for small location edits instead of regenerating
+    ITINERARY_INCREMENTAL: bool = True
+    ITINERARY_INCREMENTAL_MAX_CHANGES: int = 5
+
+    # Itinerary route enrichment
+    ROUTE_ENRICHMENT_CONCURRENCY: int = 4
+    ROUTE_ENRICHMENT_DAY_TIMEOUT: float = 20.0
+    # "optimize_first" orders stops before routing; "directions_first" is the legacy two-pass flow
+    ROUTE_OPTIMIZATION_MODE: str = "optimize_first"
+    # "distance_matrix" or "haversine" (estimates only, no extra API call)
+    ROUTE_COST_MATRIX_SOURCE: str = "distance_matrix"
+    # Day-route solver: "auto", "held_karp", "local_search" or "nearest_neighbor"
+    ROUTE_SOLVER: str = "auto"
+    ROUTE_SOLVER_EXACT_MAX_STOPS: int = 12
+    ROUTE_SOLVER_TIME_BUDGET_MS: float = 50.0
+    # Keep the LLM's first stop of each day in place instead of choosing the best start
+    ROUTE_SOLVER_FIX_START: bool = False
+    # Per-mode speed overrides (km/h) for straight-line travel time estimates
+    ESTIMATE_SPEED_KMH: dict[str, float] = {}
+
+    # Graph checkpointing: "sqlite" (shared by workers, survives restarts) or "memory"
+    CHECKPOINTER_BACKEND: str = "sqlite"
+    # Empty path uses backend/checkpoints.db
+    CHECKPOINTER_SQLITE_PATH: str = ""
+    CHECKPOINT_MAX_PER_THREAD: int = 10
+    # Threads not read or written for longer than this are deleted (0 disables expiry)
+    CHECKPOINT_TTL_SECONDS: float = 86400.0
+    # Reads refresh a thread's last access at most this often (seconds)
+    CHECKPOINT_READ_TOUCH_INTERVAL: float = 60.0
+    CHECKPOINT_COMPRESSION_LEVEL: int = 6
+
+    # Background discovery jobs for /api/trip/start (background=true or TRIP_START_BACKGROUND)
+    TRIP_START_BACKGROUND: bool = False
+    TRIP_JOB_MAX_WORKERS: int = 4
+    TRIP_JOB_MAX_PENDING: int = 100
+    TRIP_JOB_RETENTION_SECONDS: float = 3600.0
+
+    # Estimated prompt-token budget for each location discovery LLM call
+    DISCOVERY_PROMPT_TOKEN_BUDGET: int = 6000
+
+    # Startup: send traces to Phoenix (initialized in the background) and warm up
+    # the agent stack before /ready reports ready (False defers it to first use)
+    TRACING_ENABLED: bool = True
+    STARTUP_WARMUP: bool = True
+
+    # Expose Prometheus metrics at GET /metrics
+    METRICS_ENABLED: bool = True
+
+    # Route geometry detail returned when a request does not ask for one:
+    # "full", "street", "city" or "overview" (coarser tiers are Douglas-Peucker simplified)
+    POLYLINE_DEFAULT_DETAIL: str = "street"
+
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8000
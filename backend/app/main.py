@@ -1,15 +1,20 @@
 """FastAPI entry point for the Travel Planner API."""
 
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from phoenix.otel import register
 from app.config import settings
+from app.api.responses import CompactJSONResponse
 from app.api.routes import router
-from openinference.instrumentation.langchain import LangChainInstrumentor
+from app.agent.jobs import close_job_manager
+from app.services.google_maps import get_google_maps_service, close_google_maps_service
+from app.services.metrics import render_metrics
 import os
 
 load_dotenv()
@@ -19,10 +24,14 @@ def setup_tracing() -> None:
     Set up optional tracing for observability.
 
     This is wrapped in try/except in case dependencies aren't available.
+    The Phoenix and OpenInference packages are imported here rather than at
+    module import, and the lifespan runs this in a worker thread so an
+    unreachable collector never delays startup.
     """
     try:
         from opentelemetry import trace
-        from opentelemetry.sdk.trace import TracerProvider
+        from phoenix.otel import register
+        from openinference.instrumentation.langchain import LangChainInstrumentor
 
         # Set up basic tracer provider
         tracer_provider = register(
@@ -41,14 +50,57 @@ def setup_tracing() -> None:
         print(f"Tracing setup failed: {e}")
 
 
+def _import_agent() -> None:
+    """Import the agent stack (graph compilation, LLM clients, itinerary solver)."""
+    from app.api.routes import get_planner_graph
+    import app.agent.itinerary  # noqa: F401
+
+    get_planner_graph()
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Load the heavy modules and open shared clients, then mark the app ready.
+
+    Args:
+        app: Application whose state.ready flag is set when warm-up finishes
+    """
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_import_agent)
+        # Open the shared, pooled Google Maps client used by tools, itinerary and proxies
+        get_google_maps_service()
+    except Exception as e:
+        # Requests still import lazily; readiness reports the failure
+        print(f"Warm-up failed: {e}")
+        app.state.warmup_error = str(e)
+        return
+    app.state.ready = True
+    print(f"Travel Planner API ready ({time.perf_counter() - started:.2f}s warm-up)")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Application lifespan handler for startup/shutdown events."""
-    # Startup
-    setup_tracing()
+    # Startup: tracing and warm-up run in the background so the server
+    # accepts connections (and liveness checks) immediately
+    app.state.ready = False
+    app.state.warmup_error = None
+    background: list[asyncio.Future] = []
+    if settings.TRACING_ENABLED:
+        background.append(asyncio.ensure_future(asyncio.to_thread(setup_tracing)))
+    if settings.STARTUP_WARMUP:
+        background.append(asyncio.create_task(warm_up(app)))
+    else:
+        app.state.ready = True
     print("Travel Planner API started")
     yield
     # Shutdown
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await close_job_manager()
+    await close_google_maps_service()
     print("Travel Planner API shutting down")
 
 
@@ -58,6 +110,7 @@ app = FastAPI(
     description="Map-first, agentic itinerary generator API",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=CompactJSONResponse,
 )
 
 # Configure CORS middleware (allow all origins for development)
@@ -89,3 +142,23 @@ async def health_check() -> dict[str, str]:
         "status": "healthy",
         "service": "travel-planner-api",
     }
+
+
+@app.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """Readiness probe: 503 until startup warm-up has finished."""
+    if getattr(app.state, "ready", False):
+        return JSONResponse({"status": "ready", "service": "travel-planner-api"})
+    status = "failed" if getattr(app.state, "warmup_error", None) else "starting"
+    return JSONResponse(
+        {"status": status, "service": "travel-planner-api"},
+        status_code=503,
+    )
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        """Prometheus metrics in the text exposition format."""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
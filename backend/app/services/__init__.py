@@ -1,6 +1,23 @@
 """
 External service integrations.
 """
-from .google_maps import GoogleMapsService
+from .google_maps import (
+    GoogleMapsService,
+    get_google_maps_service,
+    close_google_maps_service,
+)
+from .autocomplete import AutocompleteCache
+from .cache import ResponseCache, make_cache_key
+from .singleflight import SingleFlight
+from .travel_times import TravelTimeStore
 
-__all__ = ["GoogleMapsService"]
+__all__ = [
+    "GoogleMapsService",
+    "get_google_maps_service",
+    "close_google_maps_service",
+    "AutocompleteCache",
+    "ResponseCache",
+    "make_cache_key",
+    "SingleFlight",
+    "TravelTimeStore",
+]
@@ -0,0 +1,143 @@
+"""
+Prefix-aware cache for Places Autocomplete predictions.
+
+Autocomplete is called on (debounced) keystrokes, so consecutive requests
+are usually extensions of each other: "pa", "par", "pari". Google returns
+at most a handful of predictions, so a cached result with fewer than that
+is the complete answer for its input, and the answer for any extension of
+that input is the subset of those predictions that still match. Such
+requests are served by filtering the cached result without calling Google.
+"""
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .metrics import CACHE_LOOKUPS
+
+# Google Places Autocomplete returns at most this many predictions
+AUTOCOMPLETE_MAX_PREDICTIONS = 5
+
+
+def normalize_input(text: str) -> str:
+    """Normalize autocomplete input: case-folded with whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+
+def prediction_matches(prediction: dict[str, Any], query: str) -> bool:
+    """
+    Check whether a prediction still matches a (normalized) longer input.
+
+    A prediction matches when the input occurs at the start of a word in
+    its description or main text, which is how autocomplete matches terms.
+
+    Args:
+        prediction: Raw Google prediction
+        query: Normalized input
+
+    Returns:
+        True if the prediction should be kept for this input
+    """
+    texts = [
+        prediction.get("description", ""),
+        prediction.get("structured_formatting", {}).get("main_text", ""),
+    ]
+    pattern = re.compile(r"(?<![^\W_])" + re.escape(query))
+    return any(pattern.search(normalize_input(text)) for text in texts if text)
+
+
+class AutocompleteCache:
+    """
+    In-process LRU + TTL cache of autocomplete predictions keyed by input and types.
+
+    Lookups try the exact input first, then the longest cached prefix whose
+    result was complete (fewer than AUTOCOMPLETE_MAX_PREDICTIONS), filtered
+    to the predictions that match the longer input.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached inputs before LRU eviction
+            ttl_seconds: Age after which an entry is ignored
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[dict[str, Any]]]] = OrderedDict()
+        self._stats = {"hits": 0, "prefix_hits": 0, "misses": 0}
+
+    def _count(self, counter: str) -> None:
+        """Increment a lookup counter."""
+        self._stats[counter] += 1
+        CACHE_LOOKUPS.labels("autocomplete", counter).inc()
+
+    def _fresh(self, key: tuple[str, str], now: float) -> list[dict[str, Any]] | None:
+        """Get an unexpired entry, dropping it if expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, input_text: str, types: str) -> list[dict[str, Any]] | None:
+        """
+        Look up predictions for an input.
+
+        Args:
+            input_text: Raw autocomplete input
+            types: Places types filter the predictions were requested with
+
+        Returns:
+            Predictions, or None if neither the input nor a usable prefix is cached
+        """
+        query = normalize_input(input_text)
+        now = time.time()
+
+        exact = self._fresh((types, query), now)
+        if exact is not None:
+            self._count("hits")
+            return exact
+
+        for length in range(len(query) - 1, 0, -1):
+            cached = self._fresh((types, query[:length]), now)
+            if cached is not None and len(cached) < AUTOCOMPLETE_MAX_PREDICTIONS:
+                self._count("prefix_hits")
+                return [p for p in cached if prediction_matches(p, query)]
+
+        self._count("misses")
+        return None
+
+    def set(self, input_text: str, types: str, predictions: list[dict[str, Any]]) -> None:
+        """
+        Store the predictions Google returned for an input.
+
+        Args:
+            input_text: Raw autocomplete input
+            types: Places types filter used for the request
+            predictions: Raw predictions from Google
+        """
+        key = (types, normalize_input(input_text))
+        self._entries[key] = (time.time(), predictions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get lookup counters.
+
+        Returns:
+            Dictionary with hits, prefix hits, misses, hit ratio and size
+        """
+        lookups = sum(self._stats.values())
+        hits = self._stats["hits"] + self._stats["prefix_hits"]
+        return {
+            **self._stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,262 @@
+"""
+Tiered response cache for Google Maps API results.
+
+A bounded in-process LRU sits in front of an optional on-disk SQLite store,
+so repeated lookups for popular destinations skip the network entirely and
+survive process restarts when a database path is configured.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .metrics import CACHE_LOOKUPS
+from .serialization import dumps_text, loads
+
+
+# Free-text key components; case and whitespace differences in these are not
+# meaningful. Other strings (place IDs, field names) are case-sensitive.
+TEXT_KEY_PARTS = frozenset({"query", "input", "location"})
+
+
+def _normalize_part(value: Any, text: bool = False) -> Any:
+    """Normalize a single key component so equivalent requests share a key."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return " ".join(value.lower().split()) if text else value
+    if isinstance(value, float):
+        return round(value, 5)
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_normalize_part(v, text) for v in value)
+    return value
+
+
+def make_cache_key(endpoint: str, **parts: Any) -> str:
+    """
+    Build a normalized cache key for an endpoint request.
+
+    Free-text parts (TEXT_KEY_PARTS) are lowercased with collapsed
+    whitespace, so "Museums  in Paris" and "museums in paris" hit the same
+    entry; other strings such as place IDs are kept as given. Floats are
+    rounded and sequences are sorted.
+
+    Args:
+        endpoint: Logical endpoint name (e.g. "text_search", "place_details")
+        **parts: Request components that determine the response
+
+    Returns:
+        Stable key string for the request
+    """
+    normalized = {
+        name: _normalize_part(value, text=name in TEXT_KEY_PARTS)
+        for name, value in parts.items()
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"{endpoint}:{digest}"
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache with per-endpoint TTLs.
+
+    Values are stored JSON-encoded so callers always receive a fresh copy and
+    can mutate results without corrupting the cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        sqlite_path: str | None = None,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = 3600.0,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in the in-process LRU
+            sqlite_path: Optional path to a SQLite file for the persistent tier
+            ttls: Time-to-live in seconds per endpoint name
+            default_ttl: TTL used for endpoints without an explicit entry
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._stats: dict[str, dict[str, int]] = {}
+
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, "
+                "value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_endpoint "
+                "ON response_cache (endpoint)"
+            )
+            self._db.commit()
+
+    def _ttl(self, endpoint: str) -> float:
+        """Get the TTL for an endpoint."""
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _count(self, endpoint: str, counter: str) -> None:
+        """Increment a hit/miss counter for an endpoint."""
+        endpoint_stats = self._stats.setdefault(
+            endpoint, {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        )
+        endpoint_stats[counter] += 1
+        CACHE_LOOKUPS.labels(endpoint, counter).inc()
+
+    def _memory_set(self, key: str, expires_at: float, encoded: str) -> None:
+        """Insert into the LRU tier, evicting the oldest entries when full."""
+        self._memory[key] = (expires_at, encoded)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> tuple[float, str] | None:
+        """Read an entry from the SQLite tier."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT expires_at, value FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _disk_set(self, key: str, endpoint: str, expires_at: float, encoded: str) -> None:
+        """Write an entry to the SQLite tier."""
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, endpoint, value, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, endpoint, encoded, expires_at),
+            )
+            self._db.commit()
+
+    def _disk_delete(self, endpoint: str | None, key: str | None) -> int:
+        """Delete entries from the SQLite tier and return the number removed."""
+        with self._db_lock:
+            if key is not None:
+                cursor = self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            elif endpoint is not None:
+                cursor = self._db.execute(
+                    "DELETE FROM response_cache WHERE endpoint = ?", (endpoint,)
+                )
+            else:
+                cursor = self._db.execute("DELETE FROM response_cache")
+            self._db.commit()
+            return cursor.rowcount
+
+    async def get(self, endpoint: str, key: str) -> Any | None:
+        """
+        Look up a cached response.
+
+        Args:
+            endpoint: Logical endpoint name
+            key: Key from make_cache_key()
+
+        Returns:
+            The cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, encoded = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._count(endpoint, "memory_hits")
+                return loads(encoded)
+            del self._memory[key]
+
+        if self._db is not None:
+            entry = await asyncio.to_thread(self._disk_get, key)
+            if entry is not None and entry[0] > now:
+                expires_at, encoded = entry
+                self._memory_set(key, expires_at, encoded)
+                self._count(endpoint, "disk_hits")
+                return loads(encoded)
+
+        self._count(endpoint, "misses")
+        return None
+
+    async def set(self, endpoint: str, key: str, value: Any) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            endpoint: Logical endpoint name (selects the TTL)
+            key: Key from make_cache_key()
+            value: JSON-serializable response value
+        """
+        encoded = dumps_text(value)
+        expires_at = time.time() + self._ttl(endpoint)
+        self._memory_set(key, expires_at, encoded)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, endpoint, expires_at, encoded)
+
+    async def invalidate(self, endpoint: str | None = None, key: str | None = None) -> int:
+        """
+        Remove cached entries.
+
+        Args:
+            endpoint: Drop every entry for this endpoint
+            key: Drop a single entry (takes precedence over endpoint)
+
+        Returns:
+            Number of entries removed from the persistent tier, or from memory
+            when no persistent tier is configured
+        """
+        if key is not None:
+            removed = 1 if self._memory.pop(key, None) is not None else 0
+        elif endpoint is not None:
+            stale = [k for k in self._memory if k.startswith(f"{endpoint}:")]
+            for k in stale:
+                del self._memory[k]
+            removed = len(stale)
+        else:
+            removed = len(self._memory)
+            self._memory.clear()
+
+        if self._db is not None:
+            removed = await asyncio.to_thread(self._disk_delete, endpoint, key)
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get hit/miss counters per endpoint.
+
+        Returns:
+            Dictionary with per-endpoint counters, hit ratio and memory size
+        """
+        endpoints = {}
+        for endpoint, counters in self._stats.items():
+            lookups = sum(counters.values())
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            endpoints[endpoint] = {
+                **counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            }
+        return {
+            "memory_entries": len(self._memory),
+            "persistent": self._db is not None,
+            "endpoints": endpoints,
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection if one is open."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
@@ -1,72 +1,373 @@
 """
 Google Maps API wrapper for Places, Geocoding, Directions, and Distance Matrix APIs.
 """
+import asyncio
+import math
 import httpx
-import polyline as pl
-from typing import Any
+from typing import Any, Callable
+
+from ..config import BACKEND_DIR, settings
+from .autocomplete import AutocompleteCache
+from .cache import ResponseCache, make_cache_key
+from .governor import UpstreamGovernor, UpstreamThrottled, governor_from_settings
+from .metrics import MAPS_METRICS
+from .polylines import polyline_for_detail, stitch_polylines
+from .prefetch import DetailsPrefetcher
+from .rate_limit import TokenBucket
+from .singleflight import SingleFlight
+from .travel_times import Coordinate, TravelTimeStore, parse_latlng
+
+# Fields requested from the Place Details API (also part of the cache key)
+PLACE_DETAILS_FIELDS = "name,formatted_address,geometry,rating,reviews,opening_hours,website,formatted_phone_number,types,photos,editorial_summary"
+
+# Distance Matrix per-request limits (server-side requests)
+DISTANCE_MATRIX_MAX_ELEMENTS = 100
+DISTANCE_MATRIX_MAX_DIMENSION = 25
+
+
+def _empty_matrix_cell(status: str) -> dict[str, Any]:
+    """Build a Distance Matrix cell without duration/distance values."""
+    return {
+        "status": status,
+        "duration_seconds": None,
+        "duration_text": None,
+        "distance_meters": None,
+        "distance_text": None,
+    }
+
+
+def plan_matrix_tiles(
+    origin_indices: list[int],
+    destination_indices: list[int],
+    max_elements: int = DISTANCE_MATRIX_MAX_ELEMENTS,
+    max_dimension: int = DISTANCE_MATRIX_MAX_DIMENSION,
+) -> list[tuple[list[int], list[int]]]:
+    """
+    Split an origins x destinations request into tiles within the API limits.
+
+    The tile shape is chosen to minimize the number of requests, then the
+    number of elements sent (e.g. 30 x 30 becomes nine 10 x 10 tiles).
+
+    Args:
+        origin_indices: Origin positions to cover
+        destination_indices: Destination positions to cover
+        max_elements: Maximum origins x destinations per request
+        max_dimension: Maximum origins (and destinations) per request
+
+    Returns:
+        List of (origin positions, destination positions) tiles
+    """
+    if not origin_indices or not destination_indices:
+        return []
+    n_origins, n_destinations = len(origin_indices), len(destination_indices)
+    best = None
+    for dest_chunk in range(1, min(n_destinations, max_dimension, max_elements) + 1):
+        origin_chunk = max(1, min(n_origins, max_dimension, max_elements // dest_chunk))
+        requests = math.ceil(n_origins / origin_chunk) * math.ceil(n_destinations / dest_chunk)
+        elements = requests * origin_chunk * dest_chunk
+        if best is None or (requests, elements) < best[0]:
+            best = ((requests, elements), origin_chunk, dest_chunk)
+    _, origin_chunk, dest_chunk = best
+
+    tiles = []
+    for o in range(0, len(origin_indices), origin_chunk):
+        for d in range(0, len(destination_indices), dest_chunk):
+            tiles.append((
+                origin_indices[o:o + origin_chunk],
+                destination_indices[d:d + dest_chunk],
+            ))
+    return tiles
+
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 
 class GoogleMapsService:
     """
     Client for Google Maps APIs including Places, Geocoding, and Distance Matrix.
 
-    All methods are async and use httpx for HTTP requests.
+    All methods are async and share one long-lived, pooled httpx client so
+    repeated calls reuse TCP/TLS connections to maps.googleapis.com.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        client: httpx.AsyncClient | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        cache: ResponseCache | None = None,
+        coalesce: bool = True,
+        matrix_max_elements: int = DISTANCE_MATRIX_MAX_ELEMENTS,
+        matrix_max_dimension: int = DISTANCE_MATRIX_MAX_DIMENSION,
+        matrix_concurrency: int = 4,
+        matrix_elements_per_second: float = 1000.0,
+        travel_times: TravelTimeStore | None = None,
+        base_url: str = "https://maps.googleapis.com/maps/api",
+        autocomplete_cache: AutocompleteCache | None = None,
+        prefetch_top_k: int = 0,
+        prefetch_concurrency: int = 4,
+        prefetch_max_pending: int = 50,
+        prefetch_window_seconds: float = 600.0,
+        governor: UpstreamGovernor | None = None,
+    ) -> None:
         """
         Initialize the Google Maps service.
 
         Args:
             api_key: Google Maps API key
+            client: Optional pre-built httpx client (the service will not close it)
+            max_connections: Maximum number of concurrent pooled connections
+            max_keepalive_connections: Maximum idle connections kept alive
+            keepalive_expiry: Seconds an idle connection is kept before closing
+            http2: Use HTTP/2 when the h2 package is installed
+            cache: Optional response cache for text search and place details
+            coalesce: Share one upstream request between identical concurrent calls
+            matrix_max_elements: Elements per Distance Matrix request when tiling
+            matrix_max_dimension: Origins/destinations per Distance Matrix request
+            matrix_concurrency: Concurrent tile requests per tiled matrix
+            matrix_elements_per_second: Distance Matrix element rate limit (0 disables)
+            travel_times: Optional pairwise travel-time store consulted before
+                Distance Matrix and Directions requests
+            base_url: Maps API base URL
+            autocomplete_cache: Optional prefix-aware cache for autocomplete predictions
+            prefetch_top_k: Place details prefetched in the background for the
+                top-rated results of each search (0 disables; requires a cache)
+            prefetch_concurrency: Prefetch requests running at once
+            prefetch_max_pending: Prefetches queued or running at once
+            prefetch_window_seconds: Unrequested prefetches count as wasted after this
+            governor: Optional rate limit, adaptive concurrency and retry policy
+                applied to every request
         """
         self.api_key = api_key
-        self.base_url = "https://maps.googleapis.com/maps/api"
+        self.base_url = base_url.rstrip("/")
+        self._client = client
+        self._owns_client = client is None
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2 and _http2_available()
+        self.cache = cache
+        self._flight = SingleFlight() if coalesce else None
+        self.matrix_max_elements = matrix_max_elements
+        self.matrix_max_dimension = matrix_max_dimension
+        self.matrix_concurrency = matrix_concurrency
+        self._matrix_limiter = TokenBucket(matrix_elements_per_second)
+        self.travel_times = travel_times
+        self.autocomplete_cache = autocomplete_cache
+        self.governor = governor
+        self.prefetcher = DetailsPrefetcher(
+            self._prefetch_place_details,
+            top_k=prefetch_top_k,
+            concurrency=prefetch_concurrency,
+            max_pending=prefetch_max_pending,
+            window_seconds=prefetch_window_seconds,
+        ) if prefetch_top_k > 0 and cache is not None else None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self._limits,
+                http2=self._http2,
+                timeout=10.0,
+            )
+            self._owns_client = True
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client if this service created it."""
+        if self.prefetcher is not None:
+            await self.prefetcher.aclose()
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
+        if self.cache is not None:
+            self.cache.close()
+        if self.travel_times is not None:
+            self.travel_times.close()
+
+    async def invalidate_cache(self, endpoint: str | None = None, **parts: Any) -> int:
+        """
+        Invalidate cached responses.
 
-    async def places_autocomplete(
+        Args:
+            endpoint: "text_search" or "place_details"; None clears everything
+            **parts: Key components to drop a single entry, e.g. query/location
+                for text search or place_id for place details
+
+        Returns:
+            Number of cache entries removed
+        """
+        if self.cache is None:
+            return 0
+        if endpoint == "place_details" and parts and "fields" not in parts:
+            parts["fields"] = PLACE_DETAILS_FIELDS.split(",")
+        key = make_cache_key(endpoint, **parts) if endpoint and parts else None
+        return await self.cache.invalidate(endpoint=endpoint, key=key)
+
+    async def get_json(
+        self,
+        path: str,
+        params: dict[str, Any],
+        timeout: float = 10.0,
+        cancel_abandoned: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Issue a GET request against a Maps endpoint and return the decoded JSON.
+
+        The API key is added automatically. Status checking of the JSON body is
+        left to the caller since each endpoint has its own conventions.
+        Identical concurrent requests share one upstream call, so the returned
+        dictionary must not be mutated.
+
+        Args:
+            path: Endpoint path relative to the Maps API base URL (e.g. "geocode/json")
+            params: Query parameters, excluding the API key
+            timeout: Request timeout in seconds
+            cancel_abandoned: Cancel the upstream request once every caller
+                waiting for it has been cancelled
+
+        Returns:
+            Decoded JSON response body
+        """
+        if self._flight is None:
+            return await self._fetch_json(path, params, timeout)
+        # Only byte-identical requests share a call; the response cache's
+        # normalized keys would merge requests that differ in case
+        key = (path, tuple(sorted((name, str(value)) for name, value in params.items())))
+        return await self._flight.do(
+            key,
+            lambda: self._fetch_json(path, params, timeout),
+            namespace=path,
+            cancel_abandoned=cancel_abandoned,
+        )
+
+    async def _fetch_json(
+        self,
+        path: str,
+        params: dict[str, Any],
+        timeout: float,
+    ) -> dict[str, Any]:
+        """Perform the GET request for get_json(), through the governor if configured."""
+        url = f"{self.base_url}/{path}"
+
+        async def attempt() -> dict[str, Any]:
+            response = await self.client.get(
+                url, params={**params, "key": self.api_key}, timeout=timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get("status") == "OVER_QUERY_LIMIT":
+                raise UpstreamThrottled(data)
+            return data
+
+        if self.governor is None:
+            try:
+                return await attempt()
+            except UpstreamThrottled as e:
+                return e.body
+        try:
+            return await self.governor.call(attempt)
+        except UpstreamThrottled as e:
+            # Still throttled after retries: callers report the status as before
+            return e.body
+
+    def coalescing_stats(self) -> dict[str, Any]:
+        """
+        Get single-flight counters per endpoint path.
+
+        Returns:
+            Calls, upstream calls and collapsed calls per path (empty when disabled)
+        """
+        if self._flight is None:
+            return {"in_flight": 0, "namespaces": {}}
+        return self._flight.stats()
+
+    @MAPS_METRICS.wrap("autocomplete_predictions")
+    async def autocomplete_predictions(
         self,
         input_text: str,
-        types: str = "(cities)"
+        types: str = "(cities)",
     ) -> list[dict[str, Any]]:
         """
-        Autocomplete for place search.
+        Get raw Places Autocomplete predictions, served from the prefix-aware cache when possible.
+
+        A cancelled caller (e.g. a superseded keystroke) cancels the upstream
+        request unless another caller is waiting for the same input.
 
         Args:
             input_text: The text to autocomplete
-            types: The types of places to return (default: cities)
+            types: The types of places to return
 
         Returns:
-            List of place predictions with name, place_id, and description
+            Raw Google prediction dictionaries (read-only)
+
+        Raises:
+            ValueError: If Google returns an error status
         """
-        url = f"{self.base_url}/place/autocomplete/json"
+        if self.autocomplete_cache is not None:
+            cached = self.autocomplete_cache.get(input_text, types)
+            if cached is not None:
+                return cached
+
         params = {
             "input": input_text,
             "types": types,
-            "key": self.api_key,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_json(
+            "place/autocomplete/json", params, timeout=10.0, cancel_abandoned=True
+        )
 
-            if data.get("status") != "OK":
-                if data.get("status") == "ZERO_RESULTS":
-                    return []
-                raise ValueError(f"Google Places API error: {data.get('status')}")
+        if data.get("status") not in ("OK", "ZERO_RESULTS"):
+            raise ValueError(f"Google Places API error: {data.get('status')}")
 
-            predictions = []
-            for prediction in data.get("predictions", []):
-                predictions.append({
-                    "name": prediction.get("structured_formatting", {}).get(
-                        "main_text", prediction.get("description", "")
-                    ),
-                    "place_id": prediction.get("place_id"),
-                    "description": prediction.get("description"),
-                })
+        predictions = data.get("predictions", [])
+        if self.autocomplete_cache is not None:
+            self.autocomplete_cache.set(input_text, types, predictions)
+        return predictions
 
-            return predictions
+    @MAPS_METRICS.wrap("places_autocomplete")
+    async def places_autocomplete(
+        self,
+        input_text: str,
+        types: str = "(cities)"
+    ) -> list[dict[str, Any]]:
+        """
+        Autocomplete for place search.
+
+        Args:
+            input_text: The text to autocomplete
+            types: The types of places to return (default: cities)
 
+        Returns:
+            List of place predictions with name, place_id, and description
+        """
+        predictions = []
+        for prediction in await self.autocomplete_predictions(input_text, types):
+            predictions.append({
+                "name": prediction.get("structured_formatting", {}).get(
+                    "main_text", prediction.get("description", "")
+                ),
+                "place_id": prediction.get("place_id"),
+                "description": prediction.get("description"),
+            })
+
+        return predictions
+
+    @MAPS_METRICS.wrap("places_text_search")
     async def places_text_search(
         self,
         query: str,
@@ -82,10 +383,14 @@ class GoogleMapsService:
         Returns:
             List of places with name, place_id, address, coordinates, and types
         """
-        url = f"{self.base_url}/place/textsearch/json"
+        cache_key = make_cache_key("text_search", query=query, location=location)
+        if self.cache is not None:
+            cached = await self.cache.get("text_search", cache_key)
+            if cached is not None:
+                return cached
+
         params: dict[str, Any] = {
             "query": query,
-            "key": self.api_key,
         }
 
         if location:
@@ -97,30 +402,55 @@ class GoogleMapsService:
                 # Otherwise, append to query for better results
                 params["query"] = f"{query} in {location}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_json("place/textsearch/json", params, timeout=10.0)
+
+        if data.get("status") not in ["OK", "ZERO_RESULTS"]:
+            raise ValueError(f"Google Places API error: {data.get('status')}")
+
+        places = []
+        for result in data.get("results", []):
+            location_data = result.get("geometry", {}).get("location", {})
+            places.append({
+                "name": result.get("name"),
+                "place_id": result.get("place_id"),
+                "formatted_address": result.get("formatted_address"),
+                "lat": location_data.get("lat"),
+                "lng": location_data.get("lng"),
+                "types": result.get("types", []),
+                "rating": result.get("rating"),
+                "user_ratings_total": result.get("user_ratings_total"),
+            })
+
+        if self.cache is not None:
+            await self.cache.set("text_search", cache_key, places)
+
+        return places
+
+    def prefetch_place_details(self, places: list[dict[str, Any]]) -> int:
+        """
+        Start background details prefetches for the top-rated places of a search.
 
-            if data.get("status") not in ["OK", "ZERO_RESULTS"]:
-                raise ValueError(f"Google Places API error: {data.get('status')}")
-
-            places = []
-            for result in data.get("results", []):
-                location_data = result.get("geometry", {}).get("location", {})
-                places.append({
-                    "name": result.get("name"),
-                    "place_id": result.get("place_id"),
-                    "formatted_address": result.get("formatted_address"),
-                    "lat": location_data.get("lat"),
-                    "lng": location_data.get("lng"),
-                    "types": result.get("types", []),
-                    "rating": result.get("rating"),
-                    "user_ratings_total": result.get("user_ratings_total"),
-                })
-
-            return places
+        Args:
+            places: Places from places_text_search()
 
+        Returns:
+            Number of prefetches started (0 when prefetching is disabled)
+        """
+        if self.prefetcher is None:
+            return 0
+        return self.prefetcher.schedule(places)
+
+    async def _prefetch_place_details(self, place_id: str) -> bool:
+        """Fetch one place's details into the cache; return False if already cached."""
+        cache_key = make_cache_key(
+            "place_details", place_id=place_id, fields=PLACE_DETAILS_FIELDS.split(",")
+        )
+        if await self.cache.get("place_details", cache_key) is not None:
+            return False
+        await self._fetch_place_details(place_id, cache_key)
+        return True
+
+    @MAPS_METRICS.wrap("place_details")
     async def place_details(self, place_id: str) -> dict[str, Any]:
         """
         Get detailed place information.
@@ -131,49 +461,63 @@ class GoogleMapsService:
         Returns:
             Dictionary with detailed place information
         """
-        url = f"{self.base_url}/place/details/json"
+        if self.prefetcher is not None:
+            self.prefetcher.claim(place_id)
+        cache_key = make_cache_key(
+            "place_details", place_id=place_id, fields=PLACE_DETAILS_FIELDS.split(",")
+        )
+        if self.cache is not None:
+            cached = await self.cache.get("place_details", cache_key)
+            if cached is not None:
+                return cached
+        return await self._fetch_place_details(place_id, cache_key)
+
+    async def _fetch_place_details(self, place_id: str, cache_key: str) -> dict[str, Any]:
+        """Request place details from Google and store them in the cache."""
         params = {
             "place_id": place_id,
-            "fields": "name,formatted_address,geometry,rating,reviews,opening_hours,website,formatted_phone_number,types,photos,editorial_summary",
-            "key": self.api_key,
+            "fields": PLACE_DETAILS_FIELDS,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") != "OK":
-                raise ValueError(f"Google Places API error: {data.get('status')}")
+        data = await self.get_json("place/details/json", params, timeout=10.0)
 
-            result = data.get("result", {})
-            location_data = result.get("geometry", {}).get("location", {})
+        if data.get("status") != "OK":
+            raise ValueError(f"Google Places API error: {data.get('status')}")
 
-            # Extract reviews summary
-            reviews = result.get("reviews", [])
-            review_summaries = [
-                {
-                    "rating": r.get("rating"),
-                    "text": r.get("text", "")[:200],  # Truncate long reviews
-                    "relative_time": r.get("relative_time_description"),
-                }
-                for r in reviews[:3]  # Only include top 3 reviews
-            ]
+        result = data.get("result", {})
+        location_data = result.get("geometry", {}).get("location", {})
 
-            return {
-                "name": result.get("name"),
-                "formatted_address": result.get("formatted_address"),
-                "lat": location_data.get("lat"),
-                "lng": location_data.get("lng"),
-                "rating": result.get("rating"),
-                "reviews": review_summaries,
-                "opening_hours": result.get("opening_hours", {}).get("weekday_text", []),
-                "website": result.get("website"),
-                "phone": result.get("formatted_phone_number"),
-                "types": result.get("types", []),
-                "editorial_summary": result.get("editorial_summary", {}).get("overview"),
+        # Extract reviews summary
+        reviews = result.get("reviews", [])
+        review_summaries = [
+            {
+                "rating": r.get("rating"),
+                "text": r.get("text", "")[:200],  # Truncate long reviews
+                "relative_time": r.get("relative_time_description"),
             }
+            for r in reviews[:3]  # Only include top 3 reviews
+        ]
+
+        details = {
+            "name": result.get("name"),
+            "formatted_address": result.get("formatted_address"),
+            "lat": location_data.get("lat"),
+            "lng": location_data.get("lng"),
+            "rating": result.get("rating"),
+            "reviews": review_summaries,
+            "opening_hours": result.get("opening_hours", {}).get("weekday_text", []),
+            "website": result.get("website"),
+            "phone": result.get("formatted_phone_number"),
+            "types": result.get("types", []),
+            "editorial_summary": result.get("editorial_summary", {}).get("overview"),
+        }
+
+        if self.cache is not None:
+            await self.cache.set("place_details", cache_key, details)
+
+        return details
 
+    @MAPS_METRICS.wrap("distance_matrix")
     async def distance_matrix(
         self,
         origins: list[str],
@@ -191,51 +535,179 @@ class GoogleMapsService:
         Returns:
             Matrix of durations and distances between all origin-destination pairs
         """
-        url = f"{self.base_url}/distancematrix/json"
         params = {
             "origins": "|".join(origins),
             "destinations": "|".join(destinations),
             "mode": mode,
-            "key": self.api_key,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_json("distancematrix/json", params, timeout=15.0)
 
-            if data.get("status") != "OK":
-                raise ValueError(f"Google Distance Matrix API error: {data.get('status')}")
+        if data.get("status") != "OK":
+            raise ValueError(f"Google Distance Matrix API error: {data.get('status')}")
 
-            # Parse the response into a more usable format
-            matrix = {
-                "origin_addresses": data.get("origin_addresses", []),
-                "destination_addresses": data.get("destination_addresses", []),
-                "rows": [],
-            }
+        # Parse the response into a more usable format
+        matrix = {
+            "origin_addresses": data.get("origin_addresses", []),
+            "destination_addresses": data.get("destination_addresses", []),
+            "rows": [],
+        }
 
-            for row in data.get("rows", []):
-                row_data = []
-                for element in row.get("elements", []):
-                    if element.get("status") == "OK":
-                        row_data.append({
-                            "duration_seconds": element.get("duration", {}).get("value"),
-                            "duration_text": element.get("duration", {}).get("text"),
-                            "distance_meters": element.get("distance", {}).get("value"),
-                            "distance_text": element.get("distance", {}).get("text"),
-                        })
-                    else:
-                        row_data.append({
-                            "status": element.get("status"),
-                            "duration_seconds": None,
-                            "duration_text": None,
-                            "distance_meters": None,
-                            "distance_text": None,
-                        })
-                matrix["rows"].append(row_data)
-
-            return matrix
+        for row in data.get("rows", []):
+            row_data = []
+            for element in row.get("elements", []):
+                if element.get("status") == "OK":
+                    row_data.append({
+                        "duration_seconds": element.get("duration", {}).get("value"),
+                        "duration_text": element.get("duration", {}).get("text"),
+                        "distance_meters": element.get("distance", {}).get("value"),
+                        "distance_text": element.get("distance", {}).get("text"),
+                    })
+                else:
+                    row_data.append(_empty_matrix_cell(element.get("status")))
+            matrix["rows"].append(row_data)
+
+        return matrix
+
+    @MAPS_METRICS.wrap("distance_matrix_tiled")
+    async def distance_matrix_tiled(
+        self,
+        origins: list[str],
+        destinations: list[str],
+        mode: str = "driving",
+        skip: Callable[[int, int], bool] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Get a full origins x destinations matrix of any size.
 
+        The request is split into tiles within the per-request element and
+        dimension limits, tiles are fetched concurrently under the element
+        rate limit, and the results are merged into one dense matrix. Cells
+        the caller already knows (e.g. from a cache) can be skipped; tiles
+        with nothing left to fetch are never sent.
+
+        Args:
+            origins: List of origin coordinates as "lat,lng" strings
+            destinations: List of destination coordinates as "lat,lng" strings
+            mode: Travel mode (driving, walking, bicycling, transit)
+            skip: Optional predicate (origin index, destination index) -> True
+                for cells that should not be fetched
+
+        Returns:
+            Same structure as distance_matrix(), with one row per origin and
+            one cell per destination (status "SKIPPED" for skipped cells,
+            "ERROR" for cells of failed tiles), plus "requests" and "elements"
+            counts of what was sent upstream and "stored_cells" answered
+            from the travel-time store
+
+        Raises:
+            Exception: The first tile error if every tile failed
+        """
+        needed = [
+            [not (skip and skip(i, j)) for j in range(len(destinations))]
+            for i in range(len(origins))
+        ]
+
+        # Cells already in the travel-time store are filled in and not fetched
+        stored_cells: dict[tuple[int, int], dict[str, Any]] = {}
+        pair_keys: dict[tuple[int, int], tuple] = {}
+        if self.travel_times is not None:
+            origin_coords = [parse_latlng(o) for o in origins]
+            destination_coords = [parse_latlng(d) for d in destinations]
+            for i, origin in enumerate(origin_coords):
+                for j, destination in enumerate(destination_coords):
+                    if needed[i][j] and origin and destination:
+                        pair_keys[(i, j)] = self.travel_times.make_key(origin, destination, mode)
+            found = await self.travel_times.get_many(list(pair_keys.values()))
+            for cell, key in pair_keys.items():
+                if key in found:
+                    stored_cells[cell] = found[key]
+                    needed[cell[0]][cell[1]] = False
+
+        origin_indices = [i for i in range(len(origins)) if any(needed[i])]
+        destination_indices = [
+            j for j in range(len(destinations))
+            if any(needed[i][j] for i in origin_indices)
+        ]
+        tiles = [
+            (tile_origins, tile_destinations)
+            for tile_origins, tile_destinations in plan_matrix_tiles(
+                origin_indices,
+                destination_indices,
+                self.matrix_max_elements,
+                self.matrix_max_dimension,
+            )
+            if any(needed[i][j] for i in tile_origins for j in tile_destinations)
+        ]
+
+        matrix: dict[str, Any] = {
+            "origin_addresses": [None] * len(origins),
+            "destination_addresses": [None] * len(destinations),
+            "rows": [
+                [_empty_matrix_cell("SKIPPED") for _ in destinations]
+                for _ in origins
+            ],
+            "requests": len(tiles),
+            "elements": sum(len(o) * len(d) for o, d in tiles),
+            "stored_cells": len(stored_cells),
+        }
+        for (i, j), leg in stored_cells.items():
+            matrix["rows"][i][j] = {
+                "duration_seconds": leg["duration_seconds"],
+                "duration_text": f"{round((leg['duration_seconds'] or 0) / 60)} mins",
+                "distance_meters": leg["distance_meters"],
+                "distance_text": f"{(leg['distance_meters'] or 0) / 1000:.1f} km",
+            }
+
+        semaphore = asyncio.Semaphore(max(1, self.matrix_concurrency))
+
+        async def fetch_tile(tile_origins: list[int], tile_destinations: list[int]) -> dict:
+            async with semaphore:
+                await self._matrix_limiter.acquire(len(tile_origins) * len(tile_destinations))
+                return await self.distance_matrix(
+                    [origins[i] for i in tile_origins],
+                    [destinations[j] for j in tile_destinations],
+                    mode=mode,
+                )
+
+        results = await asyncio.gather(
+            *(fetch_tile(o, d) for o, d in tiles), return_exceptions=True
+        )
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if tiles and len(errors) == len(tiles):
+            raise errors[0]
+
+        for (tile_origins, tile_destinations), result in zip(tiles, results):
+            if isinstance(result, BaseException):
+                print(f"Distance Matrix tile failed: {result}")
+                for i in tile_origins:
+                    for j in tile_destinations:
+                        matrix["rows"][i][j] = _empty_matrix_cell("ERROR")
+                continue
+            for a, i in enumerate(tile_origins):
+                if a < len(result.get("origin_addresses", [])):
+                    matrix["origin_addresses"][i] = result["origin_addresses"][a]
+                row = result["rows"][a] if a < len(result.get("rows", [])) else []
+                for b, j in enumerate(tile_destinations):
+                    if b < len(result.get("destination_addresses", [])):
+                        matrix["destination_addresses"][j] = result["destination_addresses"][b]
+                    if b < len(row):
+                        matrix["rows"][i][j] = row[b]
+
+        if self.travel_times is not None:
+            fresh = []
+            for cell, key in pair_keys.items():
+                if cell in stored_cells:
+                    continue
+                value = matrix["rows"][cell[0]][cell[1]]
+                if value.get("duration_seconds") is not None:
+                    fresh.append((key, value))
+            await self.travel_times.put_many(fresh)
+
+        return matrix
+
+    @MAPS_METRICS.wrap("geocode")
     async def geocode(self, address: str) -> dict[str, Any] | None:
         """
         Geocode an address to get coordinates.
@@ -246,32 +718,28 @@ class GoogleMapsService:
         Returns:
             Dictionary with lat, lng, and formatted_address, or None if not found
         """
-        url = f"{self.base_url}/geocode/json"
         params = {
             "address": address,
-            "key": self.api_key,
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_json("geocode/json", params, timeout=10.0)
 
-            if data.get("status") == "ZERO_RESULTS":
-                return None
+        if data.get("status") == "ZERO_RESULTS":
+            return None
 
-            if data.get("status") != "OK":
-                raise ValueError(f"Google Geocoding API error: {data.get('status')}")
+        if data.get("status") != "OK":
+            raise ValueError(f"Google Geocoding API error: {data.get('status')}")
 
-            result = data.get("results", [{}])[0]
-            location = result.get("geometry", {}).get("location", {})
+        result = data.get("results", [{}])[0]
+        location = result.get("geometry", {}).get("location", {})
 
-            return {
-                "lat": location.get("lat"),
-                "lng": location.get("lng"),
-                "formatted_address": result.get("formatted_address"),
-            }
+        return {
+            "lat": location.get("lat"),
+            "lng": location.get("lng"),
+            "formatted_address": result.get("formatted_address"),
+        }
 
+    @MAPS_METRICS.wrap("get_directions")
     async def get_directions(
         self,
         origin: str,
@@ -293,56 +761,212 @@ class GoogleMapsService:
             - legs: List of leg data with duration_seconds, distance_meters, polyline
             - overview_polyline: Encoded polyline for entire route
         """
-        url = f"{self.base_url}/directions/json"
         params: dict[str, Any] = {
             "origin": origin,
             "destination": destination,
             "mode": mode,
-            "key": self.api_key,
         }
 
         if waypoints:
             params["waypoints"] = "|".join(waypoints)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_json("directions/json", params, timeout=15.0)
 
-            if data.get("status") != "OK":
-                if data.get("status") == "ZERO_RESULTS":
-                    return {"legs": [], "overview_polyline": None}
-                raise ValueError(f"Google Directions API error: {data.get('status')}")
-
-            route = data.get("routes", [{}])[0]
-            legs_data = []
-
-            for leg in route.get("legs", []):
-                # Combine all step polylines into a single leg polyline
-                all_points: list[tuple[float, float]] = []
-                for step in leg.get("steps", []):
-                    step_polyline = step.get("polyline", {}).get("points")
-                    if step_polyline:
-                        decoded = pl.decode(step_polyline)
-                        # Avoid duplicating the last point of previous step
-                        if all_points and decoded and all_points[-1] == decoded[0]:
-                            decoded = decoded[1:]
-                        all_points.extend(decoded)
-
-                # Re-encode the combined points
-                leg_polyline = pl.encode(all_points) if all_points else None
-
-                legs_data.append({
-                    "duration_seconds": leg.get("duration", {}).get("value"),
-                    "duration_text": leg.get("duration", {}).get("text"),
-                    "distance_meters": leg.get("distance", {}).get("value"),
-                    "distance_text": leg.get("distance", {}).get("text"),
-                    "start_address": leg.get("start_address"),
-                    "end_address": leg.get("end_address"),
-                    "polyline": leg_polyline,
-                })
-
-            return {
-                "legs": legs_data,
-                "overview_polyline": route.get("overview_polyline", {}).get("points"),
-            }
+        if data.get("status") != "OK":
+            if data.get("status") == "ZERO_RESULTS":
+                return {"legs": [], "overview_polyline": None}
+            raise ValueError(f"Google Directions API error: {data.get('status')}")
+
+        route = data.get("routes", [{}])[0]
+        legs_data = []
+
+        for leg in route.get("legs", []):
+            # Combine all step polylines into a single leg polyline, joining the
+            # encoded strings directly (shared step endpoints are not duplicated)
+            leg_polyline = stitch_polylines([
+                step.get("polyline", {}).get("points") for step in leg.get("steps", [])
+            ])
+
+            legs_data.append({
+                "duration_seconds": leg.get("duration", {}).get("value"),
+                "duration_text": leg.get("duration", {}).get("text"),
+                "distance_meters": leg.get("distance", {}).get("value"),
+                "distance_text": leg.get("distance", {}).get("text"),
+                "start_address": leg.get("start_address"),
+                "end_address": leg.get("end_address"),
+                "polyline": leg_polyline,
+            })
+
+        return {
+            "legs": legs_data,
+            "overview_polyline": route.get("overview_polyline", {}).get("points"),
+        }
+
+    @MAPS_METRICS.wrap("route_legs")
+    async def route_legs(
+        self,
+        coords: list[str],
+        mode: str = "driving",
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """
+        Get the legs of a route through ordered stops, reusing stored legs.
+
+        When every consecutive leg (with its polyline) is in the travel-time
+        store, no Directions request is made. Otherwise one Directions call
+        covers the whole route and its legs are stored for next time.
+
+        Args:
+            coords: Ordered stops as "lat,lng" strings (at least two)
+            mode: Travel mode (driving, walking, bicycling, transit)
+
+        Returns:
+            Tuple of (legs as returned by get_directions(), whether they all
+            came from the store)
+        """
+        keys = []
+        if self.travel_times is not None:
+            points = [parse_latlng(c) for c in coords]
+            if all(points):
+                keys = [
+                    self.travel_times.make_key(points[i], points[i + 1], mode)
+                    for i in range(len(points) - 1)
+                ]
+
+        if keys:
+            found = await self.travel_times.get_many(keys)
+            if all(key in found and found[key].get("polyline") for key in keys):
+                return [found[key] for key in keys], True
+
+        directions = await self.get_directions(
+            origin=coords[0],
+            destination=coords[-1],
+            waypoints=coords[1:-1] if len(coords) > 2 else None,
+            mode=mode,
+        )
+        legs = directions.get("legs", [])
+
+        if keys and len(legs) == len(keys):
+            await self.travel_times.put_many([
+                (key, leg) for key, leg in zip(keys, legs)
+                if leg.get("duration_seconds") is not None
+            ])
+        return legs, False
+
+    async def leg_polylines_at_detail(
+        self,
+        legs: list[tuple[Coordinate | None, Coordinate | None, str]],
+        detail: str,
+        mode: str = "driving",
+    ) -> list[str]:
+        """
+        Get leg polylines simplified to a detail tier.
+
+        Tiers already stored with the leg in the travel-time store are
+        reused. The rest are simplified in a worker thread (Douglas-Peucker
+        is CPU-bound) and stored with their legs for next time.
+
+        Args:
+            legs: (origin, destination, encoded polyline) per leg; endpoints
+                may be None when unknown, which skips the store
+            detail: Tier name from POLYLINE_TIER_TOLERANCES_M, or "full"
+            mode: Travel mode the legs were routed with
+
+        Returns:
+            Encoded polylines at the requested detail, in input order
+        """
+        polylines = [encoded for _, _, encoded in legs]
+        if detail == "full" or not legs:
+            return polylines
+
+        keys: list = [None] * len(legs)
+        if self.travel_times is not None:
+            keys = [
+                self.travel_times.make_key(origin, destination, mode)
+                if origin and destination else None
+                for origin, destination, _ in legs
+            ]
+            found = await self.travel_times.get_many([key for key in keys if key])
+        else:
+            found = {}
+
+        result: list[str | None] = []
+        for key, encoded in zip(keys, polylines):
+            stored = found.get(key) if key else None
+            if stored and stored.get("polyline") == encoded:
+                result.append(stored.get("polyline_tiers", {}).get(detail))
+            else:
+                result.append(None)
+
+        missing = [i for i, value in enumerate(result) if value is None]
+        if missing:
+            simplified = await asyncio.to_thread(
+                lambda: [polyline_for_detail(polylines[i], detail) for i in missing]
+            )
+            for i, value in zip(missing, simplified):
+                result[i] = value
+            if self.travel_times is not None:
+                await self.travel_times.put_tiers([
+                    (keys[i], polylines[i], {detail: result[i]})
+                    for i in missing if keys[i] and keys[i] in found
+                ])
+        return result
+
+
+# Shared service instance, opened and closed by the FastAPI lifespan
+_shared_service: GoogleMapsService | None = None
+
+
+def get_google_maps_service() -> GoogleMapsService:
+    """Get or create the shared Google Maps service instance."""
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = GoogleMapsService(
+            settings.GOOGLE_MAPS_API_KEY,
+            max_connections=settings.MAPS_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MAPS_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.MAPS_HTTP_KEEPALIVE_EXPIRY,
+            http2=settings.MAPS_HTTP2,
+            cache=ResponseCache(
+                max_entries=settings.MAPS_CACHE_MAX_ENTRIES,
+                sqlite_path=settings.MAPS_CACHE_SQLITE_PATH or None,
+                ttls={
+                    "text_search": settings.MAPS_CACHE_TTL_TEXT_SEARCH,
+                    "place_details": settings.MAPS_CACHE_TTL_PLACE_DETAILS,
+                },
+            ) if settings.MAPS_CACHE_ENABLED else None,
+            coalesce=settings.UPSTREAM_COALESCING_ENABLED,
+            matrix_max_elements=settings.DISTANCE_MATRIX_MAX_ELEMENTS,
+            matrix_max_dimension=settings.DISTANCE_MATRIX_MAX_DIMENSION,
+            matrix_concurrency=settings.DISTANCE_MATRIX_CONCURRENCY,
+            matrix_elements_per_second=settings.DISTANCE_MATRIX_ELEMENTS_PER_SECOND,
+            travel_times=TravelTimeStore(
+                path=settings.TRAVEL_TIME_CACHE_PATH or str(BACKEND_DIR / "travel_times.db"),
+                max_entries=settings.TRAVEL_TIME_CACHE_MAX_ENTRIES,
+                memory_entries=settings.TRAVEL_TIME_CACHE_MEMORY_ENTRIES,
+                precision=settings.TRAVEL_TIME_CACHE_PRECISION,
+                ttl_seconds=settings.TRAVEL_TIME_CACHE_TTL,
+            ) if settings.TRAVEL_TIME_CACHE_ENABLED else None,
+            base_url=settings.GOOGLE_MAPS_BASE_URL,
+            autocomplete_cache=AutocompleteCache(
+                max_entries=settings.AUTOCOMPLETE_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.AUTOCOMPLETE_CACHE_TTL,
+            ) if settings.AUTOCOMPLETE_CACHE_ENABLED else None,
+            prefetch_top_k=(
+                settings.PLACE_DETAILS_PREFETCH_TOP_K if settings.PLACE_DETAILS_PREFETCH_ENABLED else 0
+            ),
+            prefetch_concurrency=settings.PLACE_DETAILS_PREFETCH_CONCURRENCY,
+            prefetch_max_pending=settings.PLACE_DETAILS_PREFETCH_MAX_PENDING,
+            prefetch_window_seconds=settings.PLACE_DETAILS_PREFETCH_WINDOW,
+            governor=governor_from_settings(
+                "google_maps", settings.MAPS_REQUESTS_PER_SECOND, settings.MAPS_MAX_CONCURRENCY
+            ),
+        )
+    return _shared_service
+
+
+async def close_google_maps_service() -> None:
+    """Close the shared Google Maps service and release its connection pool."""
+    global _shared_service
+    if _shared_service is not None:
+        await _shared_service.aclose()
+        _shared_service = None
@@ -0,0 +1,377 @@
+"""
+Upstream governor: rate limiting, adaptive concurrency and retries per API.
+
+Every request to an upstream API (Google Maps, Tavily) goes through that
+API's governor, which
+
+- waits for a token from a token bucket (requests per second),
+- waits for a concurrency slot; the slot limit grows by one per limit's
+  worth of successes and halves when the API throttles (AIMD),
+- retries throttled, failed or timed-out idempotent calls with capped
+  exponential backoff and full jitter (honoring Retry-After), and
+- only retries while the retry budget allows, so retries stay a bounded
+  fraction of traffic and cannot amplify an outage.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+import httpx
+
+from ..config import settings
+from .metrics import UPSTREAM_CONCURRENCY_LIMIT, UPSTREAM_RETRIES, UPSTREAM_THROTTLED
+from .rate_limit import TokenBucket
+
+T = TypeVar("T")
+
+# HTTP statuses that mean "slow down" and shrink the concurrency limit
+THROTTLE_STATUSES = {429, 503}
+# Server errors worth retrying (the request was not processed)
+RETRYABLE_STATUSES = {500, 502, 504}
+
+
+class UpstreamThrottled(Exception):
+    """Raised by a request function when the response body says the API is throttling."""
+
+    def __init__(self, body: Any = None) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            body: Decoded throttled response, for callers that handle it once retries run out
+        """
+        super().__init__("upstream API is throttling requests")
+        self.body = body
+
+
+class RetryBudget:
+    """
+    Sliding-window retry budget.
+
+    Within any window, retries may not exceed `ratio` of the requests
+    made, except for a small floor of `min_retries` so low-traffic
+    periods can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window_seconds: float = 10.0) -> None:
+        """
+        Initialize an empty budget.
+
+        Args:
+            ratio: Retries allowed per request in the window
+            min_retries: Retries always allowed per window
+            window_seconds: Length of the sliding window
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        """Drop events older than the window."""
+        cutoff = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Record a first attempt, which earns retry allowance."""
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """
+        Take one retry from the budget.
+
+        Returns:
+            True if the retry is allowed
+        """
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_retries, self.ratio * len(self._requests))
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted by additive increase, multiplicative decrease.
+
+    Like TCP congestion control, the limit is cut at most once per "round":
+    throttled responses to requests sent before the last cut were sent
+    under the old limit and do not cut it again.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        """
+        Initialize the limit.
+
+        Args:
+            initial: Starting limit
+            minimum: Lowest limit after decreases
+            maximum: Highest limit after increases
+            decrease_factor: Multiplier applied when the API throttles
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        # Incremented on every cut; slots remember the epoch they were taken in
+        self._epoch = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters in arrival order."""
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def acquire(self) -> int:
+        """
+        Wait for a free slot under the current limit.
+
+        Returns:
+            The epoch the slot was taken in, for on_throttle()
+        """
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass a slot we were woken for on to the next waiter
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self.in_flight += 1
+        return self._epoch
+
+    def release(self) -> None:
+        """Free a slot."""
+        self.in_flight -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        """Additive increase: about +1 per limit's worth of successful calls."""
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_throttle(self, epoch: int) -> None:
+        """
+        Multiplicative decrease, unless the limit was already cut since the slot was taken.
+
+        Args:
+            epoch: Value acquire() returned for the throttled request
+        """
+        if epoch != self._epoch:
+            return
+        self._epoch += 1
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Read a Retry-After delay in seconds from an HTTP error response."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class UpstreamGovernor:
+    """Rate limit, adaptive concurrency limit and retry policy for one upstream API."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_second: float = 0.0,
+        max_concurrency: int = 32,
+        min_concurrency: int = 1,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+        retry_budget: RetryBudget | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """
+        Initialize the governor.
+
+        Args:
+            name: API name used in metrics (e.g. "google_maps")
+            requests_per_second: Request rate limit (0 disables)
+            max_concurrency: Starting and highest concurrency limit
+            min_concurrency: Lowest concurrency limit when throttled
+            max_retries: Retries per call after the first attempt
+            backoff_base: Backoff ceiling in seconds for the first retry
+            backoff_max: Largest backoff ceiling in seconds
+            retry_budget: Shared retry budget (defaults to a new RetryBudget)
+            seed: Seed for the backoff jitter
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._bucket = TokenBucket(requests_per_second)
+        self.concurrency = AdaptiveConcurrency(
+            max_concurrency, minimum=min_concurrency, maximum=max_concurrency
+        )
+        self.retry_budget = retry_budget or RetryBudget()
+        self._rng = random.Random(seed)
+        self._stats = {
+            "calls": 0, "retries": 0, "throttled": 0, "errors": 0, "budget_exhausted": 0,
+        }
+        UPSTREAM_CONCURRENCY_LIMIT.labels(name).set(self.concurrency.limit)
+
+    def _classify(self, error: Exception, idempotent: bool) -> str | None:
+        """
+        Decide whether a failed attempt is retried.
+
+        Returns:
+            "throttled" or "error" for retryable failures, None otherwise
+        """
+        if isinstance(error, UpstreamThrottled):
+            return "throttled"
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            if status in THROTTLE_STATUSES:
+                # The API rejected the request, so retrying is safe either way
+                return "throttled"
+            if status in RETRYABLE_STATUSES and idempotent:
+                return "error"
+            return None
+        if isinstance(error, httpx.TransportError) and idempotent:
+            return "error"
+        return None
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Jittered delay before a retry ("full jitter").
+
+        Args:
+            attempt: Retry number, starting at 0
+
+        Returns:
+            Delay in seconds, uniform between 0 and the capped exponential ceiling
+        """
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, request: Callable[[], Awaitable[T]], idempotent: bool = True) -> T:
+        """
+        Run an upstream request under the rate limit, concurrency limit and retry policy.
+
+        Args:
+            request: Performs one attempt; raises httpx errors for failed
+                responses and UpstreamThrottled for throttled response bodies
+            idempotent: Whether the call may be retried after errors where the
+                request might have been processed (throttled calls are always
+                retried)
+
+        Returns:
+            The request's result
+
+        Raises:
+            The last attempt's exception when it is not retryable, retries are
+            exhausted or the retry budget is spent
+        """
+        self._stats["calls"] += 1
+        self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            epoch = await self.concurrency.acquire()
+            try:
+                result = await request()
+            except Exception as e:
+                reason = self._classify(e, idempotent)
+                if reason == "throttled":
+                    self._stats["throttled"] += 1
+                    UPSTREAM_THROTTLED.labels(self.name).inc()
+                    self.concurrency.on_throttle(epoch)
+                    UPSTREAM_CONCURRENCY_LIMIT.labels(self.name).set(self.concurrency.limit)
+                elif reason == "error":
+                    self._stats["errors"] += 1
+                if reason is None or attempt >= self.max_retries:
+                    raise
+                if not self.retry_budget.try_spend():
+                    self._stats["budget_exhausted"] += 1
+                    UPSTREAM_RETRIES.labels(self.name, "budget_exhausted").inc()
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = self.backoff(attempt)
+            else:
+                self.concurrency.on_success()
+                UPSTREAM_CONCURRENCY_LIMIT.labels(self.name).set(self.concurrency.limit)
+                return result
+            finally:
+                self.concurrency.release()
+
+            self._stats["retries"] += 1
+            UPSTREAM_RETRIES.labels(self.name, reason).inc()
+            attempt += 1
+            await asyncio.sleep(min(delay, self.backoff_max))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get governor counters.
+
+        Returns:
+            Calls, retries, throttled and failed attempts, budget refusals,
+            and the current concurrency limit and in-flight count
+        """
+        return {
+            **self._stats,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+        }
+
+
+def governor_from_settings(
+    name: str,
+    requests_per_second: float,
+    max_concurrency: int,
+) -> UpstreamGovernor | None:
+    """
+    Build an API's governor with the shared retry settings.
+
+    Args:
+        name: API name used in metrics
+        requests_per_second: Request rate limit for this API (0 disables)
+        max_concurrency: Concurrency limit for this API
+
+    Returns:
+        The governor, or None when UPSTREAM_GOVERNOR_ENABLED is off
+    """
+    if not settings.UPSTREAM_GOVERNOR_ENABLED:
+        return None
+    return UpstreamGovernor(
+        name,
+        requests_per_second=requests_per_second,
+        max_concurrency=max_concurrency,
+        max_retries=settings.UPSTREAM_MAX_RETRIES,
+        backoff_base=settings.UPSTREAM_BACKOFF_BASE,
+        backoff_max=settings.UPSTREAM_BACKOFF_MAX,
+        retry_budget=RetryBudget(
+            ratio=settings.UPSTREAM_RETRY_BUDGET_RATIO,
+            min_retries=settings.UPSTREAM_RETRY_BUDGET_MIN,
+            window_seconds=settings.UPSTREAM_RETRY_BUDGET_WINDOW,
+        ),
+    )
@@ -0,0 +1,133 @@
+"""
+Prometheus metrics for the Travel Planner backend.
+
+Always-on, in-process counters, gauges and latency histograms for graph
+nodes, Google Maps calls, agent tools, LLM calls and itinerary generation
+stages, plus cache and single-flight counters. Exposed in the Prometheus
+text format at GET /metrics. LLM calls are recorded by the LangChain
+callback in app/agent/callbacks.py.
+"""
+import functools
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+T = TypeVar("T")
+
+# Latency buckets from fast cache hits up to long LLM tool loops
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+
+class StageMetrics:
+    """Latency histogram, error counter and in-flight gauge for one kind of operation."""
+
+    def __init__(self, prefix: str, description: str, label: str) -> None:
+        """
+        Register the metric family.
+
+        Args:
+            prefix: Metric name prefix, e.g. "travel_planner_node"
+            description: What is being measured, used in the metric help text
+            label: Label name distinguishing operations, e.g. "node"
+        """
+        self.duration = Histogram(
+            f"{prefix}_duration_seconds", f"Duration of {description}", [label],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.errors = Counter(f"{prefix}_errors_total", f"Failed {description}", [label])
+        self.in_flight = Gauge(f"{prefix}_in_flight", f"{description.capitalize()} in progress", [label])
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[None]:
+        """
+        Time a block, counting it as in flight and recording errors.
+
+        Args:
+            name: Label value for the operation
+        """
+        in_flight = self.in_flight.labels(name)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors.labels(name).inc()
+            raise
+        finally:
+            self.duration.labels(name).observe(time.perf_counter() - started)
+            in_flight.dec()
+
+    def wrap(self, name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+        """
+        Decorate an async function so every call is tracked.
+
+        Args:
+            name: Label value for the operation
+
+        Returns:
+            Decorator preserving the function's signature
+        """
+        def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                with self.track(name):
+                    return await fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+NODE_METRICS = StageMetrics("travel_planner_node", "LangGraph node executions", "node")
+MAPS_METRICS = StageMetrics("travel_planner_maps", "Google Maps service calls", "method")
+TOOL_METRICS = StageMetrics("travel_planner_tool", "agent tool calls", "tool")
+LLM_METRICS = StageMetrics("travel_planner_llm", "LLM calls", "model")
+ITINERARY_STAGE_METRICS = StageMetrics(
+    "travel_planner_itinerary_stage", "itinerary generation stages", "stage"
+)
+
+LLM_TOKENS = Counter(
+    "travel_planner_llm_tokens_total", "LLM tokens by direction", ["model", "direction"]
+)
+CACHE_LOOKUPS = Counter(
+    "travel_planner_cache_lookups_total", "Cache lookups by result", ["cache", "result"]
+)
+UPSTREAM_CALLS = Counter(
+    "travel_planner_upstream_calls_total",
+    "Calls through single-flight coalescing, by whether they went upstream or joined one in flight",
+    ["namespace", "result"],
+)
+
+UPSTREAM_RETRIES = Counter(
+    "travel_planner_upstream_retries_total",
+    "Upstream retries by API and reason (throttled, error), plus retries refused by the budget",
+    ["api", "reason"],
+)
+UPSTREAM_THROTTLED = Counter(
+    "travel_planner_upstream_throttled_total", "Throttled upstream responses by API", ["api"]
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "travel_planner_upstream_concurrency_limit", "Adaptive upstream concurrency limit by API", ["api"]
+)
+DISCOVERY_PROMPT_TOKENS = Histogram(
+    "travel_planner_discovery_prompt_tokens",
+    "Estimated location discovery prompt tokens per LLM iteration, before and after compaction",
+    ["stage"],
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+PREFETCH_RESULTS = Counter(
+    "travel_planner_prefetch_total",
+    "Speculative place details prefetches by outcome (issued, hits, wasted, already_cached, skipped, errors)",
+    ["result"],
+)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all registered metrics.
+
+    Returns:
+        Tuple of (exposition body, content type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,251 @@
+"""
+Encoded polyline helpers.
+
+Google encodes polylines as zig-zag base-64 varints of coordinate deltas
+(1e-5 degree units), with the first point stored as a delta from (0, 0).
+Consecutive step polylines can therefore be joined without decoding to
+floats and re-encoding: only the first point of each appended string has
+to be rebased onto the last point of the string before it. Where decoding
+is unavoidable, coordinates are kept as flat integer arrays instead of
+lists of float tuples.
+
+Leg polylines are also simplified (Douglas-Peucker) into coarser detail
+tiers so API responses can carry lighter geometry for zoomed-out views.
+"""
+import math
+from array import array
+from functools import lru_cache
+
+# Encoded values are offsets from this character code
+_CHAR_OFFSET = 63
+# Low 5 bits of each character carry data; 0x20 marks a continuation chunk
+_CHUNK_BITS = 5
+_CONTINUATION = 0x20
+_CHUNK_MASK = 0x1F
+
+# Meters per 1e-5 degree of latitude
+_METERS_PER_UNIT = 1.11195
+
+# Douglas-Peucker tolerance in meters for each simplified detail tier
+POLYLINE_TIER_TOLERANCES_M = {"street": 2.0, "city": 10.0, "overview": 40.0}
+# "full" is the unsimplified Directions geometry
+POLYLINE_DETAILS = ("full", *POLYLINE_TIER_TOLERANCES_M)
+
+
+def encode_value(value: int) -> str:
+    """
+    Encode one signed integer delta.
+
+    Args:
+        value: Delta in 1e-5 degree units
+
+    Returns:
+        Encoded characters
+    """
+    value = ~(value << 1) if value < 0 else value << 1
+    chars = []
+    while value >= _CONTINUATION:
+        chars.append(chr((_CONTINUATION | (value & _CHUNK_MASK)) + _CHAR_OFFSET))
+        value >>= _CHUNK_BITS
+    chars.append(chr(value + _CHAR_OFFSET))
+    return "".join(chars)
+
+
+def _read_value(encoded: str, index: int) -> tuple[int, int]:
+    """Read one signed varint starting at index; return (value, next index)."""
+    result = 0
+    shift = 0
+    while True:
+        chunk = ord(encoded[index]) - _CHAR_OFFSET
+        index += 1
+        result |= (chunk & _CHUNK_MASK) << shift
+        shift += _CHUNK_BITS
+        if chunk < _CONTINUATION:
+            break
+    return (~(result >> 1) if result & 1 else result >> 1), index
+
+
+def _endpoints(encoded: str) -> tuple[int, int, int, int, int]:
+    """
+    Find the first and last points of an encoded polyline without materializing it.
+
+    Returns:
+        (first lat, first lng, index after the first point, last lat, last lng)
+    """
+    lat, index = _read_value(encoded, 0)
+    lng, index = _read_value(encoded, index)
+    first_end = index
+    first_lat, first_lng = lat, lng
+    length = len(encoded)
+    while index < length:
+        delta, index = _read_value(encoded, index)
+        lat += delta
+        delta, index = _read_value(encoded, index)
+        lng += delta
+    return first_lat, first_lng, first_end, lat, lng
+
+
+def stitch_polylines(encoded_parts: list[str | None]) -> str | None:
+    """
+    Join encoded polylines end to end without decoding them to coordinates.
+
+    A part whose first point repeats the previous part's last point has
+    that point dropped, matching a decode/concatenate/encode round trip.
+
+    Args:
+        encoded_parts: Encoded polylines in order (empty or None parts are skipped)
+
+    Returns:
+        One encoded polyline, or None if there were no points
+    """
+    pieces: list[str] = []
+    last: tuple[int, int] | None = None
+    for encoded in encoded_parts:
+        if not encoded:
+            continue
+        first_lat, first_lng, first_end, last_lat, last_lng = _endpoints(encoded)
+        if last is None:
+            pieces.append(encoded)
+        elif (first_lat, first_lng) == last:
+            pieces.append(encoded[first_end:])
+        else:
+            # Rebase the first point onto the previous part's last point
+            pieces.append(encode_value(first_lat - last[0]))
+            pieces.append(encode_value(first_lng - last[1]))
+            pieces.append(encoded[first_end:])
+        last = (last_lat, last_lng)
+    return "".join(pieces) if pieces else None
+
+
+def decode_ints(encoded: str) -> array:
+    """
+    Decode a polyline into a flat integer buffer.
+
+    Args:
+        encoded: Encoded polyline
+
+    Returns:
+        array("l") of interleaved absolute lat, lng values in 1e-5 degrees
+    """
+    values = array("l")
+    lat = lng = 0
+    index = 0
+    length = len(encoded)
+    while index < length:
+        delta, index = _read_value(encoded, index)
+        lat += delta
+        delta, index = _read_value(encoded, index)
+        lng += delta
+        values.append(lat)
+        values.append(lng)
+    return values
+
+
+def encode_ints(values: array | list[int]) -> str:
+    """
+    Encode a flat integer buffer from decode_ints().
+
+    Args:
+        values: Interleaved absolute lat, lng values in 1e-5 degrees
+
+    Returns:
+        Encoded polyline
+    """
+    chars = []
+    prev_lat = prev_lng = 0
+    for i in range(0, len(values), 2):
+        lat, lng = values[i], values[i + 1]
+        chars.append(encode_value(lat - prev_lat))
+        chars.append(encode_value(lng - prev_lng))
+        prev_lat, prev_lng = lat, lng
+    return "".join(chars)
+
+
+def simplify_ints(values: array | list[int], tolerance_m: float) -> array:
+    """
+    Simplify a flat integer buffer with the Douglas-Peucker algorithm.
+
+    Distances are measured on an equirectangular projection around the
+    polyline's first point, which is accurate at the scale of a single leg.
+
+    Args:
+        values: Interleaved absolute lat, lng values in 1e-5 degrees
+        tolerance_m: Largest allowed deviation from the original line in meters
+
+    Returns:
+        array("l") with the kept points (always including both endpoints)
+    """
+    count = len(values) // 2
+    if count <= 2 or tolerance_m <= 0:
+        return array("l", values)
+
+    lng_scale = math.cos(math.radians(values[0] / 1e5))
+    ys = values[0::2]
+    xs = [lng * lng_scale for lng in values[1::2]]
+    tolerance_sq = (tolerance_m / _METERS_PER_UNIT) ** 2
+
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        length_sq = dx * dx + dy * dy
+        max_dist_sq = -1.0
+        max_index = first
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if length_sq:
+                # Distance to the closest point on the segment
+                t = min(1.0, max(0.0, (px * dx + py * dy) / length_sq))
+                px -= t * dx
+                py -= t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                max_index = i
+        if max_dist_sq > tolerance_sq:
+            keep[max_index] = 1
+            if max_index - first > 1:
+                stack.append((first, max_index))
+            if last - max_index > 1:
+                stack.append((max_index, last))
+
+    simplified = array("l")
+    for i in range(count):
+        if keep[i]:
+            simplified.append(values[2 * i])
+            simplified.append(values[2 * i + 1])
+    return simplified
+
+
+def simplify_polyline(encoded: str, tolerance_m: float) -> str:
+    """
+    Simplify an encoded polyline.
+
+    Args:
+        encoded: Encoded polyline
+        tolerance_m: Largest allowed deviation from the original line in meters
+
+    Returns:
+        Encoded simplified polyline
+    """
+    return encode_ints(simplify_ints(decode_ints(encoded), tolerance_m))
+
+
+@lru_cache(maxsize=4096)
+def polyline_for_detail(encoded: str, detail: str) -> str:
+    """
+    Get one detail tier of a leg polyline, simplifying only that tier.
+
+    Args:
+        encoded: Encoded leg polyline
+        detail: One of POLYLINE_DETAILS
+
+    Returns:
+        Encoded polyline at that detail
+    """
+    if detail not in POLYLINE_TIER_TOLERANCES_M:
+        return encoded
+    return simplify_polyline(encoded, POLYLINE_TIER_TOLERANCES_M[detail])
@@ -0,0 +1,160 @@
+"""
+Speculative prefetch of place details for top search results.
+
+During discovery the agent usually runs search_places, waits a full LLM
+turn, then asks for details of most of the top results. The prefetcher
+fetches details for the highest-rated results in the background as soon as
+a search returns, so they are already in the response cache when the LLM
+asks. Each prefetch is tracked until the details are requested (a hit) or
+the tracking window passes (wasted).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from .metrics import PREFETCH_RESULTS
+
+
+class DetailsPrefetcher:
+    """Bounded background prefetcher for place details with hit/waste accounting."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[bool]],
+        top_k: int = 5,
+        concurrency: int = 4,
+        max_pending: int = 50,
+        window_seconds: float = 600.0,
+    ) -> None:
+        """
+        Initialize the prefetcher.
+
+        Args:
+            fetch: Fetches one place's details into the cache; returns False
+                when they were already cached (no upstream call was made)
+            top_k: Highest-rated results prefetched per search
+            concurrency: Prefetch requests running at once
+            max_pending: Prefetches queued or running at once; further
+                candidates are skipped
+            window_seconds: Prefetched details not requested within this
+                window are counted as wasted
+        """
+        self._fetch = fetch
+        self.top_k = top_k
+        self.max_pending = max_pending
+        self.window_seconds = window_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[str, asyncio.Task] = {}
+        # place_id -> time the prefetch was issued, until claimed or expired
+        self._tracked: OrderedDict[str, float] = OrderedDict()
+        self._stats = {
+            "issued": 0, "hits": 0, "wasted": 0, "already_cached": 0, "skipped": 0, "errors": 0,
+        }
+
+    def _count(self, counter: str) -> None:
+        """Increment an outcome counter."""
+        self._stats[counter] += 1
+        PREFETCH_RESULTS.labels(counter).inc()
+
+    def _expire(self, now: float) -> None:
+        """Count prefetches that were never requested within the window as wasted."""
+        while self._tracked:
+            place_id, issued_at = next(iter(self._tracked.items()))
+            if now - issued_at <= self.window_seconds:
+                break
+            del self._tracked[place_id]
+            self._count("wasted")
+
+    def schedule(self, places: list[dict[str, Any]]) -> int:
+        """
+        Start background prefetches for the top-rated places of a search result.
+
+        Args:
+            places: Places from places_text_search()
+
+        Returns:
+            Number of prefetches started
+        """
+        now = time.time()
+        self._expire(now)
+        candidates = [p for p in places if p.get("place_id") and "error" not in p]
+        candidates.sort(
+            key=lambda p: (p.get("rating") or 0, p.get("user_ratings_total") or 0), reverse=True
+        )
+
+        started = 0
+        for place in candidates[:self.top_k]:
+            place_id = place["place_id"]
+            if place_id in self._tracked or place_id in self._tasks:
+                continue
+            if len(self._tasks) >= self.max_pending:
+                self._count("skipped")
+                continue
+            self._tracked[place_id] = now
+            self._tasks[place_id] = asyncio.create_task(self._run(place_id))
+            started += 1
+        return started
+
+    async def _run(self, place_id: str) -> None:
+        """Fetch one place's details, dropping it from tracking if nothing was fetched."""
+        try:
+            async with self._semaphore:
+                went_upstream = await self._fetch(place_id)
+            if went_upstream:
+                self._count("issued")
+            else:
+                self._tracked.pop(place_id, None)
+                self._count("already_cached")
+        except asyncio.CancelledError:
+            self._tracked.pop(place_id, None)
+            raise
+        except Exception as e:
+            self._tracked.pop(place_id, None)
+            self._count("errors")
+            print(f"Place details prefetch failed for {place_id}: {e}")
+        finally:
+            self._tasks.pop(place_id, None)
+
+    def claim(self, place_id: str) -> bool:
+        """
+        Record a real details request, counting a hit if it was prefetched.
+
+        A request for a place whose prefetch is still running counts as a
+        hit too: it joins the in-flight request instead of starting one.
+
+        Args:
+            place_id: Requested Google Place ID
+
+        Returns:
+            True if the place had been prefetched
+        """
+        self._expire(time.time())
+        if self._tracked.pop(place_id, None) is None:
+            return False
+        self._count("hits")
+        return True
+
+    async def aclose(self) -> None:
+        """Cancel prefetches that are still queued or running."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Tasks cancelled before they started never reach their own cleanup
+        self._tasks.clear()
+        self._tracked.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get prefetch counters.
+
+        Returns:
+            Outcome counters plus hit rate (hits per completed prefetch) and pending count
+        """
+        completed = self._stats["issued"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / completed, 4) if completed else 0.0,
+            "pending": len(self._tasks),
+        }
@@ -0,0 +1,54 @@
+"""
+Async token-bucket rate limiter for upstream API quotas.
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at `rate` tokens per second.
+
+    Callers await acquire(n) before spending n units of quota (requests,
+    Distance Matrix elements, ...). Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            capacity: Maximum burst size (defaults to one second of tokens)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Wait until `tokens` are available and take them.
+
+        Requests larger than the capacity are allowed once the bucket is
+        full, so they are delayed but never rejected.
+
+        Args:
+            tokens: Number of tokens to take
+        """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            needed = min(tokens, self.capacity)
+            self._refill()
+            while self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
@@ -0,0 +1,109 @@
+"""
+Compact serialization shared by tool messages, caches and API responses.
+
+JSON is encoded with orjson (compact, UTF-8, no indentation). API responses
+can also be sent as MessagePack when the client asks for it in its Accept
+header; JSON stays the default.
+"""
+from typing import Any
+
+import msgpack
+import orjson
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Accept values that select MessagePack (the unregistered "x-" form is still common)
+_MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact JSON.
+
+    Args:
+        value: JSON-serializable value (dict keys may be non-strings)
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps_text(value: Any) -> str:
+    """
+    Encode a value as compact JSON text, e.g. for LLM tool messages.
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        JSON string
+    """
+    return dumps(value).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Decode JSON text or bytes.
+
+    Args:
+        data: JSON document
+
+    Returns:
+        Decoded value
+    """
+    return orjson.loads(data)
+
+
+def negotiate_media_type(accept: str | None) -> str:
+    """
+    Pick the response format for an Accept header.
+
+    MessagePack is used when it is listed with a higher (or equal, but
+    earlier) quality than JSON; anything else gets JSON.
+
+    Args:
+        accept: Raw Accept header value
+
+    Returns:
+        JSON_MEDIA_TYPE or MSGPACK_MEDIA_TYPE
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    best_type, best_quality = JSON_MEDIA_TYPE, 0.0
+    for entry in accept.split(","):
+        media_type, _, params = entry.strip().partition(";")
+        media_type = media_type.strip().lower()
+        if media_type in _MSGPACK_MEDIA_TYPES:
+            candidate = MSGPACK_MEDIA_TYPE
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*"):
+            candidate = JSON_MEDIA_TYPE
+        else:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > best_quality:
+            best_type, best_quality = candidate, quality
+    return best_type
+
+
+def encode_body(value: Any, media_type: str) -> bytes:
+    """
+    Encode a response body in a negotiated format.
+
+    Args:
+        value: JSON-compatible value (e.g. from model_dump(mode="json"))
+        media_type: Result of negotiate_media_type()
+
+    Returns:
+        Encoded body
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(value, use_bin_type=True)
+    return dumps(value)
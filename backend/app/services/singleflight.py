@@ -0,0 +1,108 @@
+"""
+Single-flight coalescing of identical concurrent upstream requests.
+
+When several callers ask for the same thing at the same moment (the LLM
+repeating a search within one turn, or two sessions planning the same
+city), only the first caller's request goes upstream; the others await the
+same in-flight result.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from .metrics import UPSTREAM_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one execution.
+
+    The shared call runs as its own task, so a caller that gives up (e.g. a
+    cancelled request) does not cancel the result other callers are waiting
+    for. Calls made with cancel_abandoned=True are cancelled once their last
+    waiter has given up. Results and exceptions are delivered to every
+    waiter, so shared results must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no calls in flight."""
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, namespace: str, counter: str) -> None:
+        """Increment a counter for a namespace."""
+        namespace_stats = self._stats.setdefault(
+            namespace, {"calls": 0, "upstream_calls": 0, "collapsed": 0}
+        )
+        namespace_stats[counter] += 1
+        if counter != "calls":
+            UPSTREAM_CALLS.labels(namespace, counter).inc()
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        """Forget a finished call so later callers start a fresh one."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        namespace: str = "default",
+        cancel_abandoned: bool = False,
+    ) -> T:
+        """
+        Run `fn` unless an identical call is already in flight, then share its result.
+
+        Args:
+            key: Exact request identity, e.g. (path, sorted params)
+            fn: Zero-argument coroutine function performing the upstream call
+            namespace: Counter group, usually the endpoint name
+            cancel_abandoned: Cancel the shared call when every waiter has
+                been cancelled (e.g. superseded autocomplete keystrokes)
+
+        Returns:
+            The result of the single shared call
+        """
+        self._count(namespace, "calls")
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(namespace, "collapsed")
+        else:
+            self._count(namespace, "upstream_calls")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if cancel_abandoned and self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct calls currently in flight."""
+        return len(self._inflight)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get call counters per namespace.
+
+        Returns:
+            Dictionary with calls, upstream calls and collapsed calls per namespace
+        """
+        return {
+            "in_flight": self.in_flight,
+            "namespaces": {name: dict(counters) for name, counters in self._stats.items()},
+        }
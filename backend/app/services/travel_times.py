@@ -0,0 +1,347 @@
+"""
+Persistent pairwise travel-time store.
+
+Directions and Distance Matrix results for the same two points are reused
+across enrichment passes, regenerations after edits and different users
+visiting the same landmarks. Entries are keyed by origin/destination
+coordinates rounded to a fixed precision, the travel mode and a
+departure-time bucket, and hold the duration, distance and (when known
+from Directions) the encoded leg polyline, plus any simplified detail
+tiers of that polyline built for API responses.
+
+A bounded in-process LRU sits in front of a compact SQLite table (integer
+coordinate keys, WITHOUT ROWID) that is trimmed back by least-recent use.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any
+
+from .metrics import CACHE_LOOKUPS
+from .serialization import dumps_text, loads
+
+Coordinate = tuple[float, float]
+PairKey = tuple[int, int, int, int, str, int]
+
+# Bucket used when no departure time is given
+NO_DEPARTURE_BUCKET = -1
+
+
+def parse_latlng(value: str) -> Coordinate | None:
+    """
+    Parse a "lat,lng" string.
+
+    Args:
+        value: Coordinate string such as "48.8584,2.2945"
+
+    Returns:
+        (lat, lng) tuple, or None if the value is not a coordinate pair
+    """
+    parts = value.split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+
+def time_bucket(departure_time: datetime | None, bucket_hours: int = 3) -> int:
+    """
+    Map a departure time to a time-of-day bucket.
+
+    Args:
+        departure_time: Planned departure, or None when not time-dependent
+        bucket_hours: Width of each bucket in hours
+
+    Returns:
+        Bucket index within the day, or NO_DEPARTURE_BUCKET
+    """
+    if departure_time is None:
+        return NO_DEPARTURE_BUCKET
+    return departure_time.hour // max(1, bucket_hours)
+
+
+class TravelTimeStore:
+    """
+    Two-tier (memory LRU + SQLite) cache of point-to-point travel legs.
+
+    Values are dictionaries with duration_seconds, distance_meters,
+    polyline (None for legs only known from the Distance Matrix) and
+    polyline_tiers (simplified variants of the polyline by detail tier).
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 200_000,
+        memory_entries: int = 4096,
+        precision: int = 4,
+        ttl_seconds: float = 604800.0,
+    ) -> None:
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite file for the persistent tier (None keeps it in-process)
+            max_entries: Maximum rows kept on disk before LRU eviction
+            memory_entries: Maximum entries kept in the in-process LRU
+            precision: Decimal places coordinates are rounded to (4 is ~11 m)
+            ttl_seconds: Age after which an entry is treated as a miss
+        """
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self._scale = 10 ** precision
+        self._memory: OrderedDict[PairKey, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._inserts_since_trim = 0
+
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS travel_times ("
+                "o_lat INTEGER NOT NULL, o_lng INTEGER NOT NULL, "
+                "d_lat INTEGER NOT NULL, d_lng INTEGER NOT NULL, "
+                "mode TEXT NOT NULL, bucket INTEGER NOT NULL, "
+                "duration_s INTEGER, distance_m INTEGER, polyline TEXT, tiers TEXT, "
+                "updated_at INTEGER NOT NULL, last_used INTEGER NOT NULL, "
+                "PRIMARY KEY (o_lat, o_lng, d_lat, d_lng, mode, bucket)) WITHOUT ROWID"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(travel_times)")}
+            if "tiers" not in columns:
+                # Stores created before polyline tiers were cached
+                self._db.execute("ALTER TABLE travel_times ADD COLUMN tiers TEXT")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS travel_times_last_used ON travel_times (last_used)"
+            )
+            self._db.commit()
+
+    def make_key(
+        self,
+        origin: Coordinate,
+        destination: Coordinate,
+        mode: str,
+        bucket: int = NO_DEPARTURE_BUCKET,
+    ) -> PairKey:
+        """
+        Build the store key for a directed pair.
+
+        Args:
+            origin: (lat, lng) of the origin
+            destination: (lat, lng) of the destination
+            mode: Travel mode
+            bucket: Departure-time bucket from time_bucket()
+
+        Returns:
+            Integer-coordinate key tuple
+        """
+        scale = self._scale
+        return (
+            round(origin[0] * scale), round(origin[1] * scale),
+            round(destination[0] * scale), round(destination[1] * scale),
+            mode, bucket,
+        )
+
+    def _memory_set(self, key: PairKey, updated_at: float, value: dict[str, Any]) -> None:
+        """Insert into the LRU tier, evicting the oldest entries when full."""
+        self._memory[key] = (updated_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get_many(self, keys: list[PairKey], cutoff: float) -> dict[PairKey, tuple[float, dict]]:
+        """Read fresh entries from the SQLite tier and mark them as used."""
+        found = {}
+        now = int(time.time())
+        with self._db_lock:
+            for key in keys:
+                row = self._db.execute(
+                    "SELECT duration_s, distance_m, polyline, tiers, updated_at FROM travel_times "
+                    "WHERE o_lat = ? AND o_lng = ? AND d_lat = ? AND d_lng = ? "
+                    "AND mode = ? AND bucket = ?",
+                    key,
+                ).fetchone()
+                if row is not None and row[4] >= cutoff:
+                    found[key] = (row[4], {
+                        "duration_seconds": row[0],
+                        "distance_meters": row[1],
+                        "polyline": row[2],
+                        "polyline_tiers": loads(row[3]) if row[3] else {},
+                    })
+            if found:
+                self._db.executemany(
+                    "UPDATE travel_times SET last_used = ? "
+                    "WHERE o_lat = ? AND o_lng = ? AND d_lat = ? AND d_lng = ? "
+                    "AND mode = ? AND bucket = ?",
+                    [(now, *key) for key in found],
+                )
+                self._db.commit()
+        return found
+
+    def _disk_put_many(self, rows: list[tuple]) -> None:
+        """Upsert entries into the SQLite tier, keeping known polylines and their tiers."""
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT INTO travel_times (o_lat, o_lng, d_lat, d_lng, mode, bucket, "
+                "duration_s, distance_m, polyline, updated_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (o_lat, o_lng, d_lat, d_lng, mode, bucket) DO UPDATE SET "
+                "duration_s = excluded.duration_s, distance_m = excluded.distance_m, "
+                "polyline = COALESCE(excluded.polyline, travel_times.polyline), "
+                "tiers = CASE WHEN excluded.polyline IS NULL "
+                "OR excluded.polyline = travel_times.polyline THEN travel_times.tiers END, "
+                "updated_at = excluded.updated_at, last_used = excluded.last_used",
+                rows,
+            )
+            self._inserts_since_trim += len(rows)
+            if self._inserts_since_trim >= 256:
+                self._inserts_since_trim = 0
+                self._trim()
+            self._db.commit()
+
+    def _trim(self) -> None:
+        """Evict least-recently used rows beyond max_entries (caller holds the lock)."""
+        count = self._db.execute("SELECT COUNT(*) FROM travel_times").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        # Trim 10% below the cap so eviction does not run on every insert
+        excess += self.max_entries // 10
+        cursor = self._db.execute(
+            "DELETE FROM travel_times WHERE (o_lat, o_lng, d_lat, d_lng, mode, bucket) IN ("
+            "SELECT o_lat, o_lng, d_lat, d_lng, mode, bucket FROM travel_times "
+            "ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._stats["evicted"] += cursor.rowcount
+
+    async def get_many(self, keys: list[PairKey]) -> dict[PairKey, dict[str, Any]]:
+        """
+        Look up several legs at once.
+
+        Args:
+            keys: Keys from make_key()
+
+        Returns:
+            Mapping of found keys to leg dictionaries (copies)
+        """
+        cutoff = time.time() - self.ttl_seconds
+        found: dict[PairKey, dict[str, Any]] = {}
+        missing = []
+
+        for key in dict.fromkeys(keys):
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] >= cutoff:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                found[key] = dict(entry[1])
+            else:
+                missing.append(key)
+
+        if missing and self._db is not None:
+            disk = await asyncio.to_thread(self._disk_get_many, missing, cutoff)
+            for key, (updated_at, value) in disk.items():
+                self._memory_set(key, updated_at, value)
+                self._stats["disk_hits"] += 1
+                found[key] = dict(value)
+
+        misses = len(set(keys)) - len(found)
+        self._stats["misses"] += misses
+        CACHE_LOOKUPS.labels("travel_times", "hits").inc(len(found))
+        CACHE_LOOKUPS.labels("travel_times", "misses").inc(misses)
+        return found
+
+    async def put_many(self, entries: list[tuple[PairKey, dict[str, Any]]]) -> None:
+        """
+        Store several legs at once.
+
+        Args:
+            entries: (key, value) pairs with duration_seconds, distance_meters
+                and optional polyline
+        """
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, value in entries:
+            current = self._memory.get(key)
+            known = current[1] if current else {}
+            polyline = value.get("polyline") or known.get("polyline")
+            # Tiers stay valid only while the polyline they were built from does
+            tiers = known.get("polyline_tiers", {}) if polyline == known.get("polyline") else {}
+            stored = {
+                "duration_seconds": value.get("duration_seconds"),
+                "distance_meters": value.get("distance_meters"),
+                "polyline": polyline,
+                "polyline_tiers": tiers,
+            }
+            self._memory_set(key, now, stored)
+            rows.append((*key, stored["duration_seconds"], stored["distance_meters"],
+                         value.get("polyline"), int(now), int(now)))
+        self._stats["stored"] += len(rows)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put_many, rows)
+
+    def _disk_put_tiers(self, rows: list[tuple]) -> None:
+        """Merge simplified tiers into rows whose polyline they were built from."""
+        with self._db_lock:
+            self._db.executemany(
+                "UPDATE travel_times SET tiers = json_patch(COALESCE(tiers, '{}'), ?) "
+                "WHERE o_lat = ? AND o_lng = ? AND d_lat = ? AND d_lng = ? "
+                "AND mode = ? AND bucket = ? AND polyline = ?",
+                rows,
+            )
+            self._db.commit()
+
+    async def put_tiers(self, entries: list[tuple[PairKey, str, dict[str, str]]]) -> None:
+        """
+        Store simplified detail tiers for legs that are already stored.
+
+        Tiers are only kept while the leg's stored polyline is the one they
+        were simplified from.
+
+        Args:
+            entries: (key, encoded polyline, {tier: encoded simplified polyline}) triples
+        """
+        if not entries:
+            return
+        rows = []
+        for key, polyline, tiers in entries:
+            current = self._memory.get(key)
+            if current is not None and current[1].get("polyline") == polyline:
+                current[1]["polyline_tiers"] = {**current[1].get("polyline_tiers", {}), **tiers}
+            rows.append((dumps_text(tiers), *key, polyline))
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put_tiers, rows)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Get hit/miss counters.
+
+        Returns:
+            Dictionary with counters, hit ratio and memory size
+        """
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "persistent": self._db is not None,
+        }
+
+    def close(self) -> None:
+        """Close the SQLite connection if one is open."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
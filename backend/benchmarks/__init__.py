@@ -0,0 +1,5 @@
+"""
+Offline performance benchmarks for the Travel Planner backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.bench_route_solver`.
+"""
@@ -0,0 +1,82 @@
+"""
+Benchmark balanced k-medoids clustering against the original angular bucketing.
+
+Reports mean runtime and the mean within-day spread (average distance from
+each stop to its day's medoid) for random city-scale location sets.
+
+Usage:
+    python -m benchmarks.bench_clustering [--trials 50] [--stops 100] [--days 7]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.agent.clustering import balanced_kmedoids, cluster_size_bounds
+from app.agent.distance import build_distance_matrix
+
+
+def _angular_labels(locations: list[dict], k: int) -> np.ndarray:
+    """The original clustering: sort by angle around the centroid and slice."""
+    avg_lat = sum(loc["lat"] for loc in locations) / len(locations)
+    avg_lng = sum(loc["lng"] for loc in locations) / len(locations)
+    order = sorted(
+        range(len(locations)),
+        key=lambda i: math.atan2(locations[i]["lng"] - avg_lng, locations[i]["lat"] - avg_lat),
+    )
+    labels = np.zeros(len(locations), dtype=np.intp)
+    for rank, i in enumerate(order):
+        labels[i] = rank * k // len(locations)
+    return labels
+
+
+def _spread_km(distances: np.ndarray, labels: np.ndarray) -> float:
+    """Average distance from each point to the medoid of its cluster."""
+    total = 0.0
+    for cluster in np.unique(labels):
+        members = np.flatnonzero(labels == cluster)
+        within = distances[np.ix_(members, members)].sum(axis=1)
+        total += within.min()
+    return total / len(labels)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--stops", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = {"angular": ([], []), "balanced_kmedoids": ([], [])}
+
+    for _ in range(args.trials):
+        locations = [
+            {"id": str(i), "lat": 48.8566 + rng.normal(0, 0.04), "lng": 2.3522 + rng.normal(0, 0.06)}
+            for i in range(args.stops)
+        ]
+        distances = build_distance_matrix(locations).distance_km
+        min_size, capacity = cluster_size_bounds(args.stops, args.days, style_max=5)
+
+        started = time.perf_counter()
+        labels = _angular_labels(locations, args.days)
+        results["angular"][0].append((time.perf_counter() - started) * 1000)
+        results["angular"][1].append(_spread_km(distances, labels))
+
+        started = time.perf_counter()
+        labels = balanced_kmedoids(distances, args.days, capacity, min_size)
+        results["balanced_kmedoids"][0].append((time.perf_counter() - started) * 1000)
+        results["balanced_kmedoids"][1].append(_spread_km(distances, labels))
+
+    print(f"{args.stops} stops into {args.days} days, {args.trials} trials")
+    for name, (runtimes, spreads) in results.items():
+        print(
+            f"{name:>18}: mean {np.mean(runtimes):.2f} ms, p95 {np.percentile(runtimes, 95):.2f} ms, "
+            f"mean spread {np.mean(spreads):.2f} km"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Microbenchmark of leg polyline assembly in get_directions.
+
+Compares the previous path (decode every step polyline to float tuples,
+concatenate, re-encode) with stitching the encoded step strings directly,
+on Directions responses. Responses are either loaded from recorded JSON
+files (--payload, repeatable) or synthesized as walking/driving routes with
+many short steps. Every leg's output is checked to be identical between the
+two paths before timing. Also reports the time to simplify every leg to
+each detail tier (as polyline_for_detail does on a cache miss) and the
+encoded size of each tier.
+
+Usage:
+    python -m benchmarks.bench_polyline [--legs 20] [--steps 40] [--points 12]
+        [--repeat 20] [--payload recorded.json] [--json]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable
+
+import polyline as pl
+
+from app.services.polylines import (
+    POLYLINE_TIER_TOLERANCES_M,
+    polyline_for_detail,
+    stitch_polylines,
+)
+
+
+def decode_reencode(step_polylines: list[str | None]) -> str | None:
+    """The previous leg assembly: decode, drop shared endpoints, re-encode."""
+    all_points: list[tuple[float, float]] = []
+    for step_polyline in step_polylines:
+        if step_polyline:
+            decoded = pl.decode(step_polyline)
+            if all_points and decoded and all_points[-1] == decoded[0]:
+                decoded = decoded[1:]
+            all_points.extend(decoded)
+    return pl.encode(all_points) if all_points else None
+
+
+def synthesize_response(legs: int, steps: int, points: int, seed: int) -> dict[str, Any]:
+    """
+    Build a Directions response whose steps share endpoints like Google's do.
+
+    Args:
+        legs: Legs in the route
+        steps: Steps per leg
+        points: Points per step polyline
+        seed: Random seed
+
+    Returns:
+        Directions API response body
+    """
+    rng = random.Random(seed)
+    lat, lng = 48.8566, 2.3522
+    route_legs = []
+    for _ in range(legs):
+        leg_steps = []
+        for _ in range(steps):
+            step_points = [(round(lat, 5), round(lng, 5))]
+            for _ in range(points - 1):
+                lat += rng.uniform(-0.0008, 0.0008)
+                lng += rng.uniform(-0.0008, 0.0008)
+                step_points.append((round(lat, 5), round(lng, 5)))
+            leg_steps.append({"polyline": {"points": pl.encode(step_points)}})
+        route_legs.append({"steps": leg_steps})
+    return {"status": "OK", "routes": [{"legs": route_legs}]}
+
+
+def leg_step_polylines(response: dict[str, Any]) -> list[list[str | None]]:
+    """Extract each leg's step polylines from a Directions response."""
+    return [
+        [step.get("polyline", {}).get("points") for step in leg.get("steps", [])]
+        for route in response.get("routes", [])[:1]
+        for leg in route.get("legs", [])
+    ]
+
+
+def time_path(fn: Callable[[Any], Any], inputs: list[Any], repeat: int) -> list[float]:
+    """Time running fn over every leg's input, once per repeat; return milliseconds per repeat."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in inputs:
+            fn(value)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--legs", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=40, help="Steps per leg")
+    parser.add_argument("--points", type=int, default=12, help="Points per step polyline")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--payload", action="append", default=[],
+                        help="Recorded Directions response JSON (replaces the synthetic route)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.payload:
+        responses = []
+        for path in args.payload:
+            with open(path) as f:
+                responses.append(json.load(f))
+    else:
+        responses = [synthesize_response(args.legs, args.steps, args.points, args.seed)]
+    legs = [steps for response in responses for steps in leg_step_polylines(response)]
+
+    mismatches = sum(1 for steps in legs if decode_reencode(steps) != stitch_polylines(steps))
+    if mismatches:
+        raise SystemExit(f"{mismatches} leg(s) differ between decode/re-encode and stitching")
+
+    leg_polylines = [stitch_polylines(steps) for steps in legs]
+    # Bypass the LRU cache so every repeat measures the simplification itself
+    simplify = polyline_for_detail.__wrapped__
+    routed = [p for p in leg_polylines if p]
+    paths: list[tuple[str, Callable[[Any], Any], list[Any]]] = [
+        ("decode_reencode", decode_reencode, legs),
+        ("stitch", stitch_polylines, legs),
+    ]
+    for tier in POLYLINE_TIER_TOLERANCES_M:
+        paths.append((f"tier:{tier}", lambda p, tier=tier: simplify(p, tier), routed))
+
+    results = {}
+    for name, fn, inputs in paths:
+        timings = time_path(fn, inputs, args.repeat)
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+        }
+    tier_chars = {"full": sum(len(p or "") for p in leg_polylines)}
+    for tier in POLYLINE_TIER_TOLERANCES_M:
+        tier_chars[tier] = sum(len(simplify(p, tier)) for p in routed)
+    speedup = results["decode_reencode"]["median_ms"] / max(results["stitch"]["median_ms"], 1e-9)
+    summary = {
+        "legs": len(legs),
+        "steps": sum(len(steps) for steps in legs),
+        "encoded_chars": sum(len(s or "") for steps in legs for s in steps),
+        "results": results,
+        "speedup": round(speedup, 1),
+        "tier_chars": tier_chars,
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{summary['legs']} legs, {summary['steps']} steps, {summary['encoded_chars']} encoded chars")
+        print(f"{'path':>16} | {'median ms':>10} | {'min ms':>10}")
+        print("-" * 42)
+        for name, values in results.items():
+            print(f"{name:>16} | {values['median_ms']:>10.3f} | {values['min_ms']:>10.3f}")
+        print(f"\nstitching is {summary['speedup']}x faster; output identical for all legs")
+        print("encoded chars per detail tier: " + ", ".join(f"{k}={v}" for k, v in tier_chars.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark day-route solvers against the original nearest-neighbour heuristic.
+
+Generates random city-scale days (stops within ~10 km), builds the shared
+estimate matrix and reports mean tour cost relative to nearest neighbour
+and mean runtime per solver.
+
+Usage:
+    python -m benchmarks.bench_route_solver [--trials 50] [--seed 7]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.agent.distance import build_distance_matrix
+from app.agent.route_solver import path_cost, solve_day_route
+
+SOLVERS = ["nearest_neighbor", "held_karp", "local_search", "auto"]
+DAY_SIZES = [4, 6, 8, 10, 12, 16, 20]
+
+
+def _random_day(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Build an estimated duration matrix for n random stops around a city center."""
+    lat0, lng0 = 48.8566, 2.3522
+    locations = [
+        {"id": str(i), "lat": lat0 + rng.normal(0, 0.03), "lng": lng0 + rng.normal(0, 0.045)}
+        for i in range(n)
+    ]
+    return build_distance_matrix(locations).duration_min
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    header = f"{'stops':>5} | " + " | ".join(f"{name:>24}" for name in SOLVERS)
+    print("cost vs nearest_neighbor (lower is better) / mean runtime")
+    print(header)
+    print("-" * len(header))
+
+    for n in DAY_SIZES:
+        costs = {name: [] for name in SOLVERS}
+        runtimes = {name: [] for name in SOLVERS}
+        for _ in range(args.trials):
+            cost = _random_day(rng, n)
+            for name in SOLVERS:
+                if name == "held_karp" and n > 12:
+                    continue
+                started = time.perf_counter()
+                order = solve_day_route(cost, solver=name)
+                runtimes[name].append((time.perf_counter() - started) * 1000)
+                costs[name].append(path_cost(cost, order))
+
+        baseline = np.array(costs["nearest_neighbor"])
+        cells = []
+        for name in SOLVERS:
+            if not costs[name]:
+                cells.append(f"{'n/a':>24}")
+                continue
+            ratio = float(np.mean(np.array(costs[name]) / baseline))
+            cell = f"{ratio:.3f} / {np.mean(runtimes[name]):.2f} ms"
+            cells.append(f"{cell:>24}")
+        print(f"{n:>5} | " + " | ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark response and tool-message serialization.
+
+Builds a GenerateItineraryResponse for a synthetic 7-day, 30-stop itinerary
+(with routed leg polylines) and compares, in encoded bytes and encode time:
+
+- revalidate+json: FastAPI's default path for a returned model (dump,
+  re-validate against response_model, dump to JSON-compatible data, stdlib
+  json.dumps)
+- orjson: model_dump(mode="json") encoded by the serialization layer
+- msgpack: the same data as MessagePack (Accept: application/msgpack)
+
+and, for an agent tool result built from the benchmark fixture places,
+json.dumps(indent=2) against the compact encoding sent to the LLM.
+
+Usage:
+    python -m benchmarks.bench_serialization [--days 7] [--stops 30]
+        [--points 150] [--repeat 200] [--json]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable
+
+import polyline as pl
+
+from app.api.schemas import (
+    DayPlan,
+    GenerateItineraryResponse,
+    Itinerary,
+    Location,
+    TravelSegment,
+)
+from app.services.serialization import MSGPACK_MEDIA_TYPE, dumps_text, encode_body
+
+from .standins import load_fixture
+
+
+def build_response(days: int, stops: int, points: int, seed: int) -> GenerateItineraryResponse:
+    """
+    Build an itinerary response with stops spread evenly over the days.
+
+    Args:
+        days: Number of days
+        stops: Total number of stops
+        points: Points per leg polyline
+        seed: Random seed
+
+    Returns:
+        Response model as the generate endpoint would return it
+    """
+    rng = random.Random(seed)
+    day_plans = []
+    for day in range(days):
+        count = stops // days + (1 if day < stops % days else 0)
+        locations = [
+            Location(
+                id=f"loc_{day}_{i}",
+                name=f"Stop {day}-{i}",
+                lat=48.85 + rng.uniform(-0.05, 0.05),
+                lng=2.35 + rng.uniform(-0.05, 0.05),
+                why_this_fits_you="Matches your interest in museums, food and walkable neighbourhoods.",
+                place_id=f"ChIJ{rng.getrandbits(64):016x}",
+            )
+            for i in range(count)
+        ]
+        segments = []
+        for a, b in zip(locations, locations[1:]):
+            leg = [(a.lat, a.lng)]
+            for step in range(1, points):
+                t = step / (points - 1)
+                leg.append((
+                    a.lat + (b.lat - a.lat) * t + rng.uniform(-0.0003, 0.0003),
+                    a.lng + (b.lng - a.lng) * t + rng.uniform(-0.0003, 0.0003),
+                ))
+            segments.append(TravelSegment(
+                from_location_id=a.id,
+                to_location_id=b.id,
+                duration_minutes=rng.randint(5, 40),
+                distance_km=round(rng.uniform(0.5, 8.0), 1),
+                polyline=pl.encode(leg),
+            ))
+        day_plans.append(DayPlan(
+            day_number=day + 1, locations=locations, travel_times=segments,
+            route_optimized=True, area_label=f"Area {day + 1}",
+        ))
+    itinerary = Itinerary(days=day_plans, total_locations=stops, validation_notes=[])
+    return GenerateItineraryResponse(
+        itinerary=itinerary,
+        route_warnings=[],
+        route_metrics={"directions_calls": days, "distance_matrix_calls": 1},
+        generation_mode="solver",
+    )
+
+
+def fastapi_default(model: GenerateItineraryResponse) -> bytes:
+    """Approximate FastAPI's handling of a returned model with response_model set."""
+    revalidated = GenerateItineraryResponse.model_validate(model.model_dump())
+    content = revalidated.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def measure(fn: Callable[[], bytes | str], repeat: int) -> dict[str, Any]:
+    """Time an encoder; report its output size and median/min encode time."""
+    size = len(fn())
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "bytes": size,
+        "median_ms": round(statistics.median(timings), 4),
+        "min_ms": round(min(timings), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--stops", type=int, default=30)
+    parser.add_argument("--points", type=int, default=150, help="Points per leg polyline")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--fixture", default="paris", help="Fixture name or JSON path for tool results")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    response = build_response(args.days, args.stops, args.points, args.seed)
+    tool_result = {"results": load_fixture(args.fixture)["places"]}
+
+    results = {
+        "response": {
+            "revalidate+json": measure(lambda: fastapi_default(response), args.repeat),
+            "orjson": measure(
+                lambda: encode_body(response.model_dump(mode="json"), "application/json"), args.repeat
+            ),
+            "msgpack": measure(
+                lambda: encode_body(response.model_dump(mode="json"), MSGPACK_MEDIA_TYPE), args.repeat
+            ),
+        },
+        "tool_message": {
+            "json indent=2": measure(lambda: json.dumps(tool_result, indent=2), args.repeat),
+            "compact": measure(lambda: dumps_text(tool_result), args.repeat),
+        },
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.days}-day, {args.stops}-stop itinerary, {args.points}-point legs")
+    print(f"{'payload':>13} | {'encoding':>16} | {'bytes':>8} | {'median ms':>10} | {'min ms':>8}")
+    print("-" * 68)
+    for payload, encoders in results.items():
+        for name, values in encoders.items():
+            print(
+                f"{payload:>13} | {name:>16} | {values['bytes']:>8} | "
+                f"{values['median_ms']:>10.4f} | {values['min_ms']:>8.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark cold application startup.
+
+Each trial runs in a fresh interpreter and measures the time to import
+app.main, the time until the lifespan has started (server accepting
+requests) and the time until GET /ready returns 200. Optionally lists the
+slowest modules imported by app.main (python -X importtime), and exits
+non-zero when the median import time exceeds a budget so CI can catch
+regressions.
+
+Usage:
+    python -m benchmarks.bench_startup [--trials 5] [--import-budget-ms 800]
+        [--top-imports 10] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Runs in the child interpreter; prints one JSON line with the timings
+TRIAL_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+import httpx
+
+async def run():
+    result = {"import_ms": (imported - started) * 1000}
+    async with main.lifespan(main.app):
+        result["serving_ms"] = (time.perf_counter() - started) * 1000
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            while (await client.get("/ready")).status_code != 200:
+                if main.app.state.warmup_error:
+                    raise RuntimeError(main.app.state.warmup_error)
+                await asyncio.sleep(0.005)
+        result["ready_ms"] = (time.perf_counter() - started) * 1000
+    print(json.dumps(result))
+
+asyncio.run(run())
+"""
+
+
+def _child_env() -> dict[str, str]:
+    """Environment for trial interpreters: no tracing export, no files on disk."""
+    env = dict(os.environ)
+    env.setdefault("TRACING_ENABLED", "false")
+    env.setdefault("CHECKPOINTER_BACKEND", "memory")
+    env.setdefault("TRAVEL_TIME_CACHE_ENABLED", "false")
+    env["PYTHONPATH"] = str(BACKEND_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def run_trial() -> dict[str, float]:
+    """
+    Measure one cold start in a fresh interpreter.
+
+    Returns:
+        Dictionary with import_ms, serving_ms and ready_ms
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", TRIAL_SCRIPT],
+        cwd=BACKEND_DIR, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    # Application logging shares stdout; the timings are the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list[tuple[str, float]]:
+    """
+    List the modules with the largest cumulative import time under app.main.
+
+    Args:
+        limit: Number of modules to return
+
+    Returns:
+        (module, cumulative milliseconds) pairs, slowest first
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_child_env(), capture_output=True, text=True, check=True,
+    )
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        timings.append((module.strip(), int(cumulative) / 1000))
+    top_level = [(name, ms) for name, ms in timings if "." not in name or name.startswith("app.")]
+    return sorted(top_level, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=None,
+                        help="Fail if the median import time exceeds this")
+    parser.add_argument("--top-imports", type=int, default=10,
+                        help="Show the slowest top-level imports (0 to skip)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    trials = [run_trial() for _ in range(args.trials)]
+    summary = {
+        metric: {
+            "median_ms": round(statistics.median(t[metric] for t in trials), 1),
+            "max_ms": round(max(t[metric] for t in trials), 1),
+        }
+        for metric in ("import_ms", "serving_ms", "ready_ms")
+    }
+    imports = slowest_imports(args.top_imports) if args.top_imports else []
+
+    if args.json:
+        print(json.dumps({"summary": summary, "slowest_imports": imports}, indent=2))
+    else:
+        print(f"{'metric':>12} | {'median ms':>10} | {'max ms':>10}")
+        print("-" * 38)
+        for metric, values in summary.items():
+            print(f"{metric:>12} | {values['median_ms']:>10.1f} | {values['max_ms']:>10.1f}")
+        if imports:
+            print("\nslowest imports (cumulative):")
+            for module, ms in imports:
+                print(f"  {ms:8.1f} ms  {module}")
+
+    budget = args.import_budget_ms
+    if budget is not None and summary["import_ms"]["median_ms"] > budget:
+        print(f"Import time {summary['import_ms']['median_ms']:.1f} ms exceeds budget {budget:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+End-to-end benchmark of the trip planning API without external services.
+
+Starts fixture-backed stand-ins for the Google Maps and Tavily endpoints,
+replaces the OpenAI chat models with a scripted fake, and drives
+POST /api/trip/start followed by POST /api/trip/{thread_id}/generate
+in-process at a configurable concurrency. Each stage reports p50/p95/p99
+latency, throughput, upstream requests per endpoint and LLM calls.
+
+Usage:
+    python -m benchmarks.bench_trip_flow [--trips 20] [--concurrency 5]
+        [--latency-ms 50] [--jitter-ms 10] [--llm-latency-ms 0]
+        [--mode solver] [--unique-trips] [--prefetch] [--quota 0] [--error-rate 0]
+        [--json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import numpy as np
+
+# Keep benchmark runs self-contained: no checkpoint or travel-time files on disk
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+os.environ.setdefault("TRAVEL_TIME_CACHE_ENABLED", "false")
+os.environ.setdefault("MAPS_CACHE_SQLITE_PATH", "")
+
+import httpx  # noqa: E402
+
+import app.agent.itinerary as itinerary_module  # noqa: E402
+import app.agent.nodes as nodes_module  # noqa: E402
+import app.main as main_module  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.agent.callbacks import LLMMetricsCallback  # noqa: E402
+from app.services.google_maps import get_google_maps_service  # noqa: E402
+
+from .fake_llm import FakeChatModel, LLMCallCounter  # noqa: E402
+from .standins import StandInServer, load_fixture  # noqa: E402
+
+
+def _install_fakes(fixture: dict[str, Any], counter: LLMCallCounter, latency_seconds: float) -> None:
+    """Route every chat model the backend creates to the scripted fake."""
+    def make(model: str = "gpt-4o", **kwargs: Any) -> FakeChatModel:
+        return FakeChatModel(
+            model_name=model, fixture=fixture, latency_seconds=latency_seconds, counter=counter,
+            callbacks=[LLMMetricsCallback(model)],
+        )
+
+    nodes_module._get_llm = make
+    itinerary_module.ChatOpenAI = make
+    # Tracing would export every span to a collector that is not running
+    main_module.setup_tracing = lambda: None
+
+
+async def _run_stage(
+    name: str,
+    calls: list[Callable[[], Awaitable[httpx.Response]]],
+    concurrency: int,
+    server: StandInServer,
+    counter: LLMCallCounter,
+) -> tuple[dict[str, Any], list[httpx.Response | None]]:
+    """Run one stage's requests under a concurrency limit and collect its metrics."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    responses: list[httpx.Response | None] = [None] * len(calls)
+
+    async def run(index: int, call: Callable[[], Awaitable[httpx.Response]]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                responses[index] = await call()
+            except httpx.HTTPError as e:
+                print(f"{name} request {index} failed: {e}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    upstream_before = server.counts()
+    llm_before = counter.counts()
+    started = time.perf_counter()
+    await asyncio.gather(*(run(i, call) for i, call in enumerate(calls)))
+    elapsed = time.perf_counter() - started
+
+    upstream_after = server.counts()
+    llm_after = counter.counts()
+    values = np.array(latencies) if latencies else np.zeros(1)
+    metrics = {
+        "stage": name,
+        "requests": len(calls),
+        "succeeded": sum(1 for r in responses if r is not None and r.status_code == 200),
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "p99_ms": round(float(np.percentile(values, 99)), 1),
+        "mean_ms": round(float(values.mean()), 1),
+        "throughput_rps": round(len(calls) / elapsed, 2) if elapsed else 0.0,
+        "upstream_calls": {
+            endpoint: count - upstream_before.get(endpoint, 0)
+            for endpoint, count in upstream_after.items()
+            if count - upstream_before.get(endpoint, 0)
+        },
+        "llm_calls": {
+            model: count - llm_before.get(model, 0)
+            for model, count in llm_after.items()
+            if count - llm_before.get(model, 0)
+        },
+    }
+    return metrics, responses
+
+
+def _print_report(results: list[dict[str, Any]]) -> None:
+    """Print stage metrics as a table followed by upstream call breakdowns."""
+    header = (
+        f"{'stage':>10} | {'ok':>7} | {'p50 ms':>8} | {'p95 ms':>8} | "
+        f"{'p99 ms':>8} | {'mean ms':>8} | {'req/s':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['stage']:>10} | {r['succeeded']:>3}/{r['requests']:<3} | {r['p50_ms']:>8.1f} | "
+            f"{r['p95_ms']:>8.1f} | {r['p99_ms']:>8.1f} | {r['mean_ms']:>8.1f} | {r['throughput_rps']:>7.2f}"
+        )
+    print()
+    for r in results:
+        upstream = ", ".join(f"{k}={v}" for k, v in sorted(r["upstream_calls"].items())) or "none"
+        llm = ", ".join(f"{k}={v}" for k, v in sorted(r["llm_calls"].items())) or "none"
+        print(f"{r['stage']}: upstream {upstream}; llm {llm}")
+        if "prefetch" in r:
+            prefetch = r["prefetch"]
+            print(
+                f"{r['stage']}: prefetch issued={prefetch['issued']} hits={prefetch['hits']} "
+                f"wasted={prefetch['wasted']} hit_rate={prefetch['hit_rate']:.0%}"
+            )
+
+
+async def run_benchmark(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """
+    Run the start and generate stages against stand-in upstreams.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Metrics dictionary per stage
+    """
+    fixture = load_fixture(args.fixture)
+    server = StandInServer(
+        fixture, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed,
+        max_concurrent=args.quota, error_rate=args.error_rate,
+    )
+    server.start()
+
+    settings.GOOGLE_MAPS_API_KEY = settings.GOOGLE_MAPS_API_KEY or "benchmark"
+    settings.TAVILY_API_KEY = settings.TAVILY_API_KEY or "benchmark"
+    settings.GOOGLE_MAPS_BASE_URL = server.maps_base_url
+    settings.TAVILY_BASE_URL = server.tavily_base_url
+    settings.PLACE_DETAILS_PREFETCH_ENABLED = args.prefetch
+    counter = LLMCallCounter()
+    _install_fakes(fixture, counter, args.llm_latency_ms / 1000)
+
+    app = main_module.app
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    try:
+        async with main_module.lifespan(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                # Measure steady state, not the startup warm-up
+                while (await client.get("/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+
+                def start_call(index: int) -> Callable[[], Awaitable[httpx.Response]]:
+                    destination = fixture["destination"]
+                    if args.unique_trips:
+                        destination = f"{destination} (trip {index})"
+                    body = {
+                        "trip_params": {
+                            "destination": destination,
+                            "num_days": args.days,
+                            "travel_style": args.travel_style,
+                            "interests": fixture.get("interests", []),
+                        },
+                        "background": False,
+                    }
+                    return lambda: client.post("/api/trip/start", json=body)
+
+                start_metrics, start_responses = await _run_stage(
+                    "start", [start_call(i) for i in range(args.trips)], args.concurrency, server, counter
+                )
+                prefetcher = get_google_maps_service().prefetcher
+                if prefetcher is not None:
+                    start_metrics["prefetch"] = prefetcher.stats()
+                results.append(start_metrics)
+
+                thread_ids = [
+                    r.json()["thread_id"] for r in start_responses
+                    if r is not None and r.status_code == 200
+                ]
+
+                def generate_call(thread_id: str) -> Callable[[], Awaitable[httpx.Response]]:
+                    return lambda: client.post(f"/api/trip/{thread_id}/generate", json={"mode": args.mode})
+
+                generate_metrics, _ = await _run_stage(
+                    "generate", [generate_call(t) for t in thread_ids], args.concurrency, server, counter
+                )
+                results.append(generate_metrics)
+    finally:
+        server.stop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trips", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean stand-in upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Std. deviation of upstream latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per LLM call")
+    parser.add_argument("--mode", choices=["llm", "solver", "auto"], default="solver")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--travel-style", default="balanced")
+    parser.add_argument("--fixture", default="paris", help="Fixture name or JSON path")
+    parser.add_argument(
+        "--unique-trips", action="store_true",
+        help="Give every trip a distinct destination so searches are not shared",
+    )
+    parser.add_argument(
+        "--prefetch", action="store_true",
+        help="Enable speculative place details prefetch for top search results",
+    )
+    parser.add_argument("--quota", type=int, default=0,
+                        help="Throttle stand-in requests beyond this many in flight per API (0 disables)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of stand-in requests failing with HTTP 500")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print metrics as JSON")
+    args = parser.parse_args()
+
+    # Backend logging goes to stderr so the report (or JSON) is all that reaches stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark the upstream governor against a stand-in that injects throttling.
+
+Fires bursts of concurrent place details requests (no cache, no coalescing)
+at a stand-in Maps server that rejects requests beyond a concurrency quota
+with OVER_QUERY_LIMIT and fails a fraction with HTTP 500, once without the
+governor and once with it. Reports successful and failed calls, upstream
+requests, throttled responses, retries, the final adaptive concurrency
+limit and call latency.
+
+Usage:
+    python -m benchmarks.bench_upstream_governor [--calls 200] [--bursts 3]
+        [--quota 8] [--error-rate 0.02] [--latency-ms 40] [--json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from app.services.google_maps import GoogleMapsService
+from app.services.governor import RetryBudget, UpstreamGovernor
+
+from .standins import StandInServer, load_fixture
+
+
+async def run_case(args: argparse.Namespace, governed: bool) -> dict[str, Any]:
+    """
+    Run the bursts against a fresh stand-in, with or without a governor.
+
+    Args:
+        args: Parsed command-line arguments
+        governed: Route requests through an UpstreamGovernor
+
+    Returns:
+        Metrics for this case
+    """
+    fixture = load_fixture(args.fixture)
+    server = StandInServer(
+        fixture, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed,
+        max_concurrent=args.quota, error_rate=args.error_rate,
+    )
+    server.start()
+    governor = UpstreamGovernor(
+        "benchmark",
+        requests_per_second=args.rps,
+        max_concurrency=args.max_concurrency,
+        max_retries=args.max_retries,
+        backoff_base=args.backoff_base,
+        retry_budget=RetryBudget(ratio=args.retry_budget_ratio),
+        seed=args.seed,
+    ) if governed else None
+    service = GoogleMapsService(
+        "benchmark", cache=None, coalesce=False, base_url=server.maps_base_url,
+        governor=governor, max_connections=args.calls,
+    )
+    place_ids = [place["place_id"] for place in fixture["places"]]
+    latencies: list[float] = []
+    outcomes = {"ok": 0, "failed": 0}
+
+    async def one(index: int) -> None:
+        started = time.perf_counter()
+        try:
+            await service.place_details(place_ids[index % len(place_ids)])
+            outcomes["ok"] += 1
+        except Exception:
+            outcomes["failed"] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    try:
+        for _ in range(args.bursts):
+            await asyncio.gather(*(one(i) for i in range(args.calls)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await service.aclose()
+        server.stop()
+
+    counts = server.counts()
+    values = np.array(latencies)
+    return {
+        "case": "governed" if governed else "ungoverned",
+        "calls": args.calls * args.bursts,
+        **outcomes,
+        "upstream_requests": counts.get("place/details", 0),
+        "throttled": counts.get("maps/throttled", 0),
+        "injected_errors": counts.get("maps/errors", 0),
+        "retries": governor.stats()["retries"] if governor else 0,
+        "budget_exhausted": governor.stats()["budget_exhausted"] if governor else 0,
+        "final_concurrency_limit": governor.stats()["concurrency_limit"] if governor else None,
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200, help="Concurrent calls per burst")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--quota", type=int, default=8, help="Stand-in concurrency quota")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--rps", type=float, default=0.0, help="Governor rate limit (0 disables)")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Governor starting/max concurrency")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    parser.add_argument("--retry-budget-ratio", type=float, default=0.2)
+    parser.add_argument("--fixture", default="paris", help="Fixture name or JSON path")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    # Backend logging goes to stderr so the report (or JSON) is all that reaches stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = [asyncio.run(run_case(args, governed)) for governed in (False, True)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = [
+        "ok", "failed", "upstream_requests", "throttled", "injected_errors", "retries",
+        "budget_exhausted", "final_concurrency_limit", "p50_ms", "p95_ms", "elapsed_s",
+    ]
+    print(f"{'metric':>24} | {'ungoverned':>11} | {'governed':>11}")
+    print("-" * 52)
+    for column in columns:
+        values = [str(r[column]) if r[column] is not None else "-" for r in results]
+        print(f"{column:>24} | {values[0]:>11} | {values[1]:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Deterministic stand-in chat model for offline benchmarks.
+
+FakeChatModel replays the tool-calling script a real discovery run follows
+(searches, then place details for the places found, then the JSON location
+summary) and answers the itinerary prompt by assigning each pre-computed
+cluster to a day. It reads only the conversation it is given, so the
+backend's own message handling (compaction, phase tracking) is exercised.
+"""
+import asyncio
+import json
+import re
+import threading
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+PLACE_ID_PATTERN = re.compile(r'"place_id":"([^"]+)"')
+CLUSTER_ID_PATTERN = re.compile(r"\(id: ([^)]+)\)")
+TABLE_ROW_PATTERN = re.compile(r"^([^|\s]+)\|", re.MULTILINE)
+
+
+class LLMCallCounter:
+    """Thread-safe count of fake LLM calls per model name."""
+
+    def __init__(self) -> None:
+        """Initialize with no calls."""
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str) -> None:
+        """Count one call for a model."""
+        with self._lock:
+            self._counts[model] = self._counts.get(model, 0) + 1
+
+    def counts(self) -> dict[str, int]:
+        """Get calls per model name."""
+        with self._lock:
+            return dict(self._counts)
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model that plays the discovery and itinerary roles."""
+
+    model_name: str = "gpt-4o"
+    fixture: dict[str, Any]
+    latency_seconds: float = 0.0
+    counter: LLMCallCounter = Field(default_factory=LLMCallCounter)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeChatModel":
+        """Tools are implied by the script, so binding is a no-op."""
+        return self
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        """Produce the next scripted message for a conversation."""
+        system = "\n".join(m.content for m in messages if isinstance(m, SystemMessage))
+        if "itinerary optimizer" in system:
+            return AIMessage(content=json.dumps(self._itinerary(system)))
+
+        request = next((m.content for m in messages if isinstance(m, HumanMessage)), "")
+        rounds = sum(1 for m in messages if isinstance(m, AIMessage) and m.tool_calls)
+        found = self._place_ids(messages)
+
+        if rounds == 0:
+            destination_match = re.search(r"trip to (.+?)\.?$", request)
+            destination = destination_match.group(1) if destination_match else self.fixture["destination"]
+            calls = [
+                {"name": "search_places", "args": {"query": query, "location": destination}}
+                for query in self.fixture["searches"]
+            ]
+            calls.append({"name": "tavily_search", "args": {"query": f"local tips {destination}"}})
+            return self._tool_calls(calls)
+
+        if rounds == 1 and found:
+            wanted = re.search(r"find (\d+)", request)
+            limit = int(wanted.group(1)) if wanted else len(found)
+            return self._tool_calls([
+                {"name": "get_place_details", "args": {"place_id": place_id}}
+                for place_id in found[:limit]
+            ])
+
+        places = {place["place_id"]: place for place in self.fixture["places"]}
+        summary = [
+            {
+                "name": places[place_id]["name"],
+                "place_id": place_id,
+                "lat": places[place_id]["lat"],
+                "lng": places[place_id]["lng"],
+                "why_this_fits_you": places[place_id]["editorial_summary"],
+            }
+            for place_id in found if place_id in places
+        ]
+        return AIMessage(content="```json\n" + json.dumps(summary) + "\n```")
+
+    def _place_ids(self, messages: list[BaseMessage]) -> list[str]:
+        """Collect place IDs from tool results and folded candidate tables, in order."""
+        found: dict[str, None] = {}
+        for message in messages:
+            if isinstance(message, ToolMessage):
+                found.update(dict.fromkeys(PLACE_ID_PATTERN.findall(message.content)))
+            elif isinstance(message, SystemMessage) and message.content.startswith("Places found so far"):
+                found.update(dict.fromkeys(TABLE_ROW_PATTERN.findall(message.content)[1:]))
+        for message in messages:
+            if isinstance(message, AIMessage):
+                for call in message.tool_calls:
+                    if call["name"] == "get_place_details":
+                        found.setdefault(call["args"].get("place_id"), None)
+        return [place_id for place_id in found if place_id]
+
+    def _itinerary(self, prompt: str) -> dict[str, Any]:
+        """Assign each cluster listed in the itinerary prompt to its own day."""
+        days = []
+        for block in re.split(r"^Cluster \d+", prompt, flags=re.MULTILINE)[1:]:
+            ids = CLUSTER_ID_PATTERN.findall(block)
+            if ids:
+                days.append({"day_number": len(days) + 1, "locations": ids, "travel_times": []})
+        return {"days": days, "total_locations": sum(len(d["locations"]) for d in days), "validation_notes": []}
+
+    def _tool_calls(self, calls: list[dict[str, Any]]) -> AIMessage:
+        """Build an AIMessage requesting the given tool calls."""
+        return AIMessage(
+            content="",
+            tool_calls=[{**call, "id": f"call_{uuid.uuid4().hex[:12]}"} for call in calls],
+        )
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        """Run the script and attach approximate token usage."""
+        self.counter.add(self.model_name)
+        message = self._respond(messages)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        output_chars = len(message.content) + len(json.dumps(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": output_chars // 4,
+            "total_tokens": (prompt_chars + output_chars) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None, **kwargs: Any) -> ChatResult:
+        return self._result(messages)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._result(messages)
@@ -0,0 +1,319 @@
+"""
+Local stand-in servers for the Google Maps and Tavily endpoints.
+
+Responses are built from a recorded fixture (places, details, web search
+results); Distance Matrix and Directions responses are synthesized from the
+fixture coordinates (haversine distance at a fixed city speed, straight-line
+polylines). Every request waits for a configurable latency with jitter, and
+requests are counted per endpoint so benchmarks can report upstream calls.
+Throttling can be injected: requests beyond a concurrency quota per API are
+rejected the way each API does it (Maps: OVER_QUERY_LIMIT, Tavily: HTTP 429),
+and a fraction of requests can fail with HTTP 500.
+
+The server runs uvicorn in its own thread and event loop, so its simulated
+latency does not compete with the backend under test.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import polyline as pl
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Synthetic travel speeds (km/h) and detour factor for matrix/directions responses
+MODE_SPEED_KMH = {"driving": 22.0, "walking": 4.8, "bicycling": 14.0, "transit": 18.0}
+DETOUR_FACTOR = 1.3
+
+
+def load_fixture(name: str = "paris") -> dict[str, Any]:
+    """
+    Load a recorded fixture by name or path.
+
+    Args:
+        name: Fixture name in benchmarks/fixtures (without .json) or a file path
+
+    Returns:
+        Fixture dictionary with destination, searches, places and tavily results
+    """
+    path = Path(name)
+    if not path.suffix:
+        path = FIXTURES_DIR / f"{name}.json"
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    """Great-circle distance between two (lat, lng) points in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def _parse_points(value: str) -> list[tuple[float, float]]:
+    """Parse a "lat,lng|lat,lng" parameter."""
+    points = []
+    for part in value.split("|"):
+        lat, lng = part.split(",")
+        points.append((float(lat), float(lng)))
+    return points
+
+
+def _leg(a: tuple[float, float], b: tuple[float, float], mode: str) -> dict[str, Any]:
+    """Synthesize distance and duration values for one leg."""
+    meters = round(_haversine_km(a, b) * DETOUR_FACTOR * 1000)
+    seconds = round(meters / 1000 / MODE_SPEED_KMH.get(mode, MODE_SPEED_KMH["driving"]) * 3600)
+    return {
+        "distance": {"value": meters, "text": f"{meters / 1000:.1f} km"},
+        "duration": {"value": seconds, "text": f"{max(1, round(seconds / 60))} mins"},
+    }
+
+
+class StandInServer:
+    """Fixture-backed HTTP server answering the Maps and Tavily endpoints the backend uses."""
+
+    def __init__(
+        self,
+        fixture: dict[str, Any],
+        latency_ms: float = 50.0,
+        jitter_ms: float = 10.0,
+        seed: int = 7,
+        max_concurrent: int = 0,
+        error_rate: float = 0.0,
+    ) -> None:
+        """
+        Initialize the server (not started).
+
+        Args:
+            fixture: Fixture from load_fixture()
+            latency_ms: Mean simulated upstream latency per request
+            jitter_ms: Standard deviation of the latency
+            seed: Seed for the latency jitter and injected errors
+            max_concurrent: Requests in flight per API beyond which new
+                requests are throttled (0 disables throttling)
+            error_rate: Fraction of requests answered with HTTP 500
+        """
+        self.fixture = fixture
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_concurrent = max_concurrent
+        self.error_rate = error_rate
+        self._in_flight: dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._places = {place["place_id"]: place for place in fixture["places"]}
+        self._counts: dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+        self.port: int | None = None
+        self.app = self._build_app()
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def maps_base_url(self) -> str:
+        """Value for GOOGLE_MAPS_BASE_URL."""
+        return f"{self.url}/maps/api"
+
+    @property
+    def tavily_base_url(self) -> str:
+        """Value for TAVILY_BASE_URL."""
+        return self.url
+
+    def counts(self) -> dict[str, int]:
+        """
+        Get the number of requests served per endpoint.
+
+        Returns:
+            Mapping of endpoint name to request count
+        """
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def _count(self, endpoint: str) -> None:
+        """Count one response for an endpoint (call with the counts lock held)."""
+        self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    async def _simulate(self, endpoint: str) -> JSONResponse | None:
+        """
+        Count a request and wait for the simulated upstream latency.
+
+        Returns:
+            A throttled or failed response to send instead, or None to answer normally
+        """
+        api = "tavily" if endpoint.startswith("tavily") else "maps"
+        with self._counts_lock:
+            self._count(endpoint)
+            if self.max_concurrent and self._in_flight.get(api, 0) >= self.max_concurrent:
+                self._count(f"{api}/throttled")
+                if api == "tavily":
+                    return JSONResponse({"error": "rate limit exceeded"}, status_code=429)
+                return JSONResponse({"status": "OVER_QUERY_LIMIT", "results": []})
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self._count(f"{api}/errors")
+                return JSONResponse({"error": "internal error"}, status_code=500)
+            self._in_flight[api] = self._in_flight.get(api, 0) + 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        finally:
+            with self._counts_lock:
+                self._in_flight[api] -= 1
+        return None
+
+    def _search_results(self, query: str) -> list[dict[str, Any]]:
+        """Pick a deterministic, query-dependent page of up to 10 fixture places."""
+        def rank(place: dict) -> str:
+            return hashlib.sha1(f"{query}|{place['place_id']}".encode()).hexdigest()
+
+        return [
+            {
+                "place_id": place["place_id"],
+                "name": place["name"],
+                "formatted_address": place["formatted_address"],
+                "geometry": {"location": {"lat": place["lat"], "lng": place["lng"]}},
+                "types": place["types"],
+                "rating": place["rating"],
+                "user_ratings_total": place["user_ratings_total"],
+            }
+            for place in sorted(self.fixture["places"], key=rank)[:10]
+        ]
+
+    def _build_app(self) -> FastAPI:
+        """Create the ASGI app with one route per upstream endpoint."""
+        app = FastAPI()
+
+        @app.get("/maps/api/place/textsearch/json")
+        async def text_search(query: str = "") -> Any:
+            if (rejected := await self._simulate("place/textsearch")) is not None:
+                return rejected
+            return {"status": "OK", "results": self._search_results(query)}
+
+        @app.get("/maps/api/place/details/json")
+        async def place_details(place_id: str = "") -> Any:
+            if (rejected := await self._simulate("place/details")) is not None:
+                return rejected
+            place = self._places.get(place_id)
+            if place is None:
+                return {"status": "NOT_FOUND"}
+            return {"status": "OK", "result": {
+                "name": place["name"],
+                "formatted_address": place["formatted_address"],
+                "geometry": {"location": {"lat": place["lat"], "lng": place["lng"]}},
+                "rating": place["rating"],
+                "types": place["types"],
+                "editorial_summary": {"overview": place["editorial_summary"]},
+                "reviews": [],
+            }}
+
+        @app.get("/maps/api/place/autocomplete/json")
+        async def autocomplete(input: str = "") -> Any:
+            if (rejected := await self._simulate("place/autocomplete")) is not None:
+                return rejected
+            destination = self.fixture["destination"]
+            if not destination.lower().startswith(input.lower()):
+                return {"status": "ZERO_RESULTS", "predictions": []}
+            return {"status": "OK", "predictions": [{
+                "description": destination,
+                "place_id": "bench_destination",
+                "structured_formatting": {"main_text": destination.split(",")[0]},
+            }]}
+
+        @app.get("/maps/api/geocode/json")
+        async def geocode(address: str = "") -> Any:
+            if (rejected := await self._simulate("geocode")) is not None:
+                return rejected
+            center = self.fixture["center"]
+            return {"status": "OK", "results": [{
+                "geometry": {"location": center},
+                "formatted_address": self.fixture["destination"],
+            }]}
+
+        @app.get("/maps/api/distancematrix/json")
+        async def distance_matrix(origins: str, destinations: str, mode: str = "driving") -> Any:
+            if (rejected := await self._simulate("distancematrix")) is not None:
+                return rejected
+            origin_points = _parse_points(origins)
+            destination_points = _parse_points(destinations)
+            return {
+                "status": "OK",
+                "origin_addresses": [f"{lat},{lng}" for lat, lng in origin_points],
+                "destination_addresses": [f"{lat},{lng}" for lat, lng in destination_points],
+                "rows": [
+                    {"elements": [{"status": "OK", **_leg(o, d, mode)} for d in destination_points]}
+                    for o in origin_points
+                ],
+            }
+
+        @app.get("/maps/api/directions/json")
+        async def directions(
+            origin: str,
+            destination: str,
+            waypoints: str | None = None,
+            mode: str = "driving",
+        ) -> Any:
+            if (rejected := await self._simulate("directions")) is not None:
+                return rejected
+            points = _parse_points(origin)
+            if waypoints:
+                points += _parse_points(waypoints)
+            points += _parse_points(destination)
+            legs = []
+            for a, b in zip(points, points[1:]):
+                leg = _leg(a, b, mode)
+                legs.append({
+                    **leg,
+                    "start_address": f"{a[0]},{a[1]}",
+                    "end_address": f"{b[0]},{b[1]}",
+                    "steps": [{**leg, "polyline": {"points": pl.encode([a, b])}}],
+                })
+            return {"status": "OK", "routes": [{
+                "legs": legs,
+                "overview_polyline": {"points": pl.encode(points)},
+            }]}
+
+        @app.post("/search")
+        async def tavily_search(request: Request) -> Any:
+            if (rejected := await self._simulate("tavily/search")) is not None:
+                return rejected
+            payload = await request.json()
+            return {"query": payload.get("query"), **self.fixture["tavily"]}
+
+        return app
+
+    def start(self) -> None:
+        """Start serving on a free local port in a background thread."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+
+        config = uvicorn.Config(self.app, log_level="warning", access_log=False, lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(
+            target=self._server.run, kwargs={"sockets": [sock]}, daemon=True
+        )
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        """Stop the server and wait for its thread to exit."""
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
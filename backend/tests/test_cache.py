@@ -0,0 +1,18 @@
+"""Tests for response cache keys."""
+from app.services.cache import make_cache_key
+
+
+def test_place_ids_are_case_sensitive():
+    assert make_cache_key("details", place_id="ChIJa") != make_cache_key("details", place_id="ChIJA")
+
+
+def test_free_text_is_normalized():
+    assert make_cache_key("text_search", query="Museums  in Paris", location=None) == make_cache_key(
+        "text_search", query="museums in paris", location=None
+    )
+
+
+def test_sequences_are_order_independent():
+    assert make_cache_key("place_details", place_id="ChIJa", fields=["name", "rating"]) == make_cache_key(
+        "place_details", place_id="ChIJa", fields=["rating", "name"]
+    )
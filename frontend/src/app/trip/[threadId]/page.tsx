@@ -103,7 +103,10 @@ export default function TripPage() {
     );
   }
 
-  if (error) {
+  // Background discovery failed; the job summary carries the reason
+  const jobError = phase === 'error' ? tripState?.job?.error : undefined;
+
+  if (error || phase === 'error') {
     return (
       <div className="min-h-screen flex items-center justify-center bg-neutral-50 dark:bg-neutral-950 transition-colors">
         <div className="text-center max-w-md">
@@ -118,7 +121,9 @@ export default function TripPage() {
           <p className="text-neutral-600 dark:text-neutral-400 mb-4">
             {error instanceof Error
               ? error.message
-              : 'Failed to load trip data'}
+              : typeof jobError === 'string'
+                ? jobError
+                : 'Failed to load trip data'}
           </p>
           <a
             href="/"
@@ -71,11 +71,15 @@ async function getTripState(threadId: string): Promise<TripState> {
   return response.json();
 }
 
-async function placesAutocomplete(input: string): Promise<PlacePrediction[]> {
+async function placesAutocomplete(
+  input: string,
+  signal?: AbortSignal
+): Promise<PlacePrediction[]> {
   if (!input || input.length < 2) {
     return [];
   }
 
+  // Aborted when the input changes, so the server can drop superseded lookups
   const response = await fetch(
     `${API_URL}/places/autocomplete?input=${encodeURIComponent(input)}`,
     {
@@ -83,6 +87,7 @@ async function placesAutocomplete(input: string): Promise<PlacePrediction[]> {
       headers: {
         'Content-Type': 'application/json',
       },
+      signal,
     }
   );
 
@@ -167,7 +172,7 @@ export function useTripState(threadId: string | null) {
 export function usePlacesAutocomplete(input: string) {
   return useQuery({
     queryKey: ['placesAutocomplete', input],
-    queryFn: () => placesAutocomplete(input),
+    queryFn: ({ signal }) => placesAutocomplete(input, signal),
     enabled: input.length >= 2,
     staleTime: 1000 * 60 * 10, // 10 minutes
     refetchOnWindowFocus: false,
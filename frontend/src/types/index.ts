@@ -52,7 +52,7 @@ export interface LocationEditDiff {
   added_locations: Location[];
 }
 
-export type TripPhase = 'discovery' | 'editing' | 'generating' | 'complete';
+export type TripPhase = 'discovery' | 'editing' | 'generating' | 'complete' | 'error';
 
 export interface TripState {
   thread_id: string;
@@ -60,6 +60,7 @@ export interface TripState {
   trip_params?: TripParameters;
   locations: Location[];
   itinerary?: Itinerary;
+  job?: Record<string, unknown>;
 }
 
 export interface PlacePrediction {
@@ -74,6 +75,7 @@ export interface PlacePrediction {
 export interface StartTripResponse {
   thread_id: string;
   locations: Location[];
+  status?: 'pending' | 'complete';
 }
 
 export interface GenerateItineraryResponse {
@@ -82,6 +84,8 @@ export interface GenerateItineraryResponse {
   validation_passed: boolean;
   validation_errors: string[];
   route_warnings?: string[];
+  route_metrics?: Record<string, number>;
+  generation_mode?: string;
 }
 
 // Interest options for intake form